@@ -0,0 +1,117 @@
+# coding_agent_backend/benchmarks/bench_cold_start.py
+"""
+Cold-start benchmark for the backend.
+
+Measures, each in a fresh interpreter:
+  * import time of ``main`` (optionally with the slowest modules from -X importtime),
+  * time from launching uvicorn until the first HTTP request is answered,
+  * time until GET /api/ready reports all heavy components warm.
+
+    cd backend && python benchmarks/bench_cold_start.py --runs 5 --top 10
+
+Set BACKEND_PREWARM=false in the environment to measure without background pre-warm
+(readiness is then only reached once a task has loaded the components).
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(top: int) -> float:
+    code = "import time; s = time.perf_counter(); import main; print(time.perf_counter() - s)"
+    args = [sys.executable] + (["-X", "importtime"] if top else []) + ["-c", code]
+    proc = subprocess.run(args, cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    if top:
+        rows = []
+        for line in proc.stderr.splitlines():
+            parts = line.split("|")
+            if line.startswith("import time:") and len(parts) == 3 and parts[1].strip().isdigit():
+                rows.append((int(parts[1]), parts[2].rstrip()))
+        print(f"  Langsamste Imports (kumulativ):")
+        for cumulative_us, name in sorted(rows, reverse=True)[:top]:
+            print(f"    {cumulative_us / 1000:9.1f} ms  {name}")
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=2) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def measure_server(ready_timeout: float):
+    """Sekunden bis zum ersten beantworteten Request und bis /api/ready 200 liefert (None = Timeout)."""
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    first_request = ready = None
+    try:
+        while time.perf_counter() - started < ready_timeout:
+            try:
+                status = _get(f"{base}/api/ready")
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.05)
+                continue
+            if first_request is None:
+                first_request = time.perf_counter() - started
+            if status == 200:
+                ready = time.perf_counter() - started
+                break
+            time.sleep(0.1)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return first_request, ready
+
+
+def _summary(label: str, values) -> None:
+    values = [v for v in values if v is not None]
+    if not values:
+        print(f"{label:<22} -")
+        return
+    print(f"{label:<22} median {statistics.median(values):7.2f} s   min {min(values):7.2f} s   max {max(values):7.2f} s   (n={len(values)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=0, help="Langsamste Imports des ersten Laufs anzeigen")
+    parser.add_argument("--ready-timeout", type=float, default=180.0)
+    args = parser.parse_args()
+
+    imports, first_requests, readies = [], [], []
+    for run in range(args.runs):
+        imports.append(measure_import(args.top if run == 0 else 0))
+        first_request, ready = measure_server(args.ready_timeout)
+        first_requests.append(first_request)
+        readies.append(ready)
+        print(f"Lauf {run + 1}: import {imports[-1]:.2f} s, erster Request {first_request or float('nan'):.2f} s, "
+              f"bereit {ready or float('nan'):.2f} s")
+
+    _summary("import main", imports)
+    _summary("erster Request", first_requests)
+    _summary("/api/ready = 200", readies)
+
+
+if __name__ == "__main__":
+    main()
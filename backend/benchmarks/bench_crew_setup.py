@@ -0,0 +1,67 @@
+# coding_agent_backend/benchmarks/bench_crew_setup.py
+"""
+Micro-benchmark: per-request crew setup cost, building agents/tasks/crew from
+scratch (previous behaviour) vs. stamping from the CrewFactory templates.
+
+    cd backend && python benchmarks/bench_crew_setup.py --runs 50
+
+No LLM is called; only object construction is measured.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crewai import Crew, Process  # noqa: E402
+
+from crew_builder import CrewFactory  # noqa: E402
+from llm_config import manager_llm, google_api_key  # noqa: E402
+
+
+def build_from_scratch(callbacks):
+    """Der frühere Pfad: alles pro Request neu erstellen und validieren."""
+    agents, tasks = CrewFactory._build_templates()
+    return Crew(
+        agents=agents,
+        tasks=tasks,
+        process=Process.sequential,
+        embedder=dict(provider="google", config=dict(model="gemini-embedding-exp-03-07", api_key=google_api_key)),
+        manager_llm=manager_llm,
+        verbose=True,
+        callbacks=callbacks,
+    )
+
+
+def measure(label, build, runs):
+    build([])  # Aufwärmen (Lazy-Imports, Caches)
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        build([])
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{label:<14} mean {statistics.mean(timings):8.2f} ms   p50 {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms")
+    return statistics.mean(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    factory = CrewFactory()
+    started = time.perf_counter()
+    factory.warm()
+    print(f"Vorlagen einmalig erstellt in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+    before = measure("from scratch", build_from_scratch, args.runs)
+    after = measure("factory", factory.build, args.runs)
+    print(f"Speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
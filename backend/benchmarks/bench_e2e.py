@@ -0,0 +1,370 @@
+# coding_agent_backend/benchmarks/bench_e2e.py
+"""
+Offline end-to-end benchmark of the full request path.
+
+Starts bench_server.py (the real FastAPI app with the scripted fake LLM, see
+fake_llm.py), uploads synthetic CSVs through /api/upload_csv, starts crew tasks
+through /api/start_crew_task and follows each task with several WebSocket
+subscribers on /ws/logs/{task_id} until the final result arrives.
+
+Reported per dataset size:
+  * end-to-end latency (start request → final result) p50/p90/p99,
+  * tasks/sec at the given concurrency,
+  * time per tool (from the task traces, /api/tasks/{id}/trace),
+  * WebSocket messages/sec over all subscribers,
+  * peak RSS of the server process and its children (VmHWM).
+
+    cd backend && python benchmarks/bench_e2e.py --rows 10000,1000000 --tasks 20 --concurrency 4 \\
+        --subscribers 8 --output bench_results/e2e.json --compare bench_results/baseline.json
+
+The CSVs are generated deterministically (``--seed``) and reused from
+``--data-dir``, so runs on different commits see identical inputs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+import pandas as pd
+import websockets
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_CHUNK_ROWS = 250_000
+CATEGORIES = np.array(["A", "B", "C", "D", "E"])
+REGIONS = np.array(["Nord", "Ost", "Süd", "West"])
+
+
+def generate_csv(path: str, rows: int, seed: int) -> str:
+    """Schreibt ``rows`` Zeilen in Blöcken; existiert die Datei bereits, wird sie wiederverwendet."""
+    if os.path.exists(path):
+        return path
+    rng = np.random.default_rng(seed)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as handle:
+        for offset in range(0, rows, CSV_CHUNK_ROWS):
+            size = min(CSV_CHUNK_ROWS, rows - offset)
+            chunk = pd.DataFrame({
+                "id": np.arange(offset, offset + size),
+                "category": CATEGORIES[rng.integers(0, len(CATEGORIES), size)],
+                "region": REGIONS[rng.integers(0, len(REGIONS), size)],
+                "value": rng.normal(100.0, 15.0, size).round(3),
+                "amount": rng.integers(1, 1000, size),
+                "flag": rng.random(size) < 0.1,
+            })
+            chunk.to_csv(handle, index=False, header=offset == 0)
+    os.replace(tmp_path, path)
+    return path
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = (len(ordered) - 1) * q
+    lower = int(index)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (index - lower)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _children(pid: int) -> List[int]:
+    result = []
+    try:
+        threads = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return result
+    for tid in threads:
+        try:
+            with open(f"/proc/{pid}/task/{tid}/children") as handle:
+                for child in handle.read().split():
+                    result.append(int(child))
+                    result.extend(_children(int(child)))
+        except OSError:
+            continue
+    return result
+
+
+def _vm_hwm_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as handle:
+            for line in handle:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def peak_rss_mb(pid: Optional[int]) -> Optional[float]:
+    """Summe der Spitzen-RSS (VmHWM) von Server und Kindprozessen; None ohne /proc oder PID."""
+    if pid is None or not os.path.exists(f"/proc/{pid}/status"):
+        return None
+    return round(sum(_vm_hwm_kb(p) for p in [pid] + _children(pid)) / 1024, 1)
+
+
+class BenchServer:
+    """bench_server.py als Unterprozess; wartet, bis /api/ready 200 liefert."""
+
+    def __init__(self, llm_latency_ms: float, ready_timeout: float):
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.llm_latency_ms = llm_latency_ms
+        self.ready_timeout = ready_timeout
+        self.process: Optional[subprocess.Popen] = None
+
+    async def __aenter__(self) -> "BenchServer":
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "bench_server.py"),
+             "--port", str(self.port), "--llm-latency-ms", str(self.llm_latency_ms)],
+            cwd=BACKEND_DIR,
+        )
+        deadline = time.monotonic() + self.ready_timeout
+        async with httpx.AsyncClient() as client:
+            while time.monotonic() < deadline:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"Benchmark-Server beendet mit Code {self.process.returncode}")
+                try:
+                    if (await client.get(f"{self.url}/api/ready", timeout=2)).status_code == 200:
+                        return self
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.2)
+        await self.__aexit__()
+        raise RuntimeError(f"Benchmark-Server nicht innerhalb von {self.ready_timeout:.0f} s bereit")
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+async def upload(client: httpx.AsyncClient, base_url: str, path: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    with open(path, "rb") as handle:
+        response = await client.post(
+            f"{base_url}/api/upload_csv",
+            files={"file": (os.path.basename(path), handle, "text/csv")},
+            timeout=None,
+        )
+    response.raise_for_status()
+    return {**response.json(), "upload_s": time.perf_counter() - started}
+
+
+async def subscribe(ws_url: str, stats: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Liest alle Events eines Tasks (ab seq 0) bis zum Endergebnis und gibt dessen Payload zurück."""
+    async with websockets.connect(ws_url, max_size=None) as websocket:
+        async for message in websocket:
+            stats["messages"] += 1
+            stats["bytes"] += len(message)
+            event = json.loads(message)
+            if event.get("type") == "final_result":
+                return event.get("payload") or {}
+    return None
+
+
+async def run_task(client: httpx.AsyncClient, base_url: str, dataset_path: str, subscribers: int,
+                   timeout: float, ws_stats: Dict[str, Any]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    response = await client.post(f"{base_url}/api/start_crew_task", json={
+        "task": "Erstelle einen kurzen explorativen Bericht.",
+        "model_name": "fake/worker",
+        "dataset_path": dataset_path,
+        "user_project_goal": "Verteilung der Kategorien verstehen.",
+        "log_verbosity": os.getenv("BENCH_LOG_VERBOSITY") or None,
+    }, timeout=30)
+    if response.status_code == 429:
+        return {"error": "queue full", "latency_s": None}
+    response.raise_for_status()
+    task_id = response.json()["task_id"]
+    ws_url = base_url.replace("http", "ws", 1) + f"/ws/logs/{task_id}?protocol=json&since=0"
+
+    # Der erste Abonnent misst die Latenz, alle zählen Nachrichten
+    listeners = [asyncio.create_task(subscribe(ws_url, ws_stats)) for _ in range(subscribers)]
+    try:
+        payload = await asyncio.wait_for(listeners[0], timeout)
+        latency = time.perf_counter() - started
+        await asyncio.wait_for(asyncio.gather(*listeners[1:], return_exceptions=True), 30)
+    except asyncio.TimeoutError:
+        for listener in listeners:
+            listener.cancel()
+        return {"task_id": task_id, "error": "timeout", "latency_s": None}
+
+    trace = (await client.get(f"{base_url}/api/tasks/{task_id}/trace", timeout=30)).json()
+    tools: Dict[str, List[float]] = defaultdict(list)
+    for event in trace.get("traceEvents", []):
+        if event.get("cat") == "tool" and event.get("ph") == "X":
+            tools[event["name"]].append(event["dur"] / 1e6)
+    return {
+        "task_id": task_id,
+        "error": (payload or {}).get("error"),
+        "latency_s": latency,
+        "tools": dict(tools),
+    }
+
+
+async def bench_dataset(args: argparse.Namespace, base_url: str, server_pid: Optional[int], rows: int) -> Dict[str, Any]:
+    path = generate_csv(os.path.join(args.data_dir, f"bench_{rows}_s{args.seed}.csv"), rows, args.seed)
+    async with httpx.AsyncClient() as client:
+        uploaded = await upload(client, base_url, path)
+        ws_stats = {"messages": 0, "bytes": 0}
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def limited() -> Dict[str, Any]:
+            async with semaphore:
+                return await run_task(client, base_url, uploaded["file_path"], args.subscribers, args.task_timeout, ws_stats)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(limited() for _ in range(args.tasks)))
+        elapsed = time.perf_counter() - started
+
+    latencies = [r["latency_s"] for r in results if r["latency_s"] is not None and not r["error"]]
+    tools: Dict[str, List[float]] = defaultdict(list)
+    for result in results:
+        for name, durations in result.get("tools", {}).items():
+            tools[name].extend(durations)
+    return {
+        "rows": rows,
+        "csv_bytes": os.path.getsize(path),
+        "upload_s": round(uploaded["upload_s"], 3),
+        "tasks": args.tasks,
+        "completed": len(latencies),
+        "errors": sorted({str(r["error"]) for r in results if r["error"]}),
+        "elapsed_s": round(elapsed, 3),
+        "tasks_per_sec": round(len(latencies) / elapsed, 3) if elapsed else None,
+        "latency_s": {
+            "p50": percentile(latencies, 0.50),
+            "p90": percentile(latencies, 0.90),
+            "p99": percentile(latencies, 0.99),
+            "mean": statistics.fmean(latencies) if latencies else None,
+            "max": max(latencies, default=None),
+        },
+        "tools": {
+            name: {"calls": len(durations), "total_s": round(sum(durations), 3), "mean_ms": round(statistics.fmean(durations) * 1000, 1)}
+            for name, durations in sorted(tools.items())
+        },
+        "websocket": {
+            "subscribers_per_task": args.subscribers,
+            "messages": ws_stats["messages"],
+            "bytes": ws_stats["bytes"],
+            "messages_per_sec": round(ws_stats["messages"] / elapsed, 1) if elapsed else None,
+        },
+        "peak_rss_mb": peak_rss_mb(server_pid),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _fmt(value: Any, unit: str = "") -> str:
+    if value is None:
+        return "-"
+    return f"{value:.3f}{unit}" if isinstance(value, float) else f"{value}{unit}"
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    base_by_rows = {r["rows"]: r for r in (baseline or {}).get("results", [])}
+    metrics = [
+        ("p50 (s)", lambda r: r["latency_s"]["p50"]),
+        ("p90 (s)", lambda r: r["latency_s"]["p90"]),
+        ("p99 (s)", lambda r: r["latency_s"]["p99"]),
+        ("Tasks/s", lambda r: r["tasks_per_sec"]),
+        ("WS Nachr./s", lambda r: r["websocket"]["messages_per_sec"]),
+        ("Peak RSS (MB)", lambda r: r["peak_rss_mb"]),
+    ]
+    for result in report["results"]:
+        base = base_by_rows.get(result["rows"])
+        print(f"\n{result['rows']:,} Zeilen ({result['csv_bytes'] / 1e6:.1f} MB, Upload {result['upload_s']:.2f} s): "
+              f"{result['completed']}/{result['tasks']} Tasks ok" + (f", Fehler: {result['errors']}" if result["errors"] else ""))
+        for label, get in metrics:
+            value = get(result)
+            line = f"  {label:<15} {_fmt(value):>12}"
+            if base is not None:
+                before = get(base)
+                if before and value is not None:
+                    line += f"   Baseline {_fmt(before):>12}  ({(value - before) / before * 100:+.1f} %)"
+            print(line)
+        for name, tool in result["tools"].items():
+            print(f"  Tool {name:<40} {tool['calls']:>4}x  {tool['mean_ms']:>9.1f} ms")
+        if not result["tools"]:
+            print("  Keine Tool-Spans im Trace (die Callbacks der installierten crewai-Version melden keine Tool-Aufrufe)")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    results = []
+    if args.server_url:
+        for rows in args.rows:
+            results.append(await bench_dataset(args, args.server_url.rstrip("/"), args.server_pid, rows))
+    else:
+        async with BenchServer(args.llm_latency_ms, args.ready_timeout) as server:
+            for rows in args.rows:
+                results.append(await bench_dataset(args, server.url, server.process.pid, rows))
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10000,100000,1000000", help="Kommagetrennte Zeilenzahlen, z.B. 10000,10000000")
+    parser.add_argument("--tasks", type=int, default=10, help="Tasks pro Datensatz")
+    parser.add_argument("--concurrency", type=int, default=2, help="Gleichzeitig laufende Tasks")
+    parser.add_argument("--subscribers", type=int, default=4, help="WebSocket-Abonnenten pro Task")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "bench_data"))
+    parser.add_argument("--task-timeout", type=float, default=600.0)
+    parser.add_argument("--ready-timeout", type=float, default=180.0)
+    parser.add_argument("--server-url", help="Bereits laufenden bench_server.py verwenden")
+    parser.add_argument("--server-pid", type=int, help="PID des Servers aus --server-url (für Peak RSS)")
+    parser.add_argument("--output", help="Ergebnisse als JSON speichern")
+    parser.add_argument("--compare", help="Früheres JSON-Ergebnis als Baseline anzeigen")
+    args = parser.parse_args()
+    args.rows = [int(value) for value in args.rows.split(",") if value.strip()]
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    report = asyncio.run(run(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+    print_report(report, baseline)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"\nErgebnisse gespeichert unter {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# coding_agent_backend/benchmarks/bench_server.py
+"""
+Starts the real FastAPI app with the scripted fake LLM (see fake_llm.py)
+instead of OpenRouter, for offline end-to-end benchmarks (bench_e2e.py).
+
+    cd backend && python benchmarks/bench_server.py --port 8765 --llm-latency-ms 200
+
+Provider limits (LLM_RPM, LLM_MAX_IN_FLIGHT) and the LLM response cache are
+switched off unless set in the environment. The fake LLM lives in this process,
+so the crews run in thread mode (CREW_EXECUTION_BACKEND=thread).
+"""
+import argparse
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulierte Antwortzeit pro LLM-Aufruf")
+    parser.add_argument("--log-level", default="warning", help="Log-Level von uvicorn")
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    os.environ.setdefault("LLM_RPM", "0")
+    os.environ.setdefault("LLM_MAX_IN_FLIGHT", "0")
+    os.environ.setdefault("LLM_CACHE_MODE", "off")
+    os.environ.setdefault("CREWAI_TRACING_ENABLED", "false")
+    os.environ["CREW_EXECUTION_BACKEND"] = "thread"
+    sys.path.insert(0, BACKEND_DIR)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(BACKEND_DIR)
+
+    import uvicorn
+
+    import llm_config
+    from fake_llm import FakeLLM
+
+    # Vor dem Import von main ersetzen, damit die Crew-Vorlagen (auch beim Pre-Warm) das Fake-LLM nutzen
+    llm_config.override_llms(
+        FakeLLM(model="fake/worker", latency_ms=args.llm_latency_ms),
+        FakeLLM(model="fake/manager", latency_ms=args.llm_latency_ms),
+    )
+    from main import app
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
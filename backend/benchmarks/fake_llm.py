@@ -0,0 +1,103 @@
+# coding_agent_backend/benchmarks/fake_llm.py
+"""
+Deterministic, scripted stand-in for the OpenRouter models.
+
+The manager answers its planning task directly. The reporting agent works
+through a fixed ReAct script: it searches the dataset with the CSV search tool,
+writes and executes a notebook that loads and describes the CSV, then returns a
+final answer. The next step depends only on the model's own previous replies,
+never on what else the task inputs contain (only the CSV path is taken from
+them), so every run, before and after a change, exercises the same tools with
+the same inputs. ``latency_ms`` simulates the network/generation time of a
+real provider.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    from crewai.llms.base_llm import BaseLLM
+except ImportError:  # ältere crewai-Versionen
+    from crewai.llm import BaseLLM
+
+_CSV_PATH = re.compile(r"(/[^\s'\"]+?\.csv)")
+_SEARCH_THOUGHT = "Ich sehe mir zuerst die Daten an."
+_NOTEBOOK_THOUGHT = "Jetzt schreibe und prüfe ich das Notebook."
+
+
+def _text(messages: Any) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(message.get("content") or "") for message in messages)
+
+
+def _notebook_code(csv_path: str) -> str:
+    return (
+        "# %%\n"
+        "import pandas as pd\n"
+        f"data = pd.read_csv({csv_path!r})\n"
+        "print(data.shape)\n"
+        "# %%\n"
+        "print(data.describe(include='all').T.head(20))\n"
+        "# %%\n"
+        "numeric = data.select_dtypes('number')\n"
+        "print(numeric.corr().round(3))\n"
+    )
+
+
+class FakeLLM(BaseLLM):
+    """Scripted LLM; see the module docstring for the conversation it plays."""
+
+    latency_ms: float = 0.0
+    notebook_dir: str = os.path.join(tempfile.gettempdir(), "bench_notebooks")
+
+    def call(
+        self,
+        messages: Any,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> str:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        return self.reply(_text(messages))
+
+    def reply(self, conversation: str) -> str:
+        if "Write code to Jupyter Notebook" not in conversation:
+            return (
+                "Thought: Ich kenne den Plan.\n"
+                "Final Answer: 1. Datensatz beschreiben. 2. Verteilungen und Korrelationen zeigen. "
+                "3. Fragestellung beantworten. 4. Handlungsempfehlungen ableiten."
+            )
+        match = _CSV_PATH.search(conversation)
+        csv_path = match.group(1) if match else ""
+        # Der Schritt ergibt sich aus den eigenen, bereits im Verlauf stehenden Antworten
+        if _SEARCH_THOUGHT not in conversation:
+            return (
+                f"Thought: {_SEARCH_THOUGHT}\n"
+                "Action: Search a CSV's content\n"
+                f"Action Input: {json.dumps({'search_query': 'A', 'csv': csv_path, 'columns': ['category']})}"
+            )
+        if _NOTEBOOK_THOUGHT not in conversation:
+            os.makedirs(self.notebook_dir, exist_ok=True)
+            filename = os.path.join(self.notebook_dir, f"report-{threading.get_ident()}-{time.monotonic_ns()}.ipynb")
+            return (
+                f"Thought: {_NOTEBOOK_THOUGHT}\n"
+                "Action: Write code to Jupyter Notebook\n"
+                f"Action Input: {json.dumps({'code': _notebook_code(csv_path), 'filename': filename, 'execute': True})}"
+            )
+        return "Thought: Das Notebook ist fertig.\nFinal Answer: Der Bericht wurde als Notebook gespeichert."
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return 128000
@@ -5,42 +5,105 @@ import logging
 import sys # Importiere sys für stdout Umleitung
 import io  # Importiere io für StringIO
 import asyncio # Für asyncio.create_task
+import contextvars
+from contextlib import contextmanager
+
+import log_protocol
+import tracing
+from log_config import LazyMessage, resolve_verbosity, should_log_prompt, verbosity_at_least
+from log_protocol import LogEvent
 
 logger = logging.getLogger(__name__)
 
+# Events, die in Stufe "minimal" nicht an den WebSocket gehen
+_VERBOSE_KINDS = frozenset({log_protocol.LLM_START, log_protocol.LLM_END, log_protocol.CHAIN_START, log_protocol.CHAIN_END})
+
 class WebSocketCallbackHandler(BaseCallbackHandler):
     """
     Callback Handler, der Ausführungsinformationen an eine WebSocket-Verbindung streamt,
     verwaltet durch einen ConnectionManager.
     """
 
-    def __init__(self, websocket_manager: Any, task_id: str):
+    def __init__(self, websocket_manager: Any, task_id: str, verbosity: Optional[str] = None):
         """
         Initialisiert den Callback Handler.
 
         Args:
             websocket_manager: Eine Instanz des ConnectionManager (aus main.py),
-                               der eine Methode `send_log_to_task(task_id, message)` besitzt.
+                               der eine Methode `send_log_to_task(task_id, message)` besitzt
+                               (message ist ein log_protocol.LogEvent).
             task_id: Die eindeutige ID des aktuellen Tasks/Laufs.
+            verbosity: Log-Stufe des Tasks (siehe log_config.VERBOSITY_TIERS), Standard LOG_VERBOSITY.
         """
         super().__init__()
         self.websocket_manager = websocket_manager
         self.task_id = task_id
         self._log_prefix_str = f"[Task:{self.task_id[:8]}]" # Korrekte f-String Nutzung
+        self.verbosity = resolve_verbosity(verbosity)
+        # Zeitmessung der Callbacks als Spans (Download: /api/tasks/{task_id}/trace, Metriken: /metrics)
+        self.trace = tracing.trace_store.start(task_id)
         logger.info(f"{self._log_prefix_str} WebSocketCallbackHandler initialisiert.") # Korrekte f-String Nutzung
 
-    async def _send_log(self, event_type: str, content: str, is_raw_crewai_output: bool = False): # Parameter hinzugefügt
+    async def _send_log(
+        self,
+        event_type: str,
+        content: str,
+        is_raw_crewai_output: bool = False,
+        kind: str = log_protocol.TEXT,
+        agent: Optional[str] = None,
+        tool: Optional[str] = None,
+    ):
         """
-        Formatiert und sendet eine Log-Nachricht über den WebSocketManager.
-        Wenn is_raw_crewai_output True ist, wird kein zusätzliches Präfix hinzugefügt.
+        Baut ein typisiertes Log-Event und sendet es über den WebSocketManager.
+        event_type bestimmt nur die Darstellung im Legacy-Textformat; wenn
+        is_raw_crewai_output True ist, wird dort kein zusätzliches Präfix hinzugefügt.
         """
+        if not self.wants(kind):
+            return
+        event = self._build_event(event_type, content, is_raw_crewai_output, kind, agent, tool)
+        await self.websocket_manager.send_log_to_task(self.task_id, event)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{self._log_prefix_str} [WS Send] Event: '{event_type}', Raw: {is_raw_crewai_output}, Content (gekürzt): '{content[:100]}...'")
+
+    def wants(self, kind: str) -> bool:
+        """Ob Events dieser Art in der Log-Stufe des Tasks an den Client gehen."""
+        return self.verbosity != "minimal" or kind not in _VERBOSE_KINDS
+
+    def _format_log(self, event_type: str, content: str, is_raw_crewai_output: bool = False) -> str:
         if is_raw_crewai_output:
-            formatted_message = content # Sende den rohen Output direkt
-        else:
-            formatted_message = f"{self._log_prefix_str} [{event_type}] {content}"
-        
-        await self.websocket_manager.send_log_to_task(self.task_id, formatted_message)
-        logger.debug(f"{self._log_prefix_str} [WS Send] Event: '{event_type}', Raw: {is_raw_crewai_output}, Content (gekürzt): '{content[:100]}...'")
+            return content # Sende den rohen Output direkt
+        return f"{self._log_prefix_str} [{event_type}] {content}"
+
+    def _build_event(
+        self,
+        event_type: str,
+        content: str,
+        is_raw_crewai_output: bool = False,
+        kind: str = log_protocol.TEXT,
+        agent: Optional[str] = None,
+        tool: Optional[str] = None,
+    ) -> LogEvent:
+        return LogEvent(
+            kind,
+            content,
+            agent=agent,
+            tool=tool,
+            text=self._format_log(event_type, content, is_raw_crewai_output),
+        )
+
+    def can_publish(self) -> bool:
+        return hasattr(self.websocket_manager, "publish")
+
+    def publish_log(
+        self,
+        event_type: str,
+        content: str,
+        is_raw_crewai_output: bool = False,
+        kind: str = log_protocol.TEXT,
+    ) -> None:
+        """Synchrone Variante von _send_log: übergibt das Event ohne eigenen asyncio-Task
+        an den ConnectionManager. Aus jedem Thread aufrufbar."""
+        self.websocket_manager.publish(self.task_id, self._build_event(event_type, content, is_raw_crewai_output, kind))
 
     # --- LLM Callbacks ---
     async def on_llm_start(
@@ -54,8 +117,23 @@ class WebSocketCallbackHandler(BaseCallbackHandler):
         model_name_from_id = model_id_list[-1] if isinstance(model_id_list, list) and model_id_list else "Unbekanntes LLM"
         
         model_name = model_name_from_invocation or model_name_from_serialized or model_name_from_id
-        
-        # Detailliertes Logging des vollständigen Prompts auf dem Server (siehe vorherige Empfehlung)
+        self.trace.start(
+            model_name, tracing.LLM, run_id=kwargs.get("run_id"), parent_run_id=kwargs.get("parent_run_id"),
+            model=model_name, prompts=len(prompts), prompt_chars=sum(map(len, prompts)),
+        )
+
+        if verbosity_at_least(self.verbosity, "normal") and logger.isEnabledFor(logging.INFO):
+            logger.info(f"{self._log_prefix_str} [LLM Start] '{model_name}' mit {len(prompts)} Prompt(s), {sum(map(len, prompts))} Zeichen.")
+        # Vollständige Prompts nur als Stichprobe (bzw. in Stufe "debug"); formatiert wird erst im Log-Thread
+        if should_log_prompt(self.verbosity) and logger.isEnabledFor(logging.INFO):
+            logger.info("%s", LazyMessage(self._format_prompt_log, model_name, serialized, prompts, kwargs))
+
+        if not self.wants(log_protocol.LLM_START):
+            return
+        await self._send_log("LLM Start", f"Modell '{model_name}' wird mit {len(prompts)} Prompt(s) aufgerufen. Erster Prompt (gekürzt): '{prompts[0][:200]}...'", kind=log_protocol.LLM_START) # Gekürzt für WS
+
+    def _format_prompt_log(self, model_name: str, serialized: Dict[str, Any], prompts: List[str], kwargs: Dict[str, Any]) -> str:
+        """Detailliertes Logging des vollständigen Prompts auf dem Server."""
         full_prompts_str = "\n--- PROMPT SEPARATOR ---\n".join(prompts)
         inputs_kwarg = kwargs.get("inputs", {})
         detailed_server_log = (
@@ -70,11 +148,12 @@ class WebSocketCallbackHandler(BaseCallbackHandler):
              actual_messages_sent = inputs_kwarg["messages"]
              detailed_server_log += f"  Actual List[BaseMessage] (from inputs['messages']):\n{actual_messages_sent}\n"
         detailed_server_log += "--- ENDE SERVER DEBUG PROMPT ---"
-        logger.info(detailed_server_log)
-
-        await self._send_log("LLM Start", f"Modell '{model_name}' wird mit {len(prompts)} Prompt(s) aufgerufen. Erster Prompt (gekürzt): '{prompts[0][:200]}...'") # Gekürzt für WS
+        return detailed_server_log
 
     async def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        self.trace.end(kwargs.get("run_id"), tracing.LLM, **_token_usage(response))
+        if not self.wants(log_protocol.LLM_END):
+            return
         try:
             if hasattr(response, 'generations') and response.generations:
                 first_generation_group = response.generations[0]
@@ -90,41 +169,60 @@ class WebSocketCallbackHandler(BaseCallbackHandler):
                     output_summary = str(response) # Fallback
             else:
                 output_summary = str(response) # Fallback
-            await self._send_log("LLM Ende", f"Modellaufruf beendet. Antwort (gekürzt): '{output_summary[:200]}...'")
+            await self._send_log("LLM Ende", f"Modellaufruf beendet. Antwort (gekürzt): '{output_summary[:200]}...'", kind=log_protocol.LLM_END)
         except Exception as e:
-            await self._send_log("LLM Ende", f"Modellaufruf beendet. Antwort konnte nicht vollständig extrahiert werden (Fehler: {e}). Antwort-Objekt (gekürzt): {str(response)[:200]}...")
+            await self._send_log("LLM Ende", f"Modellaufruf beendet. Antwort konnte nicht vollständig extrahiert werden (Fehler: {e}). Antwort-Objekt (gekürzt): {str(response)[:200]}...", kind=log_protocol.LLM_END)
+
+    async def on_llm_error(self, error: Union[Exception, KeyboardInterrupt], **kwargs: Any) -> None:
+        self.trace.end(kwargs.get("run_id"), tracing.LLM, status="error", error=str(error)[:200])
 
     # --- Chain Callbacks ---
     async def on_chain_start(
         self, serialized: Dict[str, Any], inputs: Dict[str, Any], **kwargs: Any
     ) -> None:
         chain_name = serialized.get("name", serialized.get("id", ["Unbekannte Kette"])[-1])
+        self.trace.start(chain_name, tracing.CHAIN, run_id=kwargs.get("run_id"), parent_run_id=kwargs.get("parent_run_id"))
+        if not self.wants(log_protocol.CHAIN_START):
+            return
         input_keys = list(inputs.keys())
-        await self._send_log("Kette Start", f"Kette '{chain_name}' gestartet. Input-Schlüssel: {input_keys}.")
+        await self._send_log("Kette Start", f"Kette '{chain_name}' gestartet. Input-Schlüssel: {input_keys}.", kind=log_protocol.CHAIN_START)
 
     async def on_chain_end(self, outputs: Dict[str, Any], **kwargs: Any) -> None:
         chain_name = kwargs.get("name", "Unbekannte Kette") # CrewAI setzt hier oft den Agentennamen
+        self.trace.end(kwargs.get("run_id"), tracing.CHAIN)
+        if not self.wants(log_protocol.CHAIN_END):
+            return
         output_summary = str(outputs)[:300]
-        await self._send_log("Kette Ende", f"Kette '{chain_name}' beendet. Output (gekürzt): '{output_summary}...'")
+        await self._send_log("Kette Ende", f"Kette '{chain_name}' beendet. Output (gekürzt): '{output_summary}...'", kind=log_protocol.CHAIN_END)
 
     # --- Tool Callbacks ---
     async def on_tool_start(
         self, serialized: Dict[str, Any], input_str: str, **kwargs: Any
     ) -> None:
         tool_name = serialized.get("name", "Unbekanntes Tool")
-        await self._send_log("Tool Start", f"Tool '{tool_name}' wird ausgeführt mit Input (gekürzt): '{input_str[:200]}...'")
+        self.trace.start(
+            tool_name, tracing.TOOL, run_id=kwargs.get("run_id"), parent_run_id=kwargs.get("parent_run_id"),
+            input_chars=len(input_str),
+        )
+        await self._send_log("Tool Start", f"Tool '{tool_name}' wird ausgeführt mit Input (gekürzt): '{input_str[:200]}...'", kind=log_protocol.TOOL_START, tool=tool_name)
 
     async def on_tool_end(self, output: str, **kwargs: Any) -> None:
         tool_name = kwargs.get("name", "Unbekanntes Tool")
         agent_name = kwargs.get("agent_name", "") # Versuch, den Agentennamen zu bekommen
         log_source = f"{agent_name} - {tool_name}" if agent_name else tool_name
-        await self._send_log(f"{log_source} Output", f"(gekürzt): '{str(output)[:200]}...'")
+        output = str(output)
+        self.trace.end(kwargs.get("run_id"), tracing.TOOL, status="ok", output_chars=len(output))
+        await self._send_log(
+            f"{log_source} Output", f"(gekürzt): '{output[:200]}...'",
+            kind=log_protocol.TOOL_END, agent=agent_name or None, tool=tool_name,
+        )
 
     async def on_tool_error(
         self, error: Union[Exception, KeyboardInterrupt], **kwargs: Any
     ) -> None:
         tool_name = kwargs.get("name", "Unbekanntes Tool")
-        await self._send_log("Tool Fehler", f"Fehler bei Ausführung von Tool '{tool_name}': {str(error)}")
+        self.trace.end(kwargs.get("run_id"), tracing.TOOL, status="error", error=str(error)[:200])
+        await self._send_log("Tool Fehler", f"Fehler bei Ausführung von Tool '{tool_name}': {str(error)}", kind=log_protocol.TOOL_ERROR, tool=tool_name)
 
     # --- Agent Specific Callbacks ---
     async def on_agent_action(self, action: Any, **kwargs: Any) -> Any:
@@ -151,21 +249,22 @@ class WebSocketCallbackHandler(BaseCallbackHandler):
                     capture_thought = False # Stoppe Erfassung, wenn Aktionsdetails beginnen
             
             if relevant_thoughts:
-                await self._send_log(f"{agent_name} Thought", " ".join(relevant_thoughts))
+                await self._send_log(f"{agent_name} Thought", " ".join(relevant_thoughts), kind=log_protocol.AGENT_THOUGHT, agent=agent_name)
 
         # Geplante Aktion
         tool_name = action.tool
         tool_input_summary = str(action.tool_input)[:200] # Gekürzt für WebSocket
-        await self._send_log(f"{agent_name} Action", f"Plant Tool '{tool_name}' mit Input (gekürzt): '{tool_input_summary}...'")
-        # Logge auch den vollen Tool-Input auf dem Server für besseres Debugging
-        logger.info(f"{self._log_prefix_str} [{agent_name} Action - SERVER DEBUG] Tool: '{tool_name}', Vollständiger Input: {action.tool_input}")
+        await self._send_log(f"{agent_name} Action", f"Plant Tool '{tool_name}' mit Input (gekürzt): '{tool_input_summary}...'", kind=log_protocol.AGENT_ACTION, agent=agent_name, tool=tool_name)
+        # Logge auch den vollen Tool-Input auf dem Server für besseres Debugging (ab Stufe "verbose")
+        if verbosity_at_least(self.verbosity, "verbose") and logger.isEnabledFor(logging.INFO):
+            logger.info(f"{self._log_prefix_str} [{agent_name} Action - SERVER DEBUG] Tool: '{tool_name}', Vollständiger Input: {action.tool_input}")
 
 
     async def on_agent_finish(self, finish: Any, **kwargs: Any) -> Any:
         agent_name = kwargs.get('name', 'Agent')
         output = finish.return_values.get("output", "")
         output_summary = str(output)[:200]
-        await self._send_log(f"{agent_name} Abschluss", f"Schritt beendet. Output (gekürzt): '{output_summary}...'")
+        await self._send_log(f"{agent_name} Abschluss", f"Schritt beendet. Output (gekürzt): '{output_summary}...'", kind=log_protocol.AGENT_FINISH, agent=agent_name)
 
     # --- Generischer Text-Callback ---
     async def on_text(self, text: str, **kwargs: Any) -> None:
@@ -173,7 +272,17 @@ class WebSocketCallbackHandler(BaseCallbackHandler):
             source_name = kwargs.get('name', 'System/Agent')
             # Vermeide das Loggen von "Thought:", wenn es bereits von on_agent_action abgedeckt wird.
             if not text.lower().strip().startswith("thought:"):
-                await self._send_log(f"{source_name} Info", text.strip())
+                await self._send_log(f"{source_name} Info", text.strip(), kind=log_protocol.TEXT, agent=source_name)
+
+def _token_usage(response: Any) -> Dict[str, int]:
+    """Token-Zahlen aus ``LLMResult.llm_output`` (OpenAI-kompatibel), sofern der Provider sie liefert."""
+    llm_output = getattr(response, "llm_output", None) or {}
+    usage = llm_output.get("token_usage") or llm_output.get("usage") or {}
+    return {
+        f"{kind}_tokens": int(usage[f"{kind}_tokens"])
+        for kind in ("prompt", "completion")
+        if isinstance(usage.get(f"{kind}_tokens"), (int, float))
+    }
 
 class WebSocketStream(io.StringIO):
     def __init__(
@@ -198,10 +307,19 @@ class WebSocketStream(io.StringIO):
         else:
             asyncio.run(coro)
 
+    def _emit(self, line: str) -> None:
+        if self.callback_handler.can_publish():
+            # Kein Task pro Zeile: der ConnectionManager puffert und bündelt die Zeilen selbst
+            self.callback_handler.publish_log(self.event_type_prefix, line, is_raw_crewai_output=True, kind=log_protocol.CONSOLE)
+        else:
+            self._schedule_send(
+                self.callback_handler._send_log(self.event_type_prefix, line, is_raw_crewai_output=True, kind=log_protocol.CONSOLE)
+            )
+
     def write(self, s: str) -> int:
-        # Schreibe auch in das originale stdout, damit es weiterhin in der Server-Konsole erscheint
+        # Schreibe auch in das originale stdout, damit es weiterhin in der Server-Konsole erscheint.
+        # Kein flush() pro write – das übernimmt der Puffer des Streams bzw. flush()
         self.original_stdout.write(s)
-        self.original_stdout.flush()
 
         # Füge zum Puffer hinzu und sende ganze Zeilen
         self.line_buffer += s
@@ -210,24 +328,70 @@ class WebSocketStream(io.StringIO):
             self.line_buffer = lines[-1]  # Behalte den Rest für die nächste Zeile
             for line in lines[:-1]:
                 if line.strip():  # Sende keine leeren Zeilen
-                    self._schedule_send(
-                        self.callback_handler._send_log(
-                            self.event_type_prefix,
-                            line.strip(),
-                            is_raw_crewai_output=True,
-                        )
-                    )
+                    self._emit(line.strip())
         return len(s)
 
     def flush(self) -> None:
         self.original_stdout.flush()
         # Sende verbleibenden Pufferinhalt, falls vorhanden und nicht mit Newline endet
         if self.line_buffer.strip():
-            self._schedule_send(
-                self.callback_handler._send_log(
-                    self.event_type_prefix,
-                    self.line_buffer.strip(),
-                    is_raw_crewai_output=True,
-                )
-            )
-            self.line_buffer = ""
\ No newline at end of file
+            self._emit(self.line_buffer.strip())
+            self.line_buffer = ""
+
+
+# Stream des Tasks, der im aktuellen Kontext läuft. asyncio.to_thread kopiert den Kontext,
+# daher sehen auch die Worker-Threads von kickoff() den richtigen Stream.
+_current_task_stream: contextvars.ContextVar[Optional[WebSocketStream]] = contextvars.ContextVar(
+    "current_task_stream", default=None
+)
+
+
+class TaskStdoutRouter(io.TextIOBase):
+    """
+    Ersetzt sys.stdout einmalig für den ganzen Prozess und leitet jedes write() an den
+    WebSocketStream des Tasks weiter, aus dessen Kontext geschrieben wird. Threads, die den
+    Kontext nicht übernehmen (z.B. eigene Executor von Libraries), sind keinem Task zuzuordnen;
+    ihre Ausgaben landen wie alle übrigen im originalen stdout und nie im Stream eines
+    anderen Tasks. So können mehrere Crews parallel laufen, ohne dass sich ihre
+    Konsolenausgaben vermischen.
+    """
+
+    def __init__(self, fallback: Any):
+        super().__init__()
+        self.fallback = fallback
+
+    def _target(self) -> Any:
+        stream = _current_task_stream.get()
+        return stream if stream is not None else self.fallback
+
+    def write(self, s: str) -> int:
+        return self._target().write(s)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def isatty(self) -> bool:
+        return self.fallback.isatty()
+
+    def fileno(self) -> int:
+        return self.fallback.fileno()
+
+    @property
+    def encoding(self) -> str:
+        return getattr(self.fallback, "encoding", "utf-8")
+
+    @contextmanager
+    def route(self, stream: "WebSocketStream"):
+        """Leitet stdout im aktuellen Kontext (Task und davon gestartete Threads) an ``stream``."""
+        token = _current_task_stream.set(stream)
+        try:
+            yield stream
+        finally:
+            _current_task_stream.reset(token)
+
+
+def install_stdout_router() -> TaskStdoutRouter:
+    """Installiert den Router als sys.stdout (idempotent) und gibt ihn zurück."""
+    if not isinstance(sys.stdout, TaskStdoutRouter):
+        sys.stdout = TaskStdoutRouter(sys.stdout)
+    return sys.stdout
@@ -0,0 +1,112 @@
+# coding_agent_backend/crew_builder.py
+import copy
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple, TypeVar
+
+from crewai import Agent, Crew, Process, Task
+from pydantic import BaseModel
+
+from llm_config import manager_llm, google_api_key
+from agents import managerAgent, WorkerAgents
+from tasks import data_science_tasks
+
+logger = logging.getLogger(__name__)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Private Attribute mit Laufzeitzustand, die jede Kopie für sich braucht
+_PER_RUN_PRIVATE_ATTRS = ("_token_process",)
+
+
+def fresh_copy(model: ModelT, **update: Any) -> ModelT:
+    """
+    Flache Kopie ohne erneute Validierung. Listen, Sets und Dicts (z.B. ``tools``,
+    ``processed_by_agents``) sowie Zähler werden kopiert, damit Läufe keinen
+    Zustand teilen; LLMs, Tools und Logger bleiben gemeinsam genutzt.
+    """
+    duplicate = model.model_copy(update=update)
+    for name, value in duplicate:
+        if name not in update and isinstance(value, (list, set, dict)):
+            duplicate.__dict__[name] = copy.copy(value)
+    private = duplicate.__pydantic_private__
+    if private:
+        for name, value in private.items():
+            if isinstance(value, (list, set, dict)) or name in _PER_RUN_PRIVATE_ATTRS:
+                private[name] = copy.copy(value)
+    return duplicate
+
+
+class CrewFactory:
+    """
+    Builds and validates the data science agents and tasks once, then stamps out
+    a crew per request from cheap copies of those templates. The ``{...}``
+    placeholders stay in the templates; ``Crew.kickoff(inputs=...)`` interpolates
+    them on the per-request copies.
+    """
+
+    def __init__(self) -> None:
+        self._templates: Optional[Tuple[List[Agent], List[Task]]] = None
+        self._embedder: Dict[str, Any] = dict(
+            provider="google",
+            config=dict(
+                model="gemini-embedding-exp-03-07",
+                api_key=google_api_key
+            )
+        )
+        self._lock = threading.Lock()
+
+    def warm(self) -> None:
+        """Baut die Vorlagen vorab (z.B. beim Serverstart), statt beim ersten Request."""
+        self._get_templates()
+
+    def _get_templates(self) -> Tuple[List[Agent], List[Task]]:
+        with self._lock:
+            if self._templates is None:
+                self._templates = self._build_templates()
+                logger.info("Crew-Vorlagen (Agents und Tasks) erstellt.")
+            return self._templates
+
+    @staticmethod
+    def _build_templates() -> Tuple[List[Agent], List[Task]]:
+        ##Agents
+        lead_data_scientist = managerAgent().lead_data_scientist()
+        reporting_agent = WorkerAgents().reporting_agent()
+
+        ##Tasks
+        tasks = data_science_tasks()
+        data_science_project_task = tasks.data_science_project_task(lead_data_scientist)
+        reporting_task = tasks.reporting_task(reporting_agent, [data_science_project_task])
+
+        return [lead_data_scientist, reporting_agent], [data_science_project_task, reporting_task]
+
+    def build(self, callbacks: List[Any]) -> Crew:
+        """Neue Crew-Instanz aus Kopien der Vorlagen; Agents und Tasks werden nicht neu validiert."""
+        template_agents, template_tasks = self._get_templates()
+        agents = {id(agent): fresh_copy(agent) for agent in template_agents}
+        tasks: Dict[int, Task] = {}
+        for task in template_tasks:
+            # Agent und Kontext auf die Kopien dieses Requests umhängen
+            tasks[id(task)] = fresh_copy(
+                task,
+                agent=agents[id(task.agent)] if task.agent is not None else None,
+                context=[tasks[id(upstream)] for upstream in task.context] if isinstance(task.context, list) else task.context,
+            )
+
+        return Crew(
+            agents=list(agents.values()),
+            tasks=list(tasks.values()),
+            process=Process.sequential,
+            embedder=copy.deepcopy(self._embedder),
+            manager_llm=manager_llm,
+            verbose=True,
+            callbacks=callbacks,
+        )
+
+
+crew_factory = CrewFactory()
+
+
+def build_data_science_crew(callbacks: List[Any]) -> Crew:
+    """Baut die Data-Science-Crew (Manager + Reporting-Agent) mit den gegebenen Callbacks."""
+    return crew_factory.build(callbacks)
@@ -0,0 +1,257 @@
+# coding_agent_backend/crew_scheduler.py
+import asyncio
+import contextvars
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import metrics
+import tracing
+from task_context import current_cancel_event
+
+logger = logging.getLogger(__name__)
+
+CREW_MAX_WORKERS = int(os.getenv("CREW_MAX_WORKERS", "4"))
+CREW_MAX_QUEUE = int(os.getenv("CREW_MAX_QUEUE", "32"))
+CREW_TASK_RETENTION_SECONDS = float(os.getenv("CREW_TASK_RETENTION_SECONDS", "600"))
+
+
+class TaskState(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    CANCELLING = "cancelling"  # Abbruch angefordert, der Worker-Thread läuft noch bis zum nächsten Prüfpunkt
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATES = (TaskState.COMPLETED, TaskState.FAILED, TaskState.CANCELLED)
+
+
+class QueueFullError(Exception):
+    """Die Warteschlange ist voll – der Aufrufer soll es später erneut versuchen (HTTP 429)."""
+
+
+@dataclass
+class TaskRecord:
+    task_id: str
+    priority: int
+    submitted_at: float
+    state: TaskState = TaskState.QUEUED
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+
+    def to_dict(self, queue_position: Optional[int] = None) -> Dict[str, Any]:
+        now = time.time()
+        queue_wait = (self.started_at or self.finished_at or now) - self.submitted_at
+        run_time = (self.finished_at or now) - self.started_at if self.started_at else None
+        return {
+            "task_id": self.task_id,
+            "state": self.state.value,
+            "priority": self.priority,
+            "queue_position": queue_position,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_wait_seconds": round(queue_wait, 3),
+            "run_seconds": round(run_time, 3) if run_time is not None else None,
+            "error": self.error,
+        }
+
+
+class CrewScheduler:
+    """
+    Bounded scheduler for crew runs.
+
+    Submitted jobs wait in a priority queue (higher priority first, FIFO within a
+    priority) of at most ``max_queue`` entries; ``max_workers`` dispatchers run
+    them, and blocking work such as ``Crew.kickoff`` goes to a dedicated thread
+    pool of the same size via ``run_blocking`` instead of the loop's default
+    executor. Finished tasks are kept for ``retention_seconds`` and then reaped.
+
+    Cancelling a running task signals its worker thread (see
+    ``task_context.raise_if_cancelled``) and reports it as ``cancelling`` until
+    the thread has actually stopped; only then is its slot free again.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = CREW_MAX_WORKERS,
+        max_queue: int = CREW_MAX_QUEUE,
+        retention_seconds: float = CREW_TASK_RETENTION_SECONDS,
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retention_seconds = retention_seconds
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crew-worker")
+        self._records: Dict[str, TaskRecord] = {}
+        self._jobs: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        # Noch wartende Tasks; abgebrochene zählen nicht mehr gegen max_queue
+        self._waiting: Set[str] = set()
+        self._sequence = itertools.count()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._dispatchers: List[asyncio.Task] = []
+
+    def _ensure_started(self) -> None:
+        # Dispatcher werden beim ersten Submit im laufenden Event-Loop gestartet
+        if self._queue is None:
+            # Ohne maxsize: die Aufnahme begrenzt submit() über _waiting, abgebrochene Einträge werden beim Entnehmen verworfen
+            self._queue = asyncio.PriorityQueue()
+            self._dispatchers = [
+                asyncio.create_task(self._dispatch(), name=f"crew-dispatcher-{i}")
+                for i in range(self.max_workers)
+            ]
+
+    def submit(self, task_id: str, job: Callable[[], Awaitable[Any]], priority: int = 0) -> TaskRecord:
+        self._ensure_started()
+        self.reap()
+        if len(self._waiting) >= self.max_queue:
+            raise QueueFullError(f"Warteschlange voll ({self.max_queue} Tasks). Bitte später erneut versuchen.")
+        record = TaskRecord(task_id=task_id, priority=priority, submitted_at=time.time())
+        self._queue.put_nowait((-priority, next(self._sequence), task_id))
+        self._waiting.add(task_id)
+        self._records[task_id] = record
+        self._jobs[task_id] = job
+        return record
+
+    async def _dispatch(self) -> None:
+        while True:
+            _, _, task_id = await self._queue.get()
+            try:
+                self._waiting.discard(task_id)
+                record = self._records.get(task_id)
+                job = self._jobs.pop(task_id, None)
+                if record is None or job is None or record.state != TaskState.QUEUED:
+                    continue  # Bereits in der Warteschlange abgebrochen
+                await self._run(record, job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, record: TaskRecord, job: Callable[[], Awaitable[Any]]) -> None:
+        record.state = TaskState.RUNNING
+        record.started_at = time.time()
+        metrics.QUEUE_WAIT.observe(record.started_at - record.submitted_at)
+        trace = tracing.trace_store.start(record.task_id)
+        trace.record("queue wait", tracing.QUEUE, record.submitted_at, record.started_at, priority=record.priority)
+        run = asyncio.create_task(job())
+        self._running[record.task_id] = run
+        try:
+            await run
+            record.state = TaskState.CANCELLED if record.cancel_requested else TaskState.COMPLETED
+        except asyncio.CancelledError:
+            record.state = TaskState.CANCELLED
+            if not record.cancel_requested:
+                raise  # Nicht per cancel() abgebrochen: der Dispatcher selbst wird beendet (Shutdown)
+        except Exception as e:
+            record.state = TaskState.FAILED
+            record.error = str(e)
+            logger.error(f"Task {record.task_id} fehlgeschlagen: {e}")
+        finally:
+            record.finished_at = time.time()
+            self._running.pop(record.task_id, None)
+            metrics.TASK_DURATION.observe(record.finished_at - record.started_at, state=record.state.value)
+            trace.record("crew task", tracing.TASK, record.started_at, record.finished_at, state=record.state.value)
+
+    async def run_blocking(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run ``func`` on the crew thread pool, propagating contextvars like ``asyncio.to_thread``.
+
+        If the awaiting task is cancelled, the thread is signalled through
+        ``task_context.current_cancel_event`` and the cancellation is only
+        re-raised once the thread has returned, so the executor slot is never
+        handed out twice. A second cancellation (e.g. at shutdown) stops waiting.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        cancel_event = threading.Event()
+        context.run(current_cancel_event.set, cancel_event)
+        future = loop.run_in_executor(self.executor, context.run, func, *args)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            cancel_event.set()
+            try:
+                await asyncio.shield(future)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass  # z.B. TaskCancelled aus dem Thread – der Abbruch selbst wird unten gemeldet
+            raise
+
+    def cancel(self, task_id: str) -> bool:
+        record = self._records.get(task_id)
+        if record is None or record.state in FINISHED_STATES:
+            return False
+        if record.state == TaskState.CANCELLING:
+            return True  # Bereits angefordert; ein zweites cancel() würde das Warten auf den Thread abbrechen
+        record.cancel_requested = True
+        if record.state == TaskState.QUEUED:
+            record.state = TaskState.CANCELLED
+            record.finished_at = time.time()
+            self._jobs.pop(task_id, None)
+            self._waiting.discard(task_id)
+        else:
+            record.state = TaskState.CANCELLING
+            run = self._running.get(task_id)
+            if run is not None:
+                run.cancel()
+        return True
+
+    def queue_position(self, task_id: str) -> Optional[int]:
+        record = self._records.get(task_id)
+        if record is None or record.state != TaskState.QUEUED or self._queue is None:
+            return None
+        # Snapshot des Heaps; nur noch wartende Einträge zählen
+        pending = sorted(entry for entry in self._queue._queue if self._is_queued(entry[2]))
+        for position, entry in enumerate(pending):
+            if entry[2] == task_id:
+                return position
+        return None
+
+    def _is_queued(self, task_id: str) -> bool:
+        record = self._records.get(task_id)
+        return record is not None and record.state == TaskState.QUEUED
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        record = self._records.get(task_id)
+        if record is None:
+            return None
+        return record.to_dict(self.queue_position(task_id))
+
+    def list(self) -> List[Dict[str, Any]]:
+        self.reap()
+        return [record.to_dict(self.queue_position(task_id)) for task_id, record in self._records.items()]
+
+    def stats(self) -> Dict[str, int]:
+        counts = {state.value: 0 for state in TaskState}
+        for record in self._records.values():
+            counts[record.state.value] += 1
+        return {**counts, "max_workers": self.max_workers, "max_queue": self.max_queue}
+
+    def reap(self) -> int:
+        """Remove finished tasks older than the retention period."""
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            task_id for task_id, record in self._records.items()
+            if record.state in FINISHED_STATES and record.finished_at is not None and record.finished_at < cutoff
+        ]
+        for task_id in expired:
+            del self._records[task_id]
+        return len(expired)
+
+    async def shutdown(self) -> None:
+        for run in list(self._running.values()):
+            run.cancel()
+        for dispatcher in self._dispatchers:
+            dispatcher.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,172 @@
+# coding_agent_backend/dataset_catalog.py
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATASET_CATALOG_PATH = os.getenv("DATASET_CATALOG_PATH", os.path.join(os.path.dirname(__file__), "db", "datasets.sqlite3"))
+DATASET_PAGE_SIZE = int(os.getenv("DATASET_PAGE_SIZE", "50"))
+DATASET_MAX_PAGE_SIZE = int(os.getenv("DATASET_MAX_PAGE_SIZE", "500"))
+
+# Sortierbare Spalten (jeweils mit Index)
+SORT_FIELDS = ("name", "size", "rows", "columns", "uploaded_at")
+# Felder der API-Antwort (ohne den internen Objektpfad)
+_PUBLIC_FIELDS = ("name", "path", "content_hash", "size", "rows", "columns", "uploaded_at", "ingest_status")
+
+
+class DatasetCatalog:
+    """
+    Index of the uploaded datasets in sqlite.
+
+    One row per user-facing name (the alias in the upload directory) with the
+    content hash, size, upload time, row/column counts from the dataset profile
+    and the status of the columnar ingest. Kept up to date by the upload and
+    delete endpoints, so listing is a single indexed query per page instead of
+    a scan of the upload directory. ``sync`` reconciles the index with the
+    directory once at startup (e.g. for files uploaded before the catalog existed).
+    """
+
+    def __init__(self, path: str = DATASET_CATALOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Lazy, damit der Import ohne Dateizugriff auskommt
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS datasets ("
+                " name TEXT PRIMARY KEY, path TEXT, object_path TEXT, content_hash TEXT,"
+                " size INTEGER, rows INTEGER, columns INTEGER, uploaded_at REAL, ingest_status TEXT)"
+            )
+            # Mit dem Namen als zweiter Spalte deckt der Index auch die Sortierung bei Gleichstand ab
+            for field in SORT_FIELDS[1:]:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS datasets_{field} ON datasets ({field}, name)")
+            conn.execute("CREATE INDEX IF NOT EXISTS datasets_object_path ON datasets (object_path)")
+            self._conn = conn
+        return self._conn
+
+    def upsert(self, name: str, path: str, object_path: str, content_hash: Optional[str], size: int,
+               uploaded_at: Optional[float] = None, rows: Optional[int] = None, columns: Optional[int] = None,
+               ingest_status: Optional[str] = None) -> None:
+        """Trägt einen Datensatz ein bzw. ersetzt den Eintrag gleichen Namens (neuer Inhalt unter altem Namen)."""
+        self._upsert_many([(name, path, object_path, content_hash, size, rows, columns, uploaded_at or time.time(), ingest_status)])
+
+    def _upsert_many(self, rows: List[tuple]) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO datasets (name, path, object_path, content_hash, size, rows, columns, uploaded_at, ingest_status)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+
+    def update_object(self, object_path: str, **fields: Any) -> int:
+        """Aktualisiert ``rows``, ``columns`` oder ``ingest_status`` aller Namen, die auf ``object_path`` zeigen."""
+        fields = {key: value for key, value in fields.items() if key in ("rows", "columns", "ingest_status")}
+        if not fields:
+            return 0
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(f"UPDATE datasets SET {assignments} WHERE object_path = ?", (*fields.values(), object_path))
+            conn.commit()
+            return cursor.rowcount
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute("SELECT * FROM datasets WHERE name = ?", (name,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def delete(self, name: str) -> Optional[Dict[str, Any]]:
+        """Entfernt den Eintrag und gibt ihn zurück (None, falls unbekannt)."""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT * FROM datasets WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM datasets WHERE name = ?", (name,))
+            conn.commit()
+        return dict(row)
+
+    def references(self, object_path: str) -> int:
+        """Anzahl der Namen, die noch auf ``object_path`` zeigen."""
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM datasets WHERE object_path = ?", (object_path,)).fetchone()[0]
+
+    def query(self, limit: int = DATASET_PAGE_SIZE, offset: int = 0, search: Optional[str] = None,
+              ingest_status: Optional[str] = None, sort: str = "uploaded_at", descending: bool = True) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        One page of datasets plus the total number of matches. ``search`` matches
+        a substring of the name (case-insensitive), ``ingest_status`` filters
+        exactly. Ties in the sort column are broken by name.
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Unbekanntes Sortierfeld '{sort}'. Erlaubt: {', '.join(SORT_FIELDS)}")
+        limit = max(1, min(limit, DATASET_MAX_PAGE_SIZE))
+        conditions, params = [], []
+        if search:
+            escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append("name LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        if ingest_status:
+            conditions.append("ingest_status = ?")
+            params.append(ingest_status)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        direction = "DESC" if descending else "ASC"
+        order = f" ORDER BY {sort} {direction}" + ("" if sort == "name" else f", name {direction}")
+        with self._lock:
+            conn = self._connection()
+            total = conn.execute(f"SELECT COUNT(*) FROM datasets{where}", params).fetchone()[0]
+            rows = conn.execute(f"SELECT {', '.join(_PUBLIC_FIELDS)} FROM datasets{where}{order} LIMIT ? OFFSET ?", (*params, limit, max(0, offset))).fetchall()
+        return [dict(row) for row in rows], total
+
+    def sync(self, root: str, describe: Optional[Callable[[str], Dict[str, Any]]] = None) -> Dict[str, int]:
+        """
+        Gleicht den Katalog mit dem Upload-Verzeichnis ab: fehlende Dateien werden eingetragen,
+        Einträge ohne Datei entfernt. ``describe(object_path)`` liefert optional rows/columns/ingest_status.
+        """
+        present: Dict[str, os.DirEntry] = {}
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if not entry.name.startswith(".") and entry.is_file():
+                    present[entry.name] = entry
+        with self._lock:
+            known = {row["name"]: row["object_path"] for row in self._connection().execute("SELECT name, object_path FROM datasets")}
+        stale = sorted(set(known) - set(present))
+        with self._lock:
+            conn = self._connection()
+            conn.executemany("DELETE FROM datasets WHERE name = ?", [(name,) for name in stale])
+            conn.commit()
+        objects_dir = os.path.realpath(os.path.join(root, ".objects"))
+        missing = []
+        for name, entry in present.items():
+            object_path = os.path.realpath(entry.path)
+            if known.get(name) == object_path:
+                continue
+            stat = entry.stat()
+            stem = os.path.splitext(os.path.basename(object_path))[0]
+            # Inhaltsadressierte Objekte heißen nach ihrem SHA-256
+            content_hash = stem if os.path.dirname(object_path) == objects_dir else None
+            details = describe(object_path) if describe else {}
+            missing.append((
+                name, entry.path, object_path, content_hash, stat.st_size,
+                details.get("rows"), details.get("columns"), stat.st_mtime, details.get("ingest_status"),
+            ))
+        self._upsert_many(missing)
+        added, removed = len(missing), len(stale)
+        if added or removed:
+            logger.info(f"Datensatz-Katalog abgeglichen: {added} eingetragen, {removed} entfernt.")
+        return {"added": added, "removed": removed}
+
+
+dataset_catalog = DatasetCatalog()
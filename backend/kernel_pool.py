@@ -0,0 +1,535 @@
+# coding_agent_backend/kernel_pool.py
+import ast
+import importlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+import weakref
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from task_context import raise_if_cancelled
+
+try:
+    import resource
+except ImportError:  # Nicht-Unix: ohne Speicherlimit
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Vorgestartete, freie Kernel; jeder Task bekommt einen eigenen Kernel
+PYTHON_KERNEL_POOL_SIZE = int(os.getenv("PYTHON_KERNEL_POOL_SIZE", "2"))
+# Obergrenze gleichzeitig laufender Kernel (= Tasks mit Python-Ausführung); darüber wird gewartet
+PYTHON_KERNEL_MAX = int(os.getenv("PYTHON_KERNEL_MAX", os.getenv("CREW_MAX_WORKERS", "4")))
+PYTHON_EXEC_TIMEOUT_SECONDS = float(os.getenv("PYTHON_EXEC_TIMEOUT_SECONDS", "60"))
+# Limit für privaten Speicher (Heap) je Kernel; memory-mappte Arrow-Kopien zählen nicht mit. 0 = kein Limit
+PYTHON_KERNEL_MEMORY_MB = int(os.getenv("PYTHON_KERNEL_MEMORY_MB", "4096"))
+PYTHON_KERNEL_START_TIMEOUT_SECONDS = float(os.getenv("PYTHON_KERNEL_START_TIMEOUT_SECONDS", "120"))
+# Zeitlimit für das Vorladen des Datensatzes als df (zählt nicht zum Zeitlimit des Codes)
+PYTHON_DATASET_BIND_TIMEOUT_SECONDS = float(os.getenv("PYTHON_DATASET_BIND_TIMEOUT_SECONDS", "120"))
+# Beim Start des Kernels importierte Module (fehlende werden übersprungen)
+PYTHON_KERNEL_PRELOAD = [
+    name.strip() for name in os.getenv("PYTHON_KERNEL_PRELOAD", "pandas,numpy,matplotlib.pyplot,seaborn").split(",") if name.strip()
+]
+
+
+# ---------------------------------------
+# ---    Code im Kernel-Prozess       ---
+# ---------------------------------------
+
+def sanitize_input(code: str) -> str:
+    """Entfernt Markdown-Codezäune und ein führendes ``python``, wie sie LLMs gern mitschicken."""
+    code = code.strip().strip("`")
+    if code.lower().startswith("python"):
+        code = code[len("python"):]
+    return code.strip().strip("`").strip()
+
+
+def run_code(namespace: Dict[str, Any], code: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Execute ``code`` in ``namespace`` and return everything it printed plus the
+    error (``ename``, ``evalue``, ``traceback`` as in nbformat) or None. Like an
+    interactive session, the value of a trailing expression is printed too.
+    """
+    buffer = io.StringIO()
+    error = None
+    with redirect_stdout(buffer), redirect_stderr(buffer):
+        try:
+            tree = ast.parse(code)
+            last_expression = None
+            if tree.body and isinstance(tree.body[-1], ast.Expr):
+                last_expression = ast.Expression(tree.body.pop().value)
+            exec(compile(tree, "<python-repl>", "exec"), namespace)
+            if last_expression is not None:
+                value = eval(compile(last_expression, "<python-repl>", "eval"), namespace)
+                if value is not None:
+                    print(repr(value))
+        except MemoryError:
+            raise
+        except Exception as e:
+            # Ohne den Frame von run_code selbst
+            frames = traceback.format_exception(type(e), e, e.__traceback__.tb_next)
+            error = {"ename": type(e).__name__, "evalue": str(e), "traceback": [line.rstrip("\n") for line in frames]}
+    return buffer.getvalue(), error
+
+
+def load_dataset(source: Dict[str, Optional[str]]) -> Any:
+    """
+    Load the task's dataset for the namespace. The Arrow copy is memory-mapped,
+    so its pages are shared with every other kernel reading the same file and
+    numeric columns without nulls are wrapped without copying; only without a
+    fresh Arrow copy is the CSV parsed.
+
+    ``split_blocks=True`` only avoids consolidating columns into one block: string
+    columns, and numeric columns with nulls, are still copied into the kernel's
+    private memory (strings as Python objects) and count against its memory limit.
+    """
+    if source.get("arrow"):
+        import pyarrow as pa
+        table = pa.ipc.open_file(pa.memory_map(source["arrow"], "r")).read_all()
+        return table.to_pandas(split_blocks=True)
+    import pandas as pd
+    return pd.read_csv(source["csv"])
+
+
+def load_sample(path: str) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Load a cached dataset sample (see ``tools.dataset_sample``) as DataFrame
+    plus ``sample_info`` with the population and sample size per stratum and
+    the weight (population rows per sampled row) of every row.
+    """
+    import pandas as pd
+    payload = pd.read_pickle(path)
+    frame, strata = payload["frame"], payload["strata"]
+    sampled = strata.value_counts()
+    info = {
+        "rows": payload["rows"],
+        "sampled_rows": len(frame),
+        "stratify_by": payload["stratify_by"],
+        "population": payload["population"],
+        "sampled": {label: int(count) for label, count in sampled.items()},
+        "strata": strata,
+        "weights": strata.map({label: payload["population"][label] / count for label, count in sampled.items()}).astype(float),
+    }
+    return frame, info
+
+
+def _kernel_main(conn: Any, preload: List[str], memory_mb: int) -> None:
+    os.environ.setdefault("MPLBACKEND", "Agg")  # kein GUI-Backend im Hintergrundprozess
+    for module in preload:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.info(f"Kernel: Modul '{module}' nicht vorgeladen: {e}")
+    if resource is not None and memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        # RLIMIT_DATA (Linux ≥ 4.7) begrenzt nur privaten Speicher; RLIMIT_AS würde auch das
+        # read-only mmap großer Arrow-Kopien zählen und dort mit MemoryError scheitern
+        resource.setrlimit(getattr(resource, "RLIMIT_DATA", resource.RLIMIT_AS), (limit, limit))
+
+    namespaces: Dict[str, Dict[str, Any]] = {}
+    conn.send(("ready", os.getpid()))
+    while True:
+        try:
+            op, session_id, payload = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            if op == "exec":
+                namespace = namespaces.setdefault(session_id, {"__name__": "__main__"})
+                output, error = run_code(namespace, payload)
+                conn.send(("ok", {"output": output, "error": error}))
+            elif op == "bind_dataset":
+                namespace = namespaces.setdefault(session_id, {"__name__": "__main__"})
+                namespace["dataset_path"] = payload["csv"]
+                namespace["df"] = load_dataset(payload)
+                note = None
+                # Die Stichprobe ergänzt df unter eigenem Namen und ersetzt es nie
+                if payload.get("sample"):
+                    namespace["df_sample"], namespace["sample_info"] = load_sample(payload["sample"])
+                    info = namespace["sample_info"]
+                    note = (
+                        f"df enthält alle {info['rows']} Zeilen; df_sample ist eine Zufallsstichprobe von "
+                        f"{info['sampled_rows']} Zeilen für schnelle Schätzungen (Gewichte in sample_info)."
+                    )
+                conn.send(("ok", note))
+            elif op == "drop":
+                namespaces.pop(session_id, None)
+                conn.send(("ok", None))
+            else:
+                conn.send(("error", f"Unbekannte Operation '{op}'"))
+        except MemoryError:
+            # Namespace verwerfen, der Parent ersetzt den Prozess danach
+            namespaces.pop(session_id, None)
+            conn.send(("memory", f"Speicherlimit von {memory_mb} MB überschritten."))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}\n{traceback.format_exc()}"))
+
+
+# ---------------------------------------
+# ---    Steuerung im Parent-Prozess  ---
+# ---------------------------------------
+
+class KernelTimeout(Exception):
+    """Die Ausführung hat das Zeitlimit überschritten; der Kernel wurde beendet."""
+
+
+class KernelDied(Exception):
+    """Der Kernel-Prozess ist unerwartet beendet worden."""
+
+
+@dataclass
+class CellResult:
+    """Ergebnis einer Ausführung im Kernel."""
+
+    output: str = ""
+    # nbformat-artig: ename, evalue, traceback; auch für Abbrüche (ename ExecutionAborted/KernelError)
+    error: Optional[Dict[str, Any]] = None
+    notes: List[str] = field(default_factory=list)
+    # Der Namespace ging vor oder während der Ausführung verloren
+    namespace_reset: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# Fehler, die nicht aus dem ausgeführten Code stammen
+KERNEL_ERRORS = ("ExecutionAborted", "KernelError")
+
+
+class _Kernel:
+    """Ein vorgestarteter Kernel-Prozess; Anfragen laufen seriell über eine Pipe."""
+
+    def __init__(self, ctx: Any, preload: List[str], memory_mb: int):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_kernel_main, args=(child_conn, preload, memory_mb), name="python-kernel", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.lock = threading.Lock()
+        # Task, dem der Kernel gerade gehört (None = frei), und dessen Namespaces darauf
+        self.owner: Optional[str] = None
+        self.sessions: Set[str] = set()
+        self.ready = False
+
+    def _wait_ready(self) -> None:
+        if not self.conn.poll(PYTHON_KERNEL_START_TIMEOUT_SECONDS):
+            raise KernelDied(f"Kernel {self.process.pid} wurde nicht rechtzeitig bereit.")
+        self.conn.recv()
+        self.ready = True
+
+    def request(self, op: str, session_id: str, payload: Any, timeout: Optional[float]) -> Tuple[str, Any]:
+        with self.lock:
+            try:
+                if not self.ready:
+                    self._wait_ready()  # Startzeit zählt nicht zum Zeitlimit der Ausführung
+                self.conn.send((op, session_id, payload))
+                if not self.conn.poll(timeout):
+                    raise KernelTimeout(f"Zeitlimit von {timeout:.0f}s überschritten.")
+                return self.conn.recv()
+            except (EOFError, OSError, BrokenPipeError) as e:
+                raise KernelDied(f"Kernel {self.process.pid} beendet (Exit-Code {self.process.exitcode}): {e}")
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class PythonKernelPool:
+    """
+    Pool of pre-started Python worker processes for the REPL tool.
+
+    Each kernel imports the heavy libraries (``PYTHON_KERNEL_PRELOAD``) once at
+    startup. A task gets a kernel of its own for as long as it runs: its
+    sessions (the task id and sub-sessions ``<task_id>:...``) each hold a
+    namespace there, so variables persist between executions of that session
+    but are invisible to others, and no task waits for another's code. ``size``
+    idle kernels are kept started; more are spawned on demand up to
+    ``max_kernels``, beyond that a task waits until one is released. An
+    execution that exceeds its wall-clock limit or the kernel's memory limit
+    gets the kernel killed and replaced; only the namespaces of that one task
+    are lost and its sessions are told so on their next execution. If a dataset
+    is passed to ``execute``, it is bound once per namespace as ``df`` (see
+    ``load_dataset``).
+    """
+
+    def __init__(
+        self,
+        size: int = PYTHON_KERNEL_POOL_SIZE,
+        max_kernels: int = PYTHON_KERNEL_MAX,
+        timeout: float = PYTHON_EXEC_TIMEOUT_SECONDS,
+        bind_timeout: float = PYTHON_DATASET_BIND_TIMEOUT_SECONDS,
+        memory_mb: int = PYTHON_KERNEL_MEMORY_MB,
+        preload: Optional[List[str]] = None,
+        start_method: str = "spawn",
+    ):
+        self.size = size
+        self.max_kernels = max(max_kernels, 1)
+        self.timeout = timeout
+        self.bind_timeout = bind_timeout
+        self.memory_mb = memory_mb
+        self.preload = PYTHON_KERNEL_PRELOAD if preload is None else preload
+        self._ctx = multiprocessing.get_context(start_method)
+        self._kernels: List[_Kernel] = []
+        self._assignments: Dict[str, _Kernel] = {}
+        self._reset_sessions: Set[str] = set()
+        self._bound_datasets: Dict[str, Dict[str, Optional[str]]] = {}
+        # Datensätze, deren Laden das Zeitlimit überschritten hat; überlebt _recycle,
+        # damit nicht jeder weitere Aufruf erneut lädt und den Kernel wieder verliert
+        self._failed_binds: Set[Tuple[Tuple[str, Optional[str]], ...]] = set()
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        # Werden mit jeder freigegebenen Session aufgerufen (schwach referenziert)
+        self._release_listeners: List[weakref.WeakMethod] = []
+        self.executions = 0
+        self.recycled = 0
+
+    def start(self) -> None:
+        """Startet alle Kernel im Hintergrund (idempotent); die Imports laufen parallel zum Backend."""
+        with self._lock:
+            while len(self._kernels) < min(self.size, self.max_kernels):
+                self._kernels.append(self._new_kernel())
+        logger.info(f"{self.size} Python-Kernel gestartet (Preload: {', '.join(self.preload) or '-'}).")
+
+    def wait_ready(self) -> None:
+        """Blockiert, bis alle Kernel ihre Preloads importiert haben (z.B. für das Pre-Warm beim Start)."""
+        self.start()
+        with self._lock:
+            kernels = list(self._kernels)
+        for kernel in kernels:
+            with kernel.lock:
+                if not kernel.ready:
+                    kernel._wait_ready()
+
+    def _new_kernel(self) -> _Kernel:
+        return _Kernel(self._ctx, self.preload, self.memory_mb)
+
+    def _lease(self, session_id: str) -> _Kernel:
+        owner = session_id.split(":", 1)[0]
+        with self._lock:
+            while True:
+                kernel = self._assignments.get(session_id) or next((k for k in self._kernels if k.owner == owner), None)
+                if kernel is None:
+                    kernel = next((k for k in self._kernels if k.owner is None), None)
+                if kernel is None and len(self._kernels) < self.max_kernels:
+                    kernel = self._new_kernel()
+                    self._kernels.append(kernel)
+                if kernel is not None:
+                    break
+                # Alle Kernel gehören laufenden Tasks – warten, bis einer frei wird (abbrechbar)
+                self._released.wait(timeout=1.0)
+                raise_if_cancelled()
+            kernel.owner = owner
+            kernel.sessions.add(session_id)
+            self._assignments[session_id] = kernel
+            # Für den nächsten Task wieder freie Kernel vorstarten
+            idle = sum(1 for k in self._kernels if k.owner is None)
+            while idle < self.size and len(self._kernels) < self.max_kernels:
+                self._kernels.append(self._new_kernel())
+                idle += 1
+            return kernel
+
+    def _recycle(self, kernel: _Kernel) -> None:
+        kernel.kill()
+        with self._lock:
+            for session_id in kernel.sessions:
+                self._assignments.pop(session_id, None)
+                self._bound_datasets.pop(session_id, None)
+                self._reset_sessions.add(session_id)
+            if kernel in self._kernels:
+                self._kernels[self._kernels.index(kernel)] = self._new_kernel()
+            self.recycled += 1
+            self._released.notify_all()
+        logger.warning(f"Python-Kernel {kernel.process.pid} ersetzt ({len(kernel.sessions)} Namespace(s) von Task {kernel.owner} verworfen).")
+
+    def run_cell(
+        self,
+        session_id: str,
+        code: str,
+        timeout: Optional[float] = None,
+        dataset: Optional[Dict[str, Optional[str]]] = None,
+    ) -> CellResult:
+        """
+        Execute ``code`` in the namespace of ``session_id``.
+        ``dataset`` (``{"csv": path, "arrow": path or None, "sample": path or None}``)
+        is bound as ``df`` before the first execution that passes it; with a
+        sample path, the sample is bound as ``df_sample`` in addition.
+        If loading takes longer than ``bind_timeout``, the code runs without
+        ``df`` on a fresh kernel and that dataset is not loaded again.
+        """
+        timeout = timeout or self.timeout
+        kernel = self._lease(session_id)
+        result = CellResult()
+        self._report_reset(session_id, result)
+        started = time.perf_counter()
+        try:
+            if dataset is not None and self._needs_bind(session_id, dataset):
+                note = self._bind_dataset(kernel, session_id, dataset)
+                if note:
+                    result.notes.append(note)
+                # Nach einem Timeout beim Laden läuft der Code auf einem neuen Kernel
+                kernel = self._lease(session_id)
+                self._report_reset(session_id, result)
+            status, payload = kernel.request("exec", session_id, code, timeout)
+        except (KernelTimeout, KernelDied) as e:
+            self._recycle(kernel)
+            return self._aborted(session_id, result, str(e))
+        finally:
+            self.executions += 1
+        logger.debug(f"Python-Ausführung für {session_id[:8]} in {time.perf_counter() - started:.3f}s ({status}).")
+        if status == "memory":
+            self._recycle(kernel)
+            return self._aborted(session_id, result, payload)
+        if status == "error":
+            result.error = {"ename": "KernelError", "evalue": f"Interner Fehler im Python-Kernel: {payload}", "traceback": []}
+            return result
+        result.output, result.error = payload["output"], payload["error"]
+        return result
+
+    def _report_reset(self, session_id: str, result: CellResult) -> None:
+        with self._lock:
+            if session_id not in self._reset_sessions:
+                return
+            self._reset_sessions.discard(session_id)
+        if not result.namespace_reset:
+            result.namespace_reset = True
+            result.notes.append("Der Python-Kernel wurde neu gestartet, frühere Variablen sind nicht mehr vorhanden.")
+
+    def _aborted(self, session_id: str, result: CellResult, reason: str) -> CellResult:
+        with self._lock:
+            self._reset_sessions.discard(session_id)  # wird direkt in dieser Antwort gemeldet
+        result.namespace_reset = True
+        result.error = {
+            "ename": "ExecutionAborted",
+            "evalue": f"Ausführung abgebrochen: {reason} Der Namespace wurde zurückgesetzt.",
+            "traceback": [],
+        }
+        return result
+
+    def execute(
+        self,
+        session_id: str,
+        code: str,
+        timeout: Optional[float] = None,
+        dataset: Optional[Dict[str, Optional[str]]] = None,
+    ) -> str:
+        """Like ``run_cell``, but returns the output as text for the REPL tool."""
+        result = self.run_cell(session_id, code, timeout, dataset)
+        text = "".join(f"Hinweis: {note}\n" for note in result.notes) + result.output
+        if result.error is not None:
+            if result.error["ename"] in KERNEL_ERRORS:
+                text += result.error["evalue"]
+            else:
+                text += f"{result.error['ename']}: {result.error['evalue']}\n"
+        return text
+
+    @staticmethod
+    def _dataset_key(dataset: Dict[str, Optional[str]]) -> Tuple[Tuple[str, Optional[str]], ...]:
+        return tuple(sorted(dataset.items()))
+
+    def _needs_bind(self, session_id: str, dataset: Dict[str, Optional[str]]) -> bool:
+        with self._lock:
+            return self._bound_datasets.get(session_id) != dataset and self._dataset_key(dataset) not in self._failed_binds
+
+    def _bind_dataset(self, kernel: _Kernel, session_id: str, dataset: Dict[str, Optional[str]]) -> str:
+        # Das Laden zählt nicht zum Zeitlimit des Codes; ohne Arrow-Kopie wird die CSV geparst
+        try:
+            status, output = kernel.request("bind_dataset", session_id, dataset, self.bind_timeout)
+        except KernelTimeout:
+            # Der Kernel hängt im Laden und wird ersetzt; der Code läuft dann ohne df.
+            # Eine neue Arrow-Kopie ergibt einen anderen Schlüssel und wird wieder versucht.
+            with self._lock:
+                self._failed_binds.add(self._dataset_key(dataset))
+            logger.warning(f"Datensatz {dataset['csv']} nicht in {self.bind_timeout:.0f}s geladen – Kernel wird ersetzt, df bleibt ungebunden.")
+            self._recycle(kernel)
+            return (
+                f"Der Datensatz konnte nicht in {self.bind_timeout:.0f}s als df vorgeladen werden; "
+                f"lade bei Bedarf nur benötigte Spalten selbst, z.B. pd.read_csv({dataset['csv']!r}, usecols=[...])."
+            )
+        with self._lock:
+            self._bound_datasets[session_id] = dataset  # auch bei Fehler, damit nicht jeder Aufruf erneut lädt
+        if status != "ok":
+            logger.warning(f"Datensatz {dataset['csv']} nicht vorgeladen: {output}")
+            return f"Der Datensatz konnte nicht als df vorgeladen werden ({str(output).splitlines()[0]})."
+        return output or ""
+
+    def add_release_listener(self, listener: Callable[[str], None]) -> None:
+        """
+        Registriert eine gebundene Methode, die bei jedem ``release`` mit dessen Session-ID
+        aufgerufen wird; sie räumt ihren Zustand für diese Session und deren Unter-Sessions
+        ``<session_id>:...`` auf. Die Methode wird nur schwach referenziert und hält ihr
+        Objekt nicht am Leben.
+        """
+        with self._lock:
+            self._release_listeners = [ref for ref in self._release_listeners if ref() is not None]
+            self._release_listeners.append(weakref.WeakMethod(listener))
+
+    def release(self, session_id: str) -> None:
+        """
+        Gibt den Namespace einer Session frei (z.B. wenn der Task beendet ist), samt
+        aller Unter-Sessions ``<session_id>:...`` (etwa die Notebook-Sessions des Tasks).
+        Hat der Task danach keine Namespaces mehr, wird sein Kernel wieder frei.
+        """
+        with self._lock:
+            sessions = [s for s in self._assignments if s == session_id or s.startswith(f"{session_id}:")]
+            released = []
+            for session in sessions:
+                self._bound_datasets.pop(session, None)
+                kernel = self._assignments.pop(session)
+                kernel.sessions.discard(session)
+                released.append((session, kernel))
+            self._reset_sessions.discard(session_id)
+            listeners = [ref() for ref in self._release_listeners]
+        for session, kernel in released:
+            try:
+                kernel.request("drop", session, None, self.timeout)
+            except (KernelTimeout, KernelDied) as e:
+                logger.info(f"Namespace {session[:8]} konnte nicht freigegeben werden: {e}")
+        for listener in listeners:
+            if listener is None:
+                continue
+            try:
+                listener(session_id)
+            except Exception as e:
+                logger.warning(f"Release-Listener für Session {session_id[:8]} fehlgeschlagen: {e}")
+        surplus = []
+        with self._lock:
+            for kernel in [k for k in self._kernels if k.owner == session_id and not k.sessions]:
+                kernel.owner = None
+                # Mehr freie Kernel als vorgehalten werden beenden, statt Speicher zu belegen
+                if sum(1 for k in self._kernels if k.owner is None) > self.size:
+                    self._kernels.remove(kernel)
+                    surplus.append(kernel)
+            self._released.notify_all()
+        for kernel in surplus:
+            kernel.kill()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "max_kernels": self.max_kernels,
+                "kernels": len(self._kernels),
+                "idle": sum(1 for k in self._kernels if k.owner is None),
+                "alive": sum(1 for k in self._kernels if k.process.is_alive()),
+                "sessions": len(self._assignments),
+                "executions": self.executions,
+                "recycled": self.recycled,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            kernels, self._kernels = self._kernels, []
+            self._assignments.clear()
+        for kernel in kernels:
+            kernel.kill()
+
+
+python_kernel_pool = PythonKernelPool()
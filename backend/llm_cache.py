@@ -0,0 +1,212 @@
+# coding_agent_backend/llm_cache.py
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(__file__), "db", "llm_cache.sqlite3"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))  # 0 = kein Ablauf
+# Standardmodus für Tasks ohne eigene Angabe
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "off")
+
+# "off": kein Cache, "read_write": Treffer verwenden und Fehlschläge speichern,
+# "record": immer das Modell fragen und speichern, "replay": nur aus dem Cache (Fehlschlag = Fehler)
+CACHE_MODES = ("off", "read_write", "record", "replay")
+
+
+class LLMCacheMiss(Exception):
+    """Im Replay-Modus gibt es für einen Aufruf keine gespeicherte Antwort."""
+
+
+def _normalize_messages(messages: Any) -> List[Dict[str, str]]:
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    return [
+        {"role": str(message.get("role", "")), "content": str(message.get("content") or "").strip()}
+        for message in messages
+    ]
+
+
+def make_cache_key(model: str, messages: Any, temperature: Optional[float], stop: Any, tools: Any = None) -> str:
+    """Stable key over model, normalized messages, temperature, stop sequences and tool names."""
+    tool_names = sorted(
+        (tool.get("function", tool).get("name", "") if isinstance(tool, dict) else str(tool)) for tool in tools or []
+    )
+    payload = {
+        "model": model,
+        "messages": _normalize_messages(messages),
+        "temperature": temperature,
+        "stop": sorted(stop) if isinstance(stop, (list, tuple)) else stop,
+        "tools": tool_names,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    On-disk response cache in sqlite.
+
+    Entries expire after ``ttl_seconds`` (except in replay mode, which must be
+    deterministic) and the least recently used ones are evicted once the stored
+    responses exceed ``max_bytes``. Safe to use from several threads and, thanks
+    to WAL mode, from the crew worker processes.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_BYTES, ttl_seconds: float = LLM_CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Lazy, damit Import und Prozessstart ohne Dateizugriff auskommen
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, response TEXT,"
+                " size INTEGER, created_at REAL, last_used REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str, ignore_ttl: bool = False) -> Optional[str]:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if not ignore_ttl and self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            return response
+
+    def put(self, key: str, model: str, response: str) -> None:
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now),
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if total - freed <= self.max_bytes:
+                break
+            victims.append((key,))
+            freed += size
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        logger.info(f"LLM-Cache: {len(victims)} Einträge verdrängt ({freed} Bytes).")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, total = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": entries, "bytes": total, "max_bytes": self.max_bytes, "ttl_seconds": self.ttl_seconds}
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+
+@dataclass
+class CacheSession:
+    """Cache-Modus und Zähler eines Tasks."""
+
+    mode: str
+    hits: int = 0
+    misses: int = 0
+    stored: int = 0
+
+    def summary(self) -> str:
+        return f"LLM-Cache ({self.mode}): {self.hits} Treffer, {self.misses} Fehlschläge, {self.stored} gespeichert."
+
+
+llm_response_cache = LLMResponseCache()
+
+# Session des Tasks im aktuellen Kontext; run_blocking kopiert den Kontext in den Worker-Thread
+_current_session: contextvars.ContextVar[Optional[CacheSession]] = contextvars.ContextVar(
+    "llm_cache_session", default=None
+)
+
+
+@contextmanager
+def cache_session(mode: Optional[str] = None) -> Iterator[CacheSession]:
+    """Aktiviert den Cache im aktuellen Kontext mit ``mode`` (Standard: LLM_CACHE_MODE)."""
+    mode = mode or LLM_CACHE_MODE
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unbekannter LLM-Cache-Modus '{mode}'. Erlaubt: {', '.join(CACHE_MODES)}")
+    session = CacheSession(mode)
+    token = _current_session.set(session)
+    try:
+        yield session
+    finally:
+        _current_session.reset(token)
+
+
+def install_llm_cache(llm: Any, cache: LLMResponseCache = llm_response_cache) -> Any:
+    """
+    Wrap ``llm.call`` so it consults ``cache`` according to the current task's
+    cache session. Without a session (or in mode ``off``) calls go straight to
+    the model. Calls that execute functions or request a response model are
+    never cached, and only string responses are stored.
+
+    The wrapper is set on the instance because crewai's ``LLM`` returns
+    provider-specific subclasses, so subclassing it is not reliable.
+    """
+    original_call = llm.call
+    if getattr(original_call, "_llm_cache_installed", False):
+        return llm
+
+    def cached_call(messages: Any, tools: Any = None, callbacks: Any = None, available_functions: Any = None, **kwargs: Any) -> Any:
+        session = _current_session.get()
+        if session is None or session.mode == "off" or available_functions or kwargs.get("response_model"):
+            return original_call(messages, tools, callbacks, available_functions, **kwargs)
+
+        key = make_cache_key(llm.model, messages, getattr(llm, "temperature", None), getattr(llm, "stop", None), tools)
+        if session.mode != "record":
+            cached = cache.get(key, ignore_ttl=session.mode == "replay")
+            if cached is not None:
+                session.hits += 1
+                return cached
+            session.misses += 1
+            if session.mode == "replay":
+                raise LLMCacheMiss(f"Keine gespeicherte Antwort für {llm.model} (Schlüssel {key[:12]}).")
+
+        response = original_call(messages, tools, callbacks, available_functions, **kwargs)
+        if isinstance(response, str):
+            cache.put(key, llm.model, response)
+            session.stored += 1
+        return response
+
+    cached_call._llm_cache_installed = True
+    object.__setattr__(llm, "call", cached_call)  # pydantic-Modell: Attribut direkt an der Instanz setzen
+    return llm
@@ -1,8 +1,9 @@
 # coding_agent_backend/llm_config.py
-from crewai import LLM
 from dotenv import load_dotenv
 import os
 import logging
+import threading
+from typing import Any, Dict
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -11,19 +12,55 @@ google_api_key = os.getenv("GOOGLE_API_KEY")
 
 #openrouter_api_base = os.getenv("OPENROUTER_API_BASE", "https://openrouter.ai/api/v1")
 
-# Standard LLM für die Worker-Agenten, konfiguriert für OpenRouter
-default_llm = LLM(
-    model="openrouter/deepseek/deepseek-chat-v3-0324:free",
-    api_key=os.environ['OPENAI_API_KEY'],
-    temperature=0.3,
-)
-
-# LLM für den Manager der Crew, konfiguriert für OpenRouter
-manager_llm = LLM(
-    model="openrouter/deepseek/deepseek-chat-v3-0324:free",
-    api_key=os.environ['OPENAI_API_KEY'],
-    temperature=0.1,
-)
-
-print(f"LLM Config: Default model - {default_llm.model}")
-print(f"LLM Config: Manager model - {manager_llm.model}")
\ No newline at end of file
+# Die LLM-Clients werden erst beim ersten Zugriff auf ``llm_config.default_llm`` bzw.
+# ``llm_config.manager_llm`` erstellt – der Import dieses Moduls lädt crewai nicht.
+_LLM_SETTINGS: Dict[str, Dict[str, Any]] = {
+    # Standard LLM für die Worker-Agenten, konfiguriert für OpenRouter
+    "default_llm": dict(model="openrouter/deepseek/deepseek-chat-v3-0324:free", temperature=0.3),
+    # LLM für den Manager der Crew, konfiguriert für OpenRouter
+    "manager_llm": dict(model="openrouter/deepseek/deepseek-chat-v3-0324:free", temperature=0.1),
+}
+DEFAULT_LLM_MODEL = _LLM_SETTINGS["default_llm"]["model"]
+MANAGER_LLM_MODEL = _LLM_SETTINGS["manager_llm"]["model"]
+
+_llms: Dict[str, Any] = {}
+_llms_lock = threading.Lock()
+
+
+def _build_llm(name: str) -> Any:
+    from crewai import LLM
+
+    from llm_cache import install_llm_cache
+    from llm_rate_limiter import install_rate_limiter
+
+    llm = LLM(api_key=os.environ['OPENAI_API_KEY'], **_LLM_SETTINGS[name])
+    # Gemeinsame Drosselung aller Crews; der Cache liegt außen, damit Treffer kein Kontingent verbrauchen.
+    # Der Antwort-Cache ist nur in Tasks mit eingeschaltetem Cache aktiv (siehe llm_cache.cache_session)
+    install_rate_limiter(llm)
+    install_llm_cache(llm)
+    logger.info(f"LLM Config: {'Default' if name == 'default_llm' else 'Manager'} model - {llm.model}")
+    return llm
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LLM_SETTINGS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _llms_lock:
+        if name not in _llms:
+            _llms[name] = _build_llm(name)
+        return _llms[name]
+
+
+def override_llms(default_llm: Any, manager_llm: Any) -> None:
+    """
+    Ersetzt die LLM-Clients, z.B. durch ein lokales Fake-LLM für Benchmarks (siehe
+    benchmarks/fake_llm.py). Muss vor dem ersten Erstellen der Crew-Vorlagen laufen.
+    """
+    from llm_cache import install_llm_cache
+    from llm_rate_limiter import install_rate_limiter
+
+    with _llms_lock:
+        for name, llm in (("default_llm", default_llm), ("manager_llm", manager_llm)):
+            install_rate_limiter(llm)
+            install_llm_cache(llm)
+            _llms[name] = llm
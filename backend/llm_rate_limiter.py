@@ -0,0 +1,468 @@
+# coding_agent_backend/llm_rate_limiter.py
+import contextvars
+import email.utils
+import functools
+import importlib
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from task_context import TaskCancelled, current_cancel_event, current_task_id, raise_if_cancelled
+
+logger = logging.getLogger(__name__)
+
+# Standardlimits pro Modell (0 = unbegrenzt); OpenRouter-Free-Tier erlaubt 20 Requests/Minute
+LLM_RPM = float(os.getenv("LLM_RPM", "20"))
+LLM_TPM = float(os.getenv("LLM_TPM", "0"))
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "4"))
+# Abweichende Limits pro Modell als JSON, z.B. {"deepseek/deepseek-chat-v3-0324:free": {"rpm": 20, "tpm": 100000}}
+LLM_RATE_LIMITS = json.loads(os.getenv("LLM_RATE_LIMITS", "{}"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1.0"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "60"))
+# Angenommene Antwortlänge für die Token-Schätzung vor dem Aufruf
+LLM_ESTIMATED_COMPLETION_TOKENS = int(os.getenv("LLM_ESTIMATED_COMPLETION_TOKENS", "512"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Grobe Schätzung (~4 Zeichen pro Token); genau genug für die Drosselung."""
+    return max(1, len(text) // 4)
+
+
+def _messages_text(messages: Any) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "".join(str(message.get("content") or "") for message in messages)
+
+
+class TokenBucket:
+    """Bucket with ``capacity`` units that refills at ``capacity`` per minute. Capacity 0 means unlimited."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` units are available (0 if available now)."""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill(now)
+        # Anfragen größer als die Kapazität warten auf einen vollen Bucket statt ewig
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60.0 / self.capacity
+
+    def consume(self, amount: float) -> None:
+        if self.capacity > 0:
+            self.tokens -= amount
+
+
+class ModelLimiter:
+    """
+    Requests-per-minute and tokens-per-minute buckets plus an in-flight cap for
+    one model. Waiting callers are grouped by task and admitted round-robin
+    across tasks (FIFO within a task), so one busy crew cannot starve others.
+    """
+
+    def __init__(self, model: str, rpm: float, tpm: float, max_in_flight: int):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self._cond = threading.Condition()
+        self._waiting: "OrderedDict[str, Deque[object]]" = OrderedDict()
+
+    def acquire(self, task_key: str, estimated_tokens: int) -> None:
+        ticket = object()
+        with self._cond:
+            self._waiting.setdefault(task_key, deque()).append(ticket)
+            try:
+                while True:
+                    raise_if_cancelled()
+                    wait = self._admission_wait(task_key, ticket, estimated_tokens)
+                    if wait == 0.0:
+                        break
+                    # Spätestens jede Sekunde aufwachen, damit abgebrochene Tasks nicht weiter warten
+                    self._cond.wait(timeout=min(wait, 1.0) if wait is not None else 1.0)
+            except BaseException:
+                self._drop_ticket(task_key, ticket)
+                self._cond.notify_all()
+                raise
+            self._drop_ticket(task_key, ticket)
+            if task_key in self._waiting:
+                self._waiting.move_to_end(task_key)  # nächster Task ist an der Reihe
+            self.requests.consume(1)
+            self.tokens.consume(estimated_tokens)
+            self.in_flight += 1
+            self._cond.notify_all()
+
+    def _admission_wait(self, task_key: str, ticket: object, estimated_tokens: int) -> Optional[float]:
+        """0.0 wenn ``ticket`` jetzt starten darf, sonst die Wartezeit (None = bis zur nächsten Benachrichtigung)."""
+        head_task = next(iter(self._waiting))
+        if head_task != task_key or self._waiting[task_key][0] is not ticket:
+            return None
+        if self.in_flight >= self.max_in_flight > 0:
+            return None
+        now = time.monotonic()
+        wait = max(
+            self.blocked_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(estimated_tokens, now),
+        )
+        return wait if wait > 0 else 0.0
+
+    def _drop_ticket(self, task_key: str, ticket: object) -> None:
+        queue = self._waiting.get(task_key)
+        if queue is not None:
+            queue.remove(ticket)
+            if not queue:
+                del self._waiting[task_key]
+
+    def release(self, estimated_tokens: int, actual_tokens: int) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            # Schätzung korrigieren, damit das TPM-Budget den echten Verbrauch widerspiegelt
+            self.tokens.consume(actual_tokens - estimated_tokens)
+            self._cond.notify_all()
+
+    def block_for(self, seconds: float) -> None:
+        """Pausiert alle Aufrufe für dieses Modell (nach einem 429 des Providers)."""
+        with self._cond:
+            self.throttled += 1
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "rpm": self.requests.capacity,
+                "tpm": self.tokens.capacity,
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self.in_flight,
+                "waiting": sum(len(queue) for queue in self._waiting.values()),
+                "waiting_tasks": len(self._waiting),
+                "throttled": self.throttled,
+            }
+
+
+class RateLimitExceeded(Exception):
+    """Der Provider hat auch nach allen Wiederholungen mit 429 geantwortet."""
+
+
+def _error_chain(error: BaseException) -> Iterator[BaseException]:
+    seen = set()
+    current: Optional[BaseException] = error
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        yield current
+        current = current.__cause__ or current.__context__
+
+
+# Nur für Fehler ohne Statuscode: die Meldung muss ausdrücklich einen HTTP-Status 429 nennen
+_HTTP_429_PATTERN = re.compile(r"\b(?:http(?:\s+status)?|status(?:\s+code)?|error\s+code)\s*[:=]?\s*429\b", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1)
+def _provider_rate_limit_errors() -> tuple:
+    """RateLimitError-Typen der installierten Provider-SDKs."""
+    types = []
+    for module_name in ("openai", "anthropic", "litellm"):
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        error_type = getattr(module, "RateLimitError", None)
+        if isinstance(error_type, type):
+            types.append(error_type)
+    return tuple(types)
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    for candidate in (getattr(error, "status_code", None), getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(candidate, int):
+            return candidate
+    return None
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """True nur für HTTP 429 bzw. die RateLimitError-Typen der Provider, nicht für beliebige Texte mit "429"."""
+    provider_types = _provider_rate_limit_errors()
+    for current in _error_chain(error):
+        if provider_types and isinstance(current, provider_types):
+            return True
+        status = _status_code(current)
+        if status is not None:
+            if status == 429:
+                return True
+            continue  # Anderer HTTP-Status: kein Rate-Limit, auch wenn die Meldung es erwähnt
+        if _HTTP_429_PATTERN.search(str(current)):
+            return True
+    return False
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Liest Retry-After (Sekunden oder HTTP-Datum) aus der Provider-Antwort, falls vorhanden."""
+    for current in _error_chain(error):
+        headers = getattr(getattr(current, "response", None), "headers", None) or {}
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        if not value:
+            continue
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            logger.debug(f"Retry-After nicht lesbar: {value!r}")
+    return None
+
+
+def backoff_delay(attempt: int, base: float = LLM_BACKOFF_BASE_SECONDS, cap: float = LLM_BACKOFF_MAX_SECONDS) -> float:
+    """Exponentieller Backoff mit vollem Jitter."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class _RemoteLimiterClient:
+    """Worker side of ``serve_remote_limiter``: request/response over one pipe, usable from any thread."""
+
+    def __init__(self, conn: Any):
+        self.conn = conn
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._pending: Dict[int, List[Any]] = {}
+        threading.Thread(target=self._read, name="rate-limit-client", daemon=True).start()
+
+    def send(self, *message: Any) -> None:
+        with self._send_lock:
+            self.conn.send(message)
+
+    def call(self, op: str, *args: Any) -> int:
+        call_id = next(self._ids)
+        slot = [threading.Event(), None, None]
+        with self._lock:
+            self._pending[call_id] = slot
+        self.send(op, call_id, *args)
+        slot[0].wait()
+        status, detail = slot[1], slot[2]
+        if status == "cancelled":
+            raise TaskCancelled(f"Task {current_task_id.get() or '?'} wurde abgebrochen.")
+        if status != "ok":
+            raise RuntimeError(f"Rate-Limiter des Hauptprozesses nicht erreichbar: {detail}")
+        return call_id
+
+    def _read(self) -> None:
+        while True:
+            try:
+                call_id, status, detail = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                slot = self._pending.pop(call_id, None)
+            if slot is not None:
+                slot[1], slot[2] = status, detail
+                slot[0].set()
+        # Hauptprozess weg: wartende Aufrufe nicht ewig blockieren
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+        for slot in pending:
+            slot[1], slot[2] = "error", "Verbindung beendet"
+            slot[0].set()
+
+
+class RemoteModelLimiter:
+    """Same interface as ``ModelLimiter``, but the buckets live in the main process."""
+
+    def __init__(self, client: _RemoteLimiterClient, model: str):
+        self.client = client
+        self.model = model
+        self._calls = threading.local()  # acquire/release laufen paarweise im selben Thread
+
+    def acquire(self, task_key: str, estimated_tokens: int) -> None:
+        call_id = self.client.call("acquire", self.model, task_key, estimated_tokens)
+        self._calls.__dict__.setdefault("ids", []).append(call_id)
+
+    def release(self, estimated_tokens: int, actual_tokens: int) -> None:
+        ids = self._calls.__dict__.get("ids")
+        if ids:
+            self.client.send("release", ids.pop(), self.model, actual_tokens)
+
+    def block_for(self, seconds: float) -> None:
+        self.client.send("block", None, self.model, seconds)
+
+
+class LLMRateLimiter:
+    """
+    Process-wide registry of per-model limiters. In crew worker processes
+    (``use_remote``) the limiters are proxies to the main process, so all
+    workers share one budget per model instead of a fixed share each.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, Any] = {}
+        self._remote: Optional[_RemoteLimiterClient] = None
+        self._lock = threading.Lock()
+
+    def use_remote(self, conn: Any) -> None:
+        """Im Worker-Prozess: Limits nicht lokal führen, sondern über ``conn`` beim Hauptprozess anfragen."""
+        with self._lock:
+            self._remote = _RemoteLimiterClient(conn)
+            self._models.clear()
+
+    def for_model(self, model: str) -> Any:
+        with self._lock:
+            limiter = self._models.get(model)
+            if limiter is None:
+                if self._remote is not None:
+                    limiter = self._models[model] = RemoteModelLimiter(self._remote, model)
+                    return limiter
+                limits = LLM_RATE_LIMITS.get(model, {})
+                limiter = self._models[model] = ModelLimiter(
+                    model,
+                    rpm=float(limits.get("rpm", LLM_RPM)),
+                    tpm=float(limits.get("tpm", LLM_TPM)),
+                    max_in_flight=int(limits.get("max_in_flight", LLM_MAX_IN_FLIGHT)),
+                )
+            return limiter
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            limiters = [limiter for limiter in self._models.values() if isinstance(limiter, ModelLimiter)]
+        return {limiter.model: limiter.stats() for limiter in limiters}
+
+
+llm_rate_limiter = LLMRateLimiter()
+
+
+class _AnyEvent:
+    def __init__(self, *events: Any):
+        self.events = [event for event in events if event is not None]
+
+    def is_set(self) -> bool:
+        return any(event.is_set() for event in self.events)
+
+
+def serve_remote_limiter(conn: Any, executor: Executor, cancel_event: Any = None, limiter: LLMRateLimiter = llm_rate_limiter) -> None:
+    """
+    Main-process side of ``LLMRateLimiter.use_remote`` for one worker process;
+    returns when the worker's end of ``conn`` is closed. Each acquire waits in
+    ``executor``, so the models' fair per-task queues span all workers.
+    ``cancel_event`` (the worker's cancel flag) ends waiting acquires with
+    "cancelled". Slots still held when the worker goes away are released.
+    """
+    lock = threading.Lock()
+    held: Dict[int, Tuple[ModelLimiter, int]] = {}
+    gone = threading.Event()
+    cancelled = _AnyEvent(cancel_event, gone)
+
+    def reply(call_id: int, status: str, detail: Any = None) -> None:
+        with lock:
+            if not gone.is_set():
+                try:
+                    conn.send((call_id, status, detail))
+                except (OSError, ValueError):
+                    pass
+
+    def acquire(call_id: int, model: str, task_key: str, estimated: int) -> None:
+        model_limiter = limiter.for_model(model)
+        current_cancel_event.set(cancelled)  # läuft in einem eigenen, leeren Kontext
+        try:
+            model_limiter.acquire(task_key, estimated)
+        except TaskCancelled:
+            reply(call_id, "cancelled")
+            return
+        except Exception as e:
+            reply(call_id, "error", str(e))
+            return
+        with lock:
+            if not gone.is_set():
+                try:
+                    conn.send((call_id, "ok", None))
+                    held[call_id] = (model_limiter, estimated)
+                    return
+                except (OSError, ValueError):
+                    pass
+        model_limiter.release(estimated, estimated)
+
+    try:
+        while True:
+            try:
+                op, call_id, model, *args = conn.recv()
+            except (EOFError, OSError):
+                break
+            if op == "acquire":
+                executor.submit(contextvars.Context().run, acquire, call_id, model, *args)
+            elif op == "release":
+                with lock:
+                    entry = held.pop(call_id, None)
+                if entry is not None:
+                    entry[0].release(entry[1], args[0])
+            elif op == "block":
+                limiter.for_model(model).block_for(args[0])
+    finally:
+        with lock:
+            gone.set()
+            leftovers = list(held.values())
+            held.clear()
+        for model_limiter, estimated in leftovers:
+            model_limiter.release(estimated, estimated)
+        conn.close()
+
+def install_rate_limiter(llm: Any, limiter: LLMRateLimiter = llm_rate_limiter) -> Any:
+    """
+    Wrap ``llm.call`` so every request passes the model's limiter and rate-limit
+    errors are retried with jittered exponential backoff, honouring Retry-After.
+    Calls are queued fairly per task (see ``task_context.task_scope``).
+    Like ``llm_cache.install_llm_cache`` the wrapper is set on the instance.
+    """
+    original_call = llm.call
+    if getattr(original_call, "_rate_limiter_installed", False):
+        return llm
+
+    def limited_call(messages: Any, *args: Any, **kwargs: Any) -> Any:
+        model_limiter = limiter.for_model(llm.model)
+        completion_tokens = getattr(llm, "max_tokens", None) or LLM_ESTIMATED_COMPLETION_TOKENS
+        estimated = estimate_tokens(_messages_text(messages)) + completion_tokens
+        task_key = current_task_id.get()
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            # Abgebrochene Tasks verbrauchen kein weiteres Kontingent
+            raise_if_cancelled()
+            model_limiter.acquire(task_key, estimated)
+            actual = estimated
+            try:
+                response = original_call(messages, *args, **kwargs)
+                actual = estimate_tokens(_messages_text(messages)) + estimate_tokens(str(response))
+                return response
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                if attempt == LLM_MAX_RETRIES:
+                    raise RateLimitExceeded(f"Rate-Limit für {llm.model} nach {attempt + 1} Versuchen: {e}") from e
+                delay = retry_after_seconds(e)
+                delay = delay if delay is not None else backoff_delay(attempt)
+                logger.warning(f"Rate-Limit für {llm.model} (Versuch {attempt + 1}) – pausiere {delay:.1f}s.")
+                model_limiter.block_for(delay)
+            finally:
+                model_limiter.release(estimated, actual)
+
+    limited_call._rate_limiter_installed = True
+    object.__setattr__(llm, "call", limited_call)  # pydantic-Modell: Attribut direkt an der Instanz setzen
+    return llm
@@ -0,0 +1,97 @@
+# coding_agent_backend/log_config.py
+import atexit
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Standard-Ausführlichkeit der Crew-Logs; pro Task über StartTaskRequest.log_verbosity überschreibbar
+LOG_VERBOSITY = os.getenv("LOG_VERBOSITY", "normal")
+# Anteil der LLM-Aufrufe, deren vollständige Prompts in Stufe "verbose" geloggt werden ("debug": alle)
+LOG_PROMPT_SAMPLE_RATE = float(os.getenv("LOG_PROMPT_SAMPLE_RATE", "0.05"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# "minimal": nur Agenten-Schritte, Tool-Ergebnisse, Fehler und Ergebnis (keine LLM-/Ketten-Events)
+# "normal":  dazu LLM- und Ketten-Events sowie eine Zeile pro LLM-Aufruf im Server-Log
+# "verbose": dazu vollständige Tool-Inputs und eine Stichprobe der Prompts im Server-Log
+# "debug":   alle Prompts, dazu langchain.debug
+VERBOSITY_TIERS = ("minimal", "normal", "verbose", "debug")
+
+
+def resolve_verbosity(tier: Optional[str] = None) -> str:
+    """``tier`` oder LOG_VERBOSITY; unbekannte Stufen sind ein ValueError."""
+    tier = tier or LOG_VERBOSITY
+    if tier not in VERBOSITY_TIERS:
+        raise ValueError(f"Unbekannte Log-Stufe '{tier}'. Erlaubt: {', '.join(VERBOSITY_TIERS)}")
+    return tier
+
+
+def verbosity_at_least(tier: str, minimum: str) -> bool:
+    return VERBOSITY_TIERS.index(tier) >= VERBOSITY_TIERS.index(minimum)
+
+
+def should_log_prompt(tier: str) -> bool:
+    """Entscheidet pro LLM-Aufruf, ob die vollständigen Prompts geloggt werden (Stichprobe)."""
+    if tier == "debug":
+        return True
+    return tier == "verbose" and random.random() < LOG_PROMPT_SAMPLE_RATE
+
+
+class LazyMessage:
+    """Log-Argument, das erst formatiert wird, wenn ein Handler den Record tatsächlich ausgibt."""
+
+    __slots__ = ("func", "args")
+
+    def __init__(self, func: Callable[..., str], *args: Any):
+        self.func = func
+        self.args = args
+
+    def __str__(self) -> str:
+        return self.func(*self.args)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without formatting them first and
+    never blocks: if the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Im selben Prozess muss nichts serialisiert werden – formatiert wird im Listener-Thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+
+
+def install_async_logging() -> Optional[QueueListener]:
+    """
+    Replaces the root logger's handlers with a ``NonBlockingQueueHandler`` and
+    writes the records from a ``QueueListener`` thread through the original
+    handlers, so neither the crew threads nor the event loop wait for log I/O.
+    Idempotent; call after ``logging.basicConfig``.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+    root = logging.getLogger()
+    handlers = root.handlers[:] or [logging.StreamHandler()]
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(LOG_QUEUE_SIZE)
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    root.handlers = [NonBlockingQueueHandler(log_queue)]
+    atexit.register(_listener.stop)
+    return _listener
@@ -0,0 +1,208 @@
+# coding_agent_backend/log_delivery.py
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, List, Optional
+
+import metrics
+from log_protocol import LEGACY, LogEvent, encode_batch, split_event, system_event
+
+logger = logging.getLogger(__name__)
+
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL_MS", "25")) / 1000
+LOG_MAX_BATCH_BYTES = int(os.getenv("LOG_MAX_BATCH_BYTES", str(64 * 1024)))
+LOG_SUBSCRIBER_BUFFER_BYTES = int(os.getenv("LOG_SUBSCRIBER_BUFFER_BYTES", str(1024 * 1024)))
+# "drop_oldest", "compact" oder "disconnect"
+LOG_SLOW_CONSUMER_POLICY = os.getenv("LOG_SLOW_CONSUMER_POLICY", "drop_oldest")
+
+# Nachhalten der Task-Logs für späte oder wiederverbundene Clients
+LOG_REPLAY_MAX_EVENTS = int(os.getenv("LOG_REPLAY_MAX_EVENTS", "10000"))
+LOG_REPLAY_RETENTION_SECONDS = float(os.getenv("LOG_REPLAY_RETENTION_SECONDS", "600"))
+
+
+class TaskEventLog:
+    """
+    Bounded, sequenced log of all events of one task.
+
+    Sequence numbers start at 1 and increase by one per message, so a client
+    that has seen everything up to ``seq`` can resume with ``since(seq)``. Only
+    the newest ``max_events`` events are retained.
+    """
+
+    def __init__(self, max_events: int = LOG_REPLAY_MAX_EVENTS):
+        self.events: Deque[LogEvent] = deque(maxlen=max_events)
+        self.last_seq = 0
+        self.finished_at: Optional[float] = None
+
+    def append(self, event: LogEvent) -> int:
+        self.last_seq += 1
+        event.seq = self.last_seq
+        self.events.append(event)
+        return self.last_seq
+
+    @property
+    def first_seq(self) -> int:
+        return self.events[0].seq if self.events else self.last_seq + 1
+
+    def since(self, seq: int) -> List[LogEvent]:
+        """All retained events with a sequence number greater than ``seq``."""
+        if seq >= self.last_seq:
+            return []
+        skip = max(0, seq - self.first_seq + 1)
+        return list(self.events)[skip:]
+
+    def replay(self, seq: int) -> List[LogEvent]:
+        """Backlog for a client resuming after ``seq``, led by a note if older events were already dropped."""
+        backlog = self.since(seq)
+        if seq + 1 < self.first_seq:
+            backlog.insert(0, system_event(f"Log-Zeilen {seq + 1}-{self.first_seq - 1} sind nicht mehr verfügbar."))
+        return backlog
+
+    def mark_finished(self) -> None:
+        if self.finished_at is None:
+            self.finished_at = time.time()
+
+    def expired(self, retention_seconds: float = LOG_REPLAY_RETENTION_SECONDS) -> bool:
+        return self.finished_at is not None and time.time() - self.finished_at > retention_seconds
+
+
+class Subscriber:
+    """
+    Send queue of a single WebSocket client.
+
+    Events are buffered and written by a dedicated sender task, batched every
+    ``flush_interval`` seconds or as soon as ``max_batch_bytes`` are pending.
+    The batch is encoded in the subscriber's ``fmt`` (see ``log_protocol``):
+    typed formats send it as one frame and split large payloads into chunks
+    first, the legacy text format sends one frame per event.
+    A slow client therefore only fills its own bounded buffer; when that exceeds
+    ``buffer_bytes`` the slow-consumer policy applies: ``drop_oldest`` discards
+    the oldest unprotected events, ``compact`` collapses the backlog to the
+    protected events plus a note, and ``disconnect`` closes the socket (code 1013).
+    """
+
+    def __init__(
+        self,
+        websocket: Any,
+        task_id: str,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+        max_batch_bytes: int = LOG_MAX_BATCH_BYTES,
+        buffer_bytes: int = LOG_SUBSCRIBER_BUFFER_BYTES,
+        policy: str = LOG_SLOW_CONSUMER_POLICY,
+        fmt: str = LEGACY,
+    ):
+        self.websocket = websocket
+        self.task_id = task_id
+        self.flush_interval = flush_interval
+        self.max_batch_bytes = max_batch_bytes
+        self.buffer_bytes = buffer_bytes
+        self.policy = policy
+        self.fmt = fmt
+        self.pending: Deque[LogEvent] = deque()
+        self.pending_bytes = 0
+        self.dropped = 0
+        self.closed = False
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._sender = asyncio.create_task(self._send_loop(), name=f"ws-sender-{task_id[:8]}")
+
+    def push(self, event: LogEvent) -> None:
+        """Queue ``event`` without waiting. Must be called on the event loop."""
+        if self.closed or self._closing:
+            return
+        for part in (split_event(event) if self.fmt != LEGACY else (event,)):
+            self.pending.append(part)
+            self.pending_bytes += part.size
+        if self.pending_bytes > self.buffer_bytes:
+            self._apply_policy()
+        self._wakeup.set()
+
+    def _apply_policy(self) -> None:
+        if self.policy == "disconnect":
+            logger.warning(f"Client für Task {self.task_id} zu langsam – Verbindung wird getrennt.")
+            self.pending.clear()
+            self.pending_bytes = 0
+            self.closed = True
+            asyncio.create_task(self._close(code=1013))
+            return
+        kept: Deque[LogEvent] = deque()
+        dropped = 0
+        if self.policy == "compact":
+            for event in self.pending:
+                if event.protected:
+                    kept.append(event)
+                else:
+                    dropped += 1
+        else:  # drop_oldest
+            excess = self.pending_bytes - self.buffer_bytes // 2
+            for event in self.pending:
+                if excess > 0 and not event.protected:
+                    excess -= event.size
+                    dropped += 1
+                else:
+                    kept.append(event)
+        self.dropped += dropped
+        if dropped:
+            kept.appendleft(system_event(f"{dropped} Log-Zeilen ausgelassen (Client zu langsam)."))
+        self.pending = kept
+        self.pending_bytes = sum(event.size for event in kept)
+
+    def _take_batch(self) -> List[LogEvent]:
+        batch = []
+        size = 0
+        while self.pending and (not batch or size + self.pending[0].size <= self.max_batch_bytes):
+            event = self.pending.popleft()
+            batch.append(event)
+            size += event.size
+        self.pending_bytes = max(0, self.pending_bytes - size)
+        return batch
+
+    async def _send(self, batch: List[LogEvent]) -> None:
+        frames = encode_batch(batch, self.fmt)
+        started = time.perf_counter()
+        for frame in frames:
+            if isinstance(frame, bytes):
+                await self.websocket.send_bytes(frame)
+            else:
+                await self.websocket.send_text(frame)
+        metrics.WS_SENT_BYTES.inc(sum(len(frame) for frame in frames), format=self.fmt)
+        metrics.WS_SEND.observe(time.perf_counter() - started, format=self.fmt)
+
+    async def _send_loop(self) -> None:
+        try:
+            while not self.closed:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                if not self._closing and self.pending_bytes < self.max_batch_bytes:
+                    # Kurz sammeln, damit viele kleine Zeilen in einem Frame landen
+                    await asyncio.sleep(self.flush_interval)
+                while self.pending and not self.closed:
+                    await self._send(self._take_batch())
+                if self._closing:
+                    return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"Senden an Client für Task {self.task_id} beendet: {e}")
+            self.closed = True
+
+    async def drain(self, timeout: float = 5.0) -> None:
+        """Flush everything still queued, then stop the sender."""
+        self._closing = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._sender, timeout)  # bricht den Sender bei Timeout ab
+        except asyncio.TimeoutError:
+            logger.warning(f"Client für Task {self.task_id} hat ausstehende Logs nicht rechtzeitig abgenommen.")
+
+    async def _close(self, code: int = 1000) -> None:
+        try:
+            await self.websocket.close(code=code)
+        except Exception as e:
+            logger.debug(f"WebSocket für Task {self.task_id} bereits geschlossen: {e}")
+
+    def stop(self) -> None:
+        self.closed = True
+        self._sender.cancel()
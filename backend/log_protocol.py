@@ -0,0 +1,190 @@
+# coding_agent_backend/log_protocol.py
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+try:
+    import msgpack
+except ImportError:  # msgpack ist optional – ohne Paket wird JSON ausgehandelt
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+# Payloads darüber werden in "chunk"-Events aufgeteilt (nur typisierte Formate)
+LOG_EVENT_CHUNK_BYTES = int(os.getenv("LOG_EVENT_CHUNK_BYTES", str(32 * 1024)))
+
+# Formate: "legacy" (Textzeilen wie bisher), "json" und "msgpack"
+LEGACY, JSON, MSGPACK = "legacy", "json", "msgpack"
+FORMATS = (LEGACY, JSON, MSGPACK)
+SUBPROTOCOLS = {f"datalog.v{PROTOCOL_VERSION}.json": JSON, f"datalog.v{PROTOCOL_VERSION}.msgpack": MSGPACK}
+
+# Event-Typen
+CONSOLE = "console"
+TEXT = "text"
+SYSTEM = "system"
+ERROR = "error"
+FINAL_RESULT = "final_result"
+LLM_START = "llm_start"
+LLM_END = "llm_end"
+CHAIN_START = "chain_start"
+CHAIN_END = "chain_end"
+TOOL_START = "tool_start"
+TOOL_END = "tool_end"
+TOOL_ERROR = "tool_error"
+AGENT_THOUGHT = "agent_thought"
+AGENT_ACTION = "agent_action"
+AGENT_FINISH = "agent_finish"
+CHUNK = "chunk"
+
+# Events, die nie verworfen werden dürfen (das Frontend wertet sie aus)
+PROTECTED_TYPES = (SYSTEM, ERROR, FINAL_RESULT)
+
+
+@dataclass
+class LogEvent:
+    """
+    One entry of a task's log.
+
+    ``seq`` is assigned by the task's event log (0 marks notes generated for a
+    single subscriber), ``text`` is the rendering used by the legacy text
+    protocol. Everything else goes to typed clients via ``to_dict``.
+    """
+
+    type: str
+    payload: Any = None
+    agent: Optional[str] = None
+    tool: Optional[str] = None
+    text: str = ""
+    seq: int = 0
+    ts: float = field(default_factory=time.time)
+
+    @property
+    def protected(self) -> bool:
+        if self.type == CHUNK:
+            return self.payload.get("of") in PROTECTED_TYPES
+        return self.type in PROTECTED_TYPES
+
+    @property
+    def size(self) -> int:
+        if self.type == CHUNK:
+            return len(self.payload["data"])
+        return len(self.text) if self.text else len(str(self.payload))
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"type": self.type, "seq": self.seq, "ts": round(self.ts, 3)}
+        if self.agent:
+            data["agent"] = self.agent
+        if self.tool:
+            data["tool"] = self.tool
+        if self.payload is not None:
+            data["payload"] = self.payload
+        return data
+
+
+def system_event(message: str) -> LogEvent:
+    return LogEvent(SYSTEM, message, text=f"[SYSTEM] {message}")
+
+
+def error_event(message: str) -> LogEvent:
+    return LogEvent(ERROR, message, text=f"[SYSTEM-ERROR] {message}")
+
+
+def final_result_event(payload: Dict[str, Any]) -> LogEvent:
+    try:
+        text = json.dumps(payload)
+    except TypeError:
+        payload = {key: str(value) for key, value in payload.items()}  # Fallback auf String-Repräsentation
+        text = json.dumps(payload)
+    return LogEvent(FINAL_RESULT, payload, text=f"[FINAL_RESULT]{text}")
+
+
+def event_from_text(message: str) -> LogEvent:
+    """Wandelt eine Nachricht im Legacy-Textformat in ein Event um."""
+    if message.startswith("[FINAL_RESULT]"):
+        raw = message[len("[FINAL_RESULT]"):]
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            payload = raw
+        return LogEvent(FINAL_RESULT, payload, text=message)
+    if message.startswith("[SYSTEM-ERROR]"):
+        return LogEvent(ERROR, message[len("[SYSTEM-ERROR]"):].strip(), text=message)
+    if message.startswith("[SYSTEM]"):
+        return LogEvent(SYSTEM, message[len("[SYSTEM]"):].strip(), text=message)
+    return LogEvent(CONSOLE, message, text=message)
+
+
+def as_event(message: Union[str, LogEvent]) -> LogEvent:
+    return message if isinstance(message, LogEvent) else event_from_text(message)
+
+
+def negotiate(requested: Optional[str], offered_subprotocols: Sequence[str]) -> Tuple[str, Optional[str]]:
+    """
+    Pick the wire format for a new connection.
+
+    An explicit ``?protocol=`` wins, otherwise the first known WebSocket
+    subprotocol offered by the client; without either the legacy text format is
+    used. Returns the format and the subprotocol to accept (or None).
+    """
+    subprotocol = next((p for p in offered_subprotocols if p in SUBPROTOCOLS), None)
+    fmt = (requested or "").lower() or (SUBPROTOCOLS[subprotocol] if subprotocol else LEGACY)
+    if fmt not in FORMATS:
+        logger.warning(f"Unbekanntes Log-Protokoll '{fmt}' – verwende {LEGACY}.")
+        fmt = LEGACY
+    if fmt == MSGPACK and msgpack is None:
+        logger.warning("msgpack nicht installiert – Log-Protokoll fällt auf JSON zurück.")
+        fmt = JSON
+    if subprotocol is not None and SUBPROTOCOLS[subprotocol] != fmt:
+        subprotocol = next((p for p, f in SUBPROTOCOLS.items() if f == fmt and p in offered_subprotocols), None)
+    return fmt, subprotocol
+
+
+def split_event(event: LogEvent, chunk_bytes: int = LOG_EVENT_CHUNK_BYTES) -> List[LogEvent]:
+    """
+    Split an event with a large payload into ``chunk`` events.
+
+    Each chunk carries ``of`` (the original type), ``index``, ``count``,
+    ``encoding`` (``text`` for string payloads, ``json`` otherwise) and a slice
+    of the payload in ``data``; all chunks share the original ``seq``.
+    """
+    if event.payload is None:
+        return [event]
+    if isinstance(event.payload, str):
+        data, encoding = event.payload, "text"
+    else:
+        data, encoding = json.dumps(event.payload, default=str), "json"
+    if len(data) <= chunk_bytes:
+        return [event]
+    count = -(-len(data) // chunk_bytes)
+    return [
+        LogEvent(
+            CHUNK,
+            {"of": event.type, "index": i, "count": count, "encoding": encoding,
+             "data": data[i * chunk_bytes:(i + 1) * chunk_bytes]},
+            agent=event.agent,
+            tool=event.tool,
+            seq=event.seq,
+            ts=event.ts,
+        )
+        for i in range(count)
+    ]
+
+
+def encode_batch(events: Sequence[LogEvent], fmt: str) -> List[Union[str, bytes]]:
+    """
+    Encode a batch of events into WebSocket frames.
+
+    Typed formats put the whole batch into one versioned envelope. The legacy
+    text protocol promises one message per frame and its lines may contain
+    newlines themselves, so there every event becomes a frame of its own.
+    """
+    if fmt == LEGACY:
+        return [event.text for event in events]
+    envelope = {"v": PROTOCOL_VERSION, "events": [event.to_dict() for event in events]}
+    if fmt == MSGPACK:
+        return [msgpack.packb(envelope, use_bin_type=True, default=str)]
+    return [json.dumps(envelope, separators=(",", ":"), ensure_ascii=False, default=str)]
@@ -5,6 +5,7 @@ import io   # Für StringIO als Basis für unseren Stream
 import traceback  # Für detaillierte Fehlerausgaben
 import logging  # Für strukturiertes Logging
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import (
     FastAPI,
@@ -13,21 +14,28 @@ from fastapi import (
     BackgroundTasks,
     UploadFile,
     File,
+    Request,
+    HTTPException,
 )
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 
 from dotenv import load_dotenv
 
 # Lade Umgebungsvariablen (z.B. API Keys)
 load_dotenv()
 
+from log_config import LOG_LEVEL, LOG_VERBOSITY, VERBOSITY_TIERS, install_async_logging
+
 logging.basicConfig(
-    level=logging.INFO,
+    level=LOG_LEVEL,
     format='%(asctime)s - %(name)s - %(levelname)s - [%(funcName)s] - %(message)s',
     datefmt='%Y-%m-%d %H:%M:%S'
 )
+# Log-I/O in einem eigenen Thread, damit weder Crew-Threads noch der Event-Loop darauf warten
+install_async_logging()
 logger = logging.getLogger(__name__)
 
 # Directory for uploaded CSV files
@@ -36,17 +44,95 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 LATEST_UPLOADED_DATASET: Optional[str] = None
 
 # Importiere Konfigurationen und Komponenten
-from llm_config import manager_llm as global_manager_llm, google_api_key
-from agents import managerAgent, WorkerAgents 
-from tasks import data_science_tasks
-from callback_handler import WebSocketCallbackHandler, WebSocketStream
-from crewai import Crew, Process
+from llm_config import MANAGER_LLM_MODEL
+from callback_handler import WebSocketCallbackHandler, WebSocketStream, install_stdout_router
+from upload_store import UploadStore, UploadError, UPLOAD_CHUNK_SIZE, DEFAULT_PART_SIZE
+from crew_scheduler import CrewScheduler, QueueFullError
+from log_delivery import Subscriber, TaskEventLog
+from log_protocol import LEGACY, LogEvent, as_event, negotiate, system_event, error_event, final_result_event
+from process_backend import ProcessCrewBackend, CrewProcessError, CREW_EXECUTION_BACKEND
+from llm_cache import CACHE_MODES, cache_session
+from llm_rate_limiter import llm_rate_limiter
+from task_context import task_scope
+from kernel_pool import python_kernel_pool
+from warmup import warmup, BACKEND_PREWARM
+from dataset_catalog import dataset_catalog, DATASET_MAX_PAGE_SIZE, DATASET_PAGE_SIZE, SORT_FIELDS
+from metrics import registry as metrics_registry
+from tracing import trace_store
+
+crew_scheduler = CrewScheduler()
+crew_process_backend: Optional[ProcessCrewBackend] = None
+
+
+# Schwere Komponenten werden erst bei Bedarf (oder per Pre-Warm im Hintergrund) geladen,
+# damit der Server sofort Requests annimmt. Stand: GET /api/ready
+def _load_crew_runtime():
+    """crewai, Tools, LLM-Clients und die validierten Crew-Vorlagen."""
+    import langchain
+    # Gibt jeden Prompt synchron auf stdout aus – nur in der Log-Stufe "debug"
+    langchain.debug = LOG_VERBOSITY == "debug"
+    from crew_builder import crew_factory
+    crew_factory.warm()
+    return crew_factory
+
+
+def _load_dataset_runtime():
+    """pandas/pyarrow samt DataFrame-Cache, Spalten-Ingest, Datensatz-Profilen und Stichproben für Uploads."""
+    from tools import dataset_profile, dataset_sample
+    from tools.dataframe_cache import dataframe_cache
+    from tools.columnar_store import ingest_csv, ingest_status
+    return dataframe_cache, ingest_csv, ingest_status, dataset_profile, dataset_sample
+
+
+def _describe_object(object_path: str) -> Dict[str, Any]:
+    """Zeilen und Spalten (aus dem Profil) sowie Ingest-Status eines Objekts für den Datensatz-Katalog."""
+    _, _, ingest_status, dataset_profile, _ = warmup.ensure("datasets")
+    profile = dataset_profile.load_profile(object_path)
+    return {
+        "rows": profile["rows"] if profile else None,
+        "columns": len(profile["columns"]) if profile else None,
+        "ingest_status": ingest_status(object_path) if object_path.lower().endswith(".csv") else None,
+    }
+
 
+def _load_dataset_catalog():
+    """Gleicht den Katalog einmalig mit dem Upload-Verzeichnis ab (z.B. Dateien von vor dem Katalog)."""
+    dataset_catalog.sync(UPLOAD_DIR, describe=_describe_object)
+    return dataset_catalog
 
-import langchain
-langchain.debug = True
 
-app = FastAPI()
+warmup.register("datasets", _load_dataset_runtime)
+warmup.register("dataset_catalog", _load_dataset_catalog)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global crew_process_backend
+    manager.bind_loop(asyncio.get_running_loop())
+    if CREW_EXECUTION_BACKEND == "process":
+        # Ein vorgestarteter Worker-Prozess pro Scheduler-Slot
+        crew_process_backend = ProcessCrewBackend(
+            max_workers=crew_scheduler.max_workers,
+            on_log=manager.publish,
+            on_trace=trace_store.ingest,
+        )
+        crew_process_backend.start()
+        warmup.register("crew_workers", crew_process_backend.wait_ready)
+    else:
+        # Python-Kernel für das REPL-Tool vorwärmen (Imports laufen in den Kernel-Prozessen)
+        python_kernel_pool.start()
+        warmup.register("crew", _load_crew_runtime)
+        warmup.register("python_kernels", python_kernel_pool.wait_ready)
+    if BACKEND_PREWARM:
+        warmup.prewarm()
+    yield
+    await crew_scheduler.shutdown()
+    if crew_process_backend is not None:
+        await crew_process_backend.shutdown()
+    python_kernel_pool.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS-Einstellungen
 app.add_middleware(
@@ -64,59 +150,115 @@ app.add_middleware(
 #                                       -
 # ---------------------------------------
 class ConnectionManager:
+    """
+    Verteilt Log-Events an die WebSockets eines Tasks. Jeder Client hat eine eigene,
+    begrenzte Sende-Queue (siehe log_delivery.Subscriber), die Events zu Frames bündelt –
+    ein langsamer Client bremst so weder andere Clients noch die Crew. Das Wire-Format
+    (Legacy-Text, JSON oder MessagePack) wird pro Verbindung ausgehandelt (siehe log_protocol).
+    """
+
     def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+        self.active_connections: Dict[str, Dict[WebSocket, Subscriber]] = {}
+        self.event_logs: Dict[str, TaskEventLog] = {}
         self.logger = logging.getLogger(f"{__name__}.ConnectionManager")
-
-    async def connect(self, websocket: WebSocket, task_id: str):
-        await websocket.accept()
-        if task_id not in self.active_connections:
-            self.active_connections[task_id] = []
-        self.active_connections[task_id].append(websocket)
-        self.logger.info(f"WebSocket connected für Task {task_id}: {websocket.client}")
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        task_id: str,
+        since: int = 0,
+        fmt: str = LEGACY,
+        subprotocol: Optional[str] = None,
+    ):
+        await websocket.accept(subprotocol=subprotocol)
+        self.loop = self.loop or asyncio.get_running_loop()
+        self._reap_event_logs()
+        subscriber = Subscriber(websocket, task_id, fmt=fmt)
+        # Backlog und Registrierung ohne await dazwischen – so geht keine Nachricht verloren oder doppelt
+        event_log = self.event_logs.get(task_id)
+        if event_log is not None:
+            for event in event_log.replay(since):
+                subscriber.push(event)
+        self.active_connections.setdefault(task_id, {})[websocket] = subscriber
+        self.logger.info(f"WebSocket connected für Task {task_id} (since={since}, {fmt}): {websocket.client}")
+
+    def task_finished(self, task_id: str) -> bool:
+        event_log = self.event_logs.get(task_id)
+        return event_log is not None and event_log.finished_at is not None
+
+    def has_event_log(self, task_id: str) -> bool:
+        return task_id in self.event_logs
+
+    def _reap_event_logs(self) -> None:
+        for task_id in [t for t, event_log in self.event_logs.items() if event_log.expired()]:
+            del self.event_logs[task_id]
 
     def disconnect(self, websocket: WebSocket, task_id: str):
         if task_id in self.active_connections:
-            try:
-                self.active_connections[task_id].remove(websocket)
-                if not self.active_connections[task_id]:
-                    del self.active_connections[task_id]
-            except ValueError:
+            subscribers = self.active_connections[task_id]
+            subscriber = subscribers.pop(websocket, None)
+            if subscriber is None:
                 self.logger.warning(f"WebSocket war bereits von Task {task_id} entfernt: {websocket.client}")
+            else:
+                subscriber.stop()
+            if not subscribers:
+                del self.active_connections[task_id]
         self.logger.info(f"WebSocket disconnected für Task {task_id}: {websocket.client}")
 
-    async def send_log_to_task(self, task_id: str, message: str):
-        if task_id in self.active_connections:
-            connections_for_task = list(self.active_connections[task_id])
-            for connection in connections_for_task:
-                try:
-                    await connection.send_text(message)
-                except WebSocketDisconnect:
-                    self.logger.info(f"Client für Task {task_id} (send_log_to_task) hat Verbindung getrennt: {connection.client}")
-                    self.disconnect(connection, task_id)
-                except Exception as e:
-                    self.logger.error(f"Fehler beim Senden der Log-Nachricht an {connection.client} für Task {task_id}: {e}")
+    def publish(self, task_id: str, message: Union[str, LogEvent]) -> None:
+        """Nicht-blockierend und aus jedem Thread aufrufbar; die Zustellung übernimmt der Event-Loop.
+        Strings im Legacy-Format werden in Events umgewandelt."""
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is not None and running_loop is self.loop:
+            self._publish_now(task_id, message)
+        elif self.loop is not None:
+            self.loop.call_soon_threadsafe(self._publish_now, task_id, message)
+
+    def _publish_now(self, task_id: str, message: Union[str, LogEvent]) -> None:
+        event = as_event(message)
+        event_log = self.event_logs.get(task_id)
+        if event_log is None:
+            event_log = self.event_logs[task_id] = TaskEventLog()
+        event_log.append(event)
+        for subscriber in list(self.active_connections.get(task_id, {}).values()):
+            subscriber.push(event)
+
+    async def send_log_to_task(self, task_id: str, message: Union[str, LogEvent]):
+        self.publish(task_id, message)
 
     async def close_connections_for_task(self, task_id: str, reason_code: int = 1000, reason_text: str = "Task completed"):
+        # Das Event-Log bleibt für LOG_REPLAY_RETENTION_SECONDS abrufbar
+        self.event_logs.setdefault(task_id, TaskEventLog()).mark_finished()
+        self._reap_event_logs()
         if task_id in self.active_connections:
-            connections_to_close = list(self.active_connections[task_id])
-            for connection in connections_to_close:
+            subscribers = list(self.active_connections[task_id].items())
+            # Erst alle ausstehenden Logs (inkl. [FINAL_RESULT]) parallel zustellen, dann schließen
+            await asyncio.gather(*(subscriber.drain() for _, subscriber in subscribers))
+            for connection, _ in subscribers:
                 try:
                     await connection.close(code=reason_code) # reason argument ist in manchen Libs optional oder anders
                     self.logger.info(f"WebSocket für Task {task_id} aktiv geschlossen: {connection.client} mit Code {reason_code}")
                 except Exception as e:
                     self.logger.error(f"Fehler beim aktiven Schließen der WebSocket-Verbindung für {connection.client} Task {task_id}: {e}")
                 finally:
-                    if connection in self.active_connections.get(task_id, []):
+                    if connection in self.active_connections.get(task_id, {}):
                         self.disconnect(connection, task_id)
             self.logger.info(f"Alle WebSocket-Verbindungen für Task {task_id} finalisiert.")
 
 
 manager = ConnectionManager()
+# sys.stdout wird einmalig durch einen Router ersetzt, der Ausgaben pro Task an den richtigen Stream leitet
+stdout_router = install_stdout_router()
+upload_store = UploadStore(UPLOAD_DIR, catalog=dataset_catalog)
 
 
-RUNNING_TASKS: Dict[str, asyncio.Task] = {}
-
 # Pydantic-Modell für den Request-Body
 class StartTaskRequest(BaseModel):
     task: str
@@ -124,6 +266,14 @@ class StartTaskRequest(BaseModel):
     user_dataset_description: Optional[str] = "Keine spezifische Dataset-Beschreibung angegeben."
     user_project_goal: Optional[str] = "Allgemeine Analyse durchführen."
     dataset_path: Optional[str] = None
+    priority: Optional[int] = 0  # Höhere Werte werden früher aus der Warteschlange genommen
+    llm_cache: Optional[str] = None  # "off", "read_write", "record" oder "replay"; Standard: LLM_CACHE_MODE
+    log_verbosity: Optional[str] = None  # "minimal", "normal", "verbose" oder "debug"; Standard: LOG_VERBOSITY
+
+class CreateUploadRequest(BaseModel):
+    filename: str
+    total_size: int
+    part_size: Optional[int] = DEFAULT_PART_SIZE
 
 # --------------------------------------- 
 #                                       -
@@ -135,91 +285,67 @@ async def run_crew_asynchronously(
     task_id: str,
     user_inputs: Dict[str, Any],
     selected_model_from_frontend: str, # Modell für Worker-Agenten
-    connection_manager: ConnectionManager # ConnectionManager Instanz übergeben
+    connection_manager: ConnectionManager, # ConnectionManager Instanz übergeben
+    llm_cache_mode: Optional[str] = None, # siehe llm_cache.CACHE_MODES
+    log_verbosity: Optional[str] = None, # siehe log_config.VERBOSITY_TIERS
 ):
+    if user_inputs.get("dataset_profile") is None:
+        # Beim Start war das Profil noch nicht fertig (z.B. direkt nach dem Upload) – jetzt im Task-Slot berechnen
+        user_inputs["dataset_profile"] = await asyncio.to_thread(_dataset_profile_text, user_inputs.get("dataset_path") or "", True)
     logger.info(f"Starte Crew für Task {task_id} mit Inputs: {user_inputs} und Worker-Modell: {selected_model_from_frontend}")
-    custom_callback_handler = WebSocketCallbackHandler(websocket_manager=connection_manager, task_id=task_id)
-    ##Agents
-    lead_data_scientist = managerAgent().lead_data_scientist()
-    reporting_agent = WorkerAgents().reporting_agent()
-
-    ##Tasks
-    tasks = data_science_tasks()
-    data_science_project_task = tasks.data_science_project_task(lead_data_scientist)
-    reporting_task = tasks.reporting_task(reporting_agent, [data_science_project_task])
-
-
-    data_science_crew = Crew(
-        agents=[
-            lead_data_scientist,
-            reporting_agent
-        ],
-        tasks=[
-            data_science_project_task,
-            reporting_task
-        ],
-        process=Process.sequential,
-        embedder=dict(
-            provider="google",
-            config=dict(
-                model="gemini-embedding-exp-03-07",
-                api_key=google_api_key
-            )
-        ),
-        manager_llm=global_manager_llm,
-        verbose=True,
-        callbacks=[custom_callback_handler],
-    )
-
-    original_stdout = sys.stdout
+    custom_callback_handler = WebSocketCallbackHandler(websocket_manager=connection_manager, task_id=task_id, verbosity=log_verbosity)
     ws_stream = WebSocketStream(
         custom_callback_handler,
-        original_stdout,
+        stdout_router.fallback,
         event_type_prefix="CrewAI Console",
         loop=asyncio.get_running_loop(),
     )
 
+    def kickoff_with_stdout_routing():
+        # Lädt crewai beim ersten Task, falls das Pre-Warm noch nicht fertig ist
+        data_science_crew = warmup.ensure("crew").build(callbacks=[custom_callback_handler])
+        # stdout ist über den von run_blocking kopierten Kontext an ws_stream gebunden
+        return data_science_crew.kickoff(inputs=user_inputs)
+
     try:
-        await connection_manager.send_log_to_task(task_id, f"[SYSTEM] CrewAI Prozess wird gestartet. (Manager: {global_manager_llm.model})...")
-        
-        sys.stdout = ws_stream # Leite stdout um, um CrewAI's print() Ausgaben abzufangen
+        await connection_manager.send_log_to_task(task_id, system_event(f"CrewAI Prozess wird gestartet. (Manager: {MANAGER_LLM_MODEL})..."))
         
-        final_result = await asyncio.to_thread(data_science_crew.kickoff, inputs=user_inputs)
+        if crew_process_backend is not None:
+            # Crew läuft in einem Worker-Prozess; Logs kommen über dessen Event-Queue zurück
+            final_result = await crew_process_backend.run(task_id, user_inputs, llm_cache=llm_cache_mode, log_verbosity=log_verbosity)
+        else:
+            # Leite CrewAI's print() Ausgaben dieses Tasks um – nur in seinem Kontext, nicht prozessweit
+            with stdout_router.route(ws_stream), task_scope(task_id, user_inputs.get("dataset_path")), cache_session(llm_cache_mode) as cache_stats:
+                try:
+                    final_result = await crew_scheduler.run_blocking(kickoff_with_stdout_routing)
+                finally:
+                    if cache_stats.mode != "off":
+                        await connection_manager.send_log_to_task(task_id, system_event(cache_stats.summary()))
         
-        sys.stdout = original_stdout # Stelle stdout sofort nach kickoff wieder her
         ws_stream.flush() # Sende verbleibende gepufferte Logs vom Stream
 
-        # Sende das Endergebnis
-        # Stelle sicher, dass final_result in ein JSON-kompatibles Format gebracht wird, falls es ein Objekt ist
-        import json
-        try:
-            json_compatible_result = json.dumps({"result": final_result})
-        except TypeError:
-            json_compatible_result = json.dumps({"result": str(final_result)}) # Fallback auf String-Repräsentation
-
-        await connection_manager.send_log_to_task(task_id, f"[FINAL_RESULT]{json_compatible_result}")
+        # Sende das Endergebnis (nicht JSON-fähige Objekte werden als String übertragen)
+        await connection_manager.send_log_to_task(task_id, final_result_event({"result": final_result}))
         logger.info(f"Crew für Task {task_id} beendet. Ergebnis (gekürzt): {str(final_result)[:200]}")
 
     except asyncio.CancelledError:
-        if sys.stdout == ws_stream:
-            sys.stdout = original_stdout
         ws_stream.flush()
-        await connection_manager.send_log_to_task(task_id, "[SYSTEM] Task cancelled by user.")
-        await connection_manager.send_log_to_task(task_id, "[FINAL_RESULT]{\"error\": \"cancelled\"}")
+        await connection_manager.send_log_to_task(task_id, system_event("Task cancelled by user."))
+        await connection_manager.send_log_to_task(task_id, final_result_event({"error": "cancelled"}))
         return
     
     except Exception as e:
-        if sys.stdout == ws_stream: # Nur wiederherstellen, wenn es noch umgeleitet ist
-            sys.stdout = original_stdout
         ws_stream.flush() # Sende verbleibende Logs auch im Fehlerfall
 
-        error_message_full = f"Fehler während der Crew-Ausführung für Task {task_id}: {e}\n{traceback.format_exc()}"
+        remote_traceback = e.remote_traceback if isinstance(e, CrewProcessError) else traceback.format_exc()
+        error_message_full = f"Fehler während der Crew-Ausführung für Task {task_id}: {e}\n{remote_traceback}"
         logger.error(error_message_full)
-        await connection_manager.send_log_to_task(task_id, f"[SYSTEM-ERROR] {str(e)}")
-        await connection_manager.send_log_to_task(task_id, f"[FINAL_RESULT]{{\"error\": \"{str(e)}\"}}")
+        await connection_manager.send_log_to_task(task_id, error_event(str(e)))
+        await connection_manager.send_log_to_task(task_id, final_result_event({"error": str(e)}))
+        raise # Scheduler markiert den Task als fehlgeschlagen
     finally:
-        if sys.stdout == ws_stream:
-            sys.stdout = original_stdout # Endgültige Wiederherstellung
+        # Namespace des Tasks im Python-Kernel freigeben
+        await asyncio.to_thread(python_kernel_pool.release, task_id)
         await connection_manager.close_connections_for_task(task_id)
 
 
@@ -229,29 +355,175 @@ async def run_crew_asynchronously(
 #                                       -
 # ---------------------------------------
 
+async def _iter_upload_file(file: UploadFile):
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+def _register_upload(stored, background_tasks: BackgroundTasks) -> Dict[str, Any]:
+    global LATEST_UPLOADED_DATASET
+    dataframe_cache, ingest_csv, ingest_status, dataset_profile, _ = warmup.ensure("datasets")
+    if stored.previous_object_path:
+        # Alias zeigt jetzt auf neuen Inhalt – gecachte DataFrames des alten Ziels verwerfen
+        dataframe_cache.invalidate(stored.previous_object_path)
+    LATEST_UPLOADED_DATASET = stored.file_path
+    # Den Namen hat der Upload-Store bereits eingetragen; hier nur Profil- und Ingest-Angaben ergänzen
+    dataset_catalog.update_object(stored.object_path, **_describe_object(stored.object_path))
+    if stored.object_path.lower().endswith(".csv") and (
+        ingest_status(stored.object_path) == "missing" or dataset_profile.profile_status(stored.object_path) == "missing"
+    ):
+        background_tasks.add_task(_process_upload, stored.object_path)
+    return stored.to_response()
+
+
+def _process_upload(object_path: str) -> None:
+    """Hintergrund-Task nach einem Upload: Spaltenkopie, Profil, Stichprobe und Katalog-Eintrag nachziehen."""
+    _, ingest_csv, ingest_status, dataset_profile, dataset_sample = warmup.ensure("datasets")
+    # Zuerst die Spaltenkopie (Arrow); bis sie fertig ist, lesen die Tools die CSV
+    if ingest_status(object_path) == "missing":
+        ingest_csv(object_path)
+    # Danach das Profil (nutzt die Spaltenkopie), das jeder Task als {dataset_profile} erhält
+    if dataset_profile.profile_status(object_path) == "missing":
+        dataset_profile.compute_profile(object_path)
+    # Stichprobe sehr großer Dateien (df_sample im Kernel, Schätzungen im CSV-Analyse-Tool) – die Tools ziehen sie nie selbst
+    if dataset_sample.should_sample(object_path):
+        try:
+            dataset_sample.ensure_sample(object_path)
+        except Exception as e:
+            logger.warning(f"Stichprobe für {object_path} konnte nicht gezogen werden: {e}")
+    dataset_catalog.update_object(object_path, **_describe_object(object_path))
+
+
+def _dataset_profile_text(dataset_path: str, compute: bool = False) -> Optional[str]:
+    """
+    Profil des Datensatzes als Text für die Crew-Inputs. Fehlt das gespeicherte Profil, wird es mit
+    ``compute`` jetzt berechnet, sonst ist das Ergebnis None. Ohne lesbaren Datensatz: ein Hinweis.
+    """
+    if dataset_path and os.path.isfile(dataset_path):
+        dataset_profile = warmup.ensure("datasets")[3]
+        try:
+            profile = dataset_profile.load_profile(dataset_path)
+            if profile is None and not compute:
+                return None
+            profile = profile or dataset_profile.ensure_profile(dataset_path)
+            from tools.output_renderer import render_text
+            return render_text(dataset_profile.format_profile(profile, dataset_path)).text
+        except Exception as e:
+            logger.warning(f"Profil für {dataset_path} nicht verfügbar: {e}")
+    return "Kein vorberechnetes Profil verfügbar – nutze bei Bedarf das Tool 'Summarize a CSV' oder 'Search a CSV's content'."
+
+
 @app.post("/api/upload_csv")
-async def upload_csv(file: UploadFile = File(...)):
-    """Receive a CSV file upload and store it on the server."""
-    file_location = os.path.join(UPLOAD_DIR, file.filename)
-    with open(file_location, "wb") as f:
-        f.write(await file.read())
-    LATEST_UPLOADED_DATASET = file_location
-    return {"file_path": file_location}
+async def upload_csv(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    """Stream a CSV upload to disk, store it under its content hash and alias it by name."""
+    try:
+        stored = await upload_store.save_stream(file.filename, _iter_upload_file(file))
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    # Katalog (sqlite) und ggf. der erste Import von pandas blockieren – nicht auf dem Event-Loop
+    return await asyncio.to_thread(_register_upload, stored, background_tasks)
+
+@app.post("/api/uploads")
+async def create_upload_session(request_data: CreateUploadRequest):
+    """Start a resumable multi-part upload. Parts can be sent in parallel and in any order."""
+    try:
+        return await asyncio.to_thread(
+            upload_store.create_session, request_data.filename, request_data.total_size, request_data.part_size or DEFAULT_PART_SIZE
+        )
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@app.get("/api/uploads/{upload_id}")
+async def get_upload_session(upload_id: str):
+    """Return the session manifest including the already received parts (for resuming)."""
+    try:
+        return await asyncio.to_thread(upload_store.session_status, upload_id)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@app.put("/api/uploads/{upload_id}/parts/{index}")
+async def upload_part(upload_id: str, index: int, request: Request):
+    """Receive one part as raw request body, streamed straight to disk."""
+    try:
+        return await upload_store.write_part(upload_id, index, request.stream())
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@app.post("/api/uploads/{upload_id}/complete")
+async def complete_upload_session(upload_id: str, background_tasks: BackgroundTasks):
+    try:
+        stored = await upload_store.complete_session(upload_id)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return await asyncio.to_thread(_register_upload, stored, background_tasks)
+
+@app.delete("/api/uploads/{upload_id}")
+async def abort_upload_session(upload_id: str):
+    try:
+        await asyncio.to_thread(upload_store.abort_session, upload_id)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return {"message": "Upload abgebrochen", "upload_id": upload_id}
 
 @app.get("/api/datasets")
-async def list_datasets():
-    """Return dataset names and full paths from the uploads directory."""
-    datasets = [
-        {"name": f, "path": os.path.join(UPLOAD_DIR, f)}
-        for f in os.listdir(UPLOAD_DIR)
-        if os.path.isfile(os.path.join(UPLOAD_DIR, f))
-    ]
-    return {"datasets": datasets}
+async def list_datasets(
+    limit: int = DATASET_PAGE_SIZE,
+    offset: int = 0,
+    search: Optional[str] = None,
+    ingest_status: Optional[str] = None,
+    sort: str = "uploaded_at",
+    order: str = "desc",
+):
+    """Return one page of uploaded datasets from the catalog, optionally filtered by name and ingest status."""
+    if sort not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Unbekanntes Sortierfeld. Erlaubt: {', '.join(SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order muss 'asc' oder 'desc' sein.")
+    if limit < 1 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit muss mindestens 1 und offset mindestens 0 sein.")
+    catalog = await asyncio.to_thread(warmup.ensure, "dataset_catalog")
+    datasets, total = await asyncio.to_thread(catalog.query, limit, offset, search, ingest_status, sort, order == "desc")
+    next_offset = offset + len(datasets)
+    return {
+        "datasets": datasets,
+        "total": total,
+        "offset": offset,
+        "limit": min(limit, DATASET_MAX_PAGE_SIZE),
+        "next_offset": next_offset if next_offset < total else None,
+    }
+
+def _remove_dataset(name: str) -> List[str]:
+    """Entfernt Name und Katalog-Eintrag; das Objekt nur, wenn kein anderer Name mehr darauf zeigt."""
+    # Der Katalog muss vollständig sein, bevor er über das Löschen geteilter Objekte entscheidet
+    catalog = warmup.ensure("dataset_catalog")
+    object_path = upload_store.remove_alias(name)  # entfernt auch den Katalog-Eintrag
+    if catalog.references(object_path) > 0:
+        return []
+    warmup.ensure("datasets")[0].invalidate(object_path)
+    # remove_object prüft unter dem Lock des Stores erneut, ob inzwischen ein Upload darauf verweist
+    return upload_store.remove_object(object_path)
+
+
+@app.delete("/api/datasets/{name}")
+async def delete_dataset(name: str):
+    """Remove a dataset name. The stored content is deleted once no other name points to it."""
+    global LATEST_UPLOADED_DATASET
+    try:
+        removed_objects = await asyncio.to_thread(_remove_dataset, name)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    if LATEST_UPLOADED_DATASET and os.path.basename(LATEST_UPLOADED_DATASET) == name:
+        LATEST_UPLOADED_DATASET = None
+    return {"message": "Datensatz gelöscht", "name": name, "removed_objects": removed_objects}
 
 @app.post("/api/start_crew_task")
 async def start_crew_task_endpoint(request_data: StartTaskRequest): 
     task_id = str(uuid.uuid4())
     logger.info(f"Neue Aufgabe gestartet: Task ID {task_id}, User Task: '{request_data.task}', Modell: {request_data.model_name}")
+    if request_data.llm_cache is not None and request_data.llm_cache not in CACHE_MODES:
+        raise HTTPException(status_code=400, detail=f"Unbekannter LLM-Cache-Modus. Erlaubt: {', '.join(CACHE_MODES)}")
+    if request_data.log_verbosity is not None and request_data.log_verbosity not in VERBOSITY_TIERS:
+        raise HTTPException(status_code=400, detail=f"Unbekannte Log-Stufe. Erlaubt: {', '.join(VERBOSITY_TIERS)}")
 
     dataset_path = request_data.dataset_path or LATEST_UPLOADED_DATASET or ""
     crew_inputs = {
@@ -261,6 +533,9 @@ async def start_crew_task_endpoint(request_data: StartTaskRequest):
         "dataset_description": request_data.user_dataset_description,
         "dataset_path": dataset_path,
         "project_goal": request_data.user_project_goal,
+        # Schema, Statistik und Beispielzeilen aus dem Upload – erspart den Agenten einen Tool-Aufruf samt LLM-Runde.
+        # None, solange das Profil noch berechnet wird (siehe run_crew_asynchronously)
+        "dataset_profile": await asyncio.to_thread(_dataset_profile_text, dataset_path),
         # Platzhalter für Agenten, die sequenziell Ergebnisse austauschen. Standardwerte
         # verhindern KeyError, wenn spätere Agenten ihre Eingaben interpolieren.
         #"input_data_summary": "Rohdaten werden vom Data Gatherer bereitgestellt.",
@@ -270,21 +545,92 @@ async def start_crew_task_endpoint(request_data: StartTaskRequest):
         #"gathered_data_summary": "Details zur Datensammlung werden vom Data Gatherer bereitgestellt."
     }
 
-    task = asyncio.create_task(
-        run_crew_asynchronously(
+    try:
+        record = crew_scheduler.submit(
             task_id,
-            crew_inputs,
-            request_data.model_name,
-            manager,
+            lambda: run_crew_asynchronously(
+                task_id,
+                crew_inputs,
+                request_data.model_name,
+                manager,
+                request_data.llm_cache,
+                request_data.log_verbosity,
+            ),
+            priority=request_data.priority or 0,
         )
+    except QueueFullError as e:
+        logger.warning(f"Task {task_id} abgelehnt: {e}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+
+    return {
+        "message": "CrewAI Task gestartet",
+        "task_id": task_id,
+        "state": record.state.value,
+        "queue_position": crew_scheduler.queue_position(task_id),
+    }
+
+@app.get("/api/tasks")
+async def list_tasks():
+    """Return all known tasks with state, queue position and timings."""
+    return {"tasks": crew_scheduler.list(), "stats": crew_scheduler.stats(), "llm_rate_limits": llm_rate_limiter.stats()}
+
+@app.get("/api/ready")
+async def readiness():
+    """200 sobald alle schweren Komponenten geladen sind, sonst 503 – jeweils mit dem Stand pro Komponente."""
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/api/tasks/{task_id}/trace")
+async def get_task_trace(task_id: str):
+    """Zeitmessung des Tasks im Chrome-Trace-Format (in chrome://tracing oder ui.perfetto.dev öffnen)."""
+    trace = trace_store.get(task_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Kein Trace für Task {task_id} vorhanden.")
+    return JSONResponse(
+        trace.to_chrome_trace(),
+        headers={"Content-Disposition": f'attachment; filename="trace-{task_id}.json"'},
     )
-    RUNNING_TASKS[task_id] = task
 
-    return {"message": "CrewAI Task gestartet", "task_id": task_id}
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Latenz-Histogramme (LLM pro Modell, Tools, Queue-Wartezeit, ...) im Prometheus-Textformat."""
+    return Response(metrics_registry.render(), media_type=metrics_registry.content_type)
+
+@app.get("/api/tasks/{task_id}")
+async def get_task(task_id: str):
+    task_info = crew_scheduler.get(task_id)
+    if task_info is None:
+        raise HTTPException(status_code=404, detail=f"Task {task_id} nicht gefunden.")
+    return task_info
+
+@app.post("/api/tasks/{task_id}/cancel")
+async def cancel_task(task_id: str):
+    was_queued = (crew_scheduler.get(task_id) or {}).get("state") == "queued"
+    if not crew_scheduler.cancel(task_id):
+        raise HTTPException(status_code=409, detail=f"Task {task_id} ist unbekannt oder bereits beendet.")
+    if was_queued:
+        # Der Task ist nie gestartet – wartende Clients selbst informieren
+        await manager.send_log_to_task(task_id, system_event("Task cancelled by user."))
+        await manager.send_log_to_task(task_id, final_result_event({"error": "cancelled"}))
+        await manager.close_connections_for_task(task_id)
+    return crew_scheduler.get(task_id)
 
 @app.websocket("/ws/logs/{task_id}")
-async def websocket_endpoint(websocket: WebSocket, task_id: str):
-    await manager.connect(websocket, task_id)
+async def websocket_endpoint(websocket: WebSocket, task_id: str, since: int = 0, protocol: Optional[str] = None):
+    """
+    Live-Logs eines Tasks. Zuerst kommen alle gespeicherten Events nach Sequenznummer ``since``.
+    Format per ``?protocol=legacy|json|msgpack`` oder Subprotocol ``datalog.v1.json`` / ``datalog.v1.msgpack``.
+    """
+    fmt, subprotocol = negotiate(protocol, websocket.scope.get("subprotocols", []))
+    await manager.connect(websocket, task_id, since=since, fmt=fmt, subprotocol=subprotocol)
+    if manager.task_finished(task_id):
+        # Task ist schon beendet: nur den Backlog ausliefern und schließen
+        await manager.close_connections_for_task(task_id)
+        return
+    if not manager.has_event_log(task_id) and crew_scheduler.get(task_id) is None:
+        await websocket.close(code=4404)
+        manager.disconnect(websocket, task_id)
+        return
     try:
         while True:
             data = await websocket.receive_text()
@@ -300,4 +646,5 @@ async def websocket_endpoint(websocket: WebSocket, task_id: str):
 # --- Uvicorn Start (für die lokale Entwicklung) ---
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # permessage-deflate komprimiert die Log-Frames, sofern der Client es anbietet
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, ws_per_message_deflate=True)
\ No newline at end of file
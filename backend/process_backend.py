@@ -0,0 +1,365 @@
+# coding_agent_backend/process_backend.py
+import asyncio
+import io
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from llm_rate_limiter import serve_remote_limiter
+
+logger = logging.getLogger(__name__)
+
+# "thread" (Standard) führt kickoff() im Thread-Pool aus, "process" in vorgestarteten Worker-Prozessen
+CREW_EXECUTION_BACKEND = os.getenv("CREW_EXECUTION_BACKEND", "thread")
+CREW_PROCESS_START_METHOD = os.getenv("CREW_PROCESS_START_METHOD", "spawn")
+# So lange darf ein abgebrochener Task kooperativ enden, bevor die Prozessgruppe des Workers beendet wird
+CREW_PROCESS_CANCEL_GRACE_S = float(os.getenv("CREW_PROCESS_CANCEL_GRACE_S", "10"))
+
+# (task_id, Nachricht) – Nachricht ist ein log_protocol.LogEvent oder eine Legacy-Textzeile
+LogCallback = Callable[[str, Any], None]
+
+
+# ---------------------------------------
+# ---    Code im Worker-Prozess       ---
+# ---------------------------------------
+
+class _EventPipe:
+    """Sendeseite der Event-Pipe eines Workers; Callbacks, stdout und Event-Bus schreiben aus mehreren Threads."""
+
+    def __init__(self, conn: Any):
+        self.conn = conn
+        self._lock = threading.Lock()
+
+    def put(self, event: Any) -> None:
+        with self._lock:
+            self.conn.send(event)
+
+
+class _QueueLogSink:
+    """Stellt im Worker die Schnittstelle des ConnectionManager bereit und schickt Logs an den Parent."""
+
+    def __init__(self, events: _EventPipe):
+        self.events = events
+
+    async def send_log_to_task(self, task_id: str, message: str) -> None:
+        self.events.put(("log", task_id, message))
+
+
+class _QueueStdout(io.TextIOBase):
+    """stdout des Workers: ganze Zeilen gehen als Log-Events an den Parent, alles zusätzlich in die Konsole."""
+
+    def __init__(self, events: _EventPipe, task_id: str, console: Any):
+        super().__init__()
+        self.events = events
+        self.task_id = task_id
+        self.console = console
+        self.line_buffer = ""
+
+    def write(self, s: str) -> int:
+        self.console.write(s)
+        self.line_buffer += s
+        if "\n" in self.line_buffer:
+            lines = self.line_buffer.split("\n")
+            self.line_buffer = lines[-1]
+            for line in lines[:-1]:
+                if line.strip():
+                    self.events.put(("log", self.task_id, line.strip()))
+        return len(s)
+
+    def flush(self) -> None:
+        self.console.flush()
+        if self.line_buffer.strip():
+            self.events.put(("log", self.task_id, self.line_buffer.strip()))
+        self.line_buffer = ""
+
+
+def _worker_main(jobs: multiprocessing.Queue, events_conn: Any, cancel: Any, limiter_conn: Any) -> None:
+    # Eigene Prozessgruppe: der Parent beendet beim Abbruch den Worker samt Python-Kernels
+    if hasattr(os, "setsid"):
+        os.setsid()
+    from log_config import LOG_LEVEL, install_async_logging
+
+    logging.basicConfig(
+        level=LOG_LEVEL,
+        format='%(asctime)s - %(name)s - %(levelname)s - [%(processName)s] - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    install_async_logging()
+    # Schwere Imports einmal beim Start, nicht pro Task
+    from crew_builder import build_data_science_crew, crew_factory
+    from callback_handler import WebSocketCallbackHandler
+    from llm_cache import cache_session
+    from llm_rate_limiter import llm_rate_limiter
+    from task_context import task_scope, current_cancel_event
+    from kernel_pool import python_kernel_pool
+    from log_protocol import system_event
+    from tracing import trace_store
+
+    # Die Provider-Limits führt der Hauptprozess für alle Worker gemeinsam
+    llm_rate_limiter.use_remote(limiter_conn)
+    crew_factory.warm()
+    # LLM-Wrapper und Rate-Limiter prüfen das Event und brechen den laufenden kickoff() ab
+    current_cancel_event.set(cancel)
+    events = _EventPipe(events_conn)
+    events.put(("ready", None, os.getpid()))
+    console = sys.stdout
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        task_id, inputs, options = job
+        handler = WebSocketCallbackHandler(websocket_manager=_QueueLogSink(events), task_id=task_id, verbosity=options.get("log_verbosity"))
+        # Ein Task pro Prozess – hier darf stdout prozessweit umgeleitet werden
+        sys.stdout = _QueueStdout(events, task_id, console)
+        try:
+            with task_scope(task_id, inputs.get("dataset_path")), cache_session(options.get("llm_cache")) as cache_stats:
+                try:
+                    result = build_data_science_crew(callbacks=[handler]).kickoff(inputs=inputs)
+                finally:
+                    if cache_stats.mode != "off":
+                        events.put(("log", task_id, system_event(cache_stats.summary())))
+                    # Spans des Workers an den Hauptprozess übergeben (Trace-Download und /metrics)
+                    trace = trace_store.pop(task_id)
+                    if trace is not None:
+                        events.put(("trace", task_id, trace.to_dict()))
+            sys.stdout.flush()
+            try:
+                json.dumps(result)
+            except TypeError:
+                result = str(result)
+            events.put(("result", task_id, result))
+        except Exception as e:
+            sys.stdout.flush()
+            events.put(("error", task_id, (str(e), traceback.format_exc())))
+        finally:
+            sys.stdout = console
+            python_kernel_pool.release(task_id)
+    python_kernel_pool.shutdown()
+
+
+# ---------------------------------------
+# ---    Steuerung im Parent-Prozess  ---
+# ---------------------------------------
+
+class CrewProcessError(Exception):
+    """Fehler aus einem Worker-Prozess; ``remote_traceback`` enthält den Traceback des Workers."""
+
+    def __init__(self, message: str, remote_traceback: str = ""):
+        super().__init__(message)
+        self.remote_traceback = remote_traceback
+
+
+@dataclass
+class _Worker:
+    process: multiprocessing.Process
+    jobs: Any
+    cancel: Any
+    task_id: Optional[str] = None
+    result: Optional[asyncio.Future] = field(default=None, repr=False)
+
+
+class ProcessCrewBackend:
+    """
+    Runs ``Crew.kickoff`` in a pool of pre-started worker processes so that
+    concurrent crews are not serialized on the GIL.
+
+    Each worker imports crewai, the tools and pandas once at startup and then
+    executes one task at a time. Console output and callback events travel back
+    over a pipe per worker and are handed to ``on_log`` on the event loop.
+    LLM rate limits stay in this process: workers acquire over a second pipe
+    (see ``llm_rate_limiter.serve_remote_limiter``), so one busy worker can use
+    the whole provider budget.
+    Cancelling ``run`` first sets the worker's cancel event so the crew stops at
+    its next LLM call; only if it does not finish within the grace period is the
+    worker's process group (including its Python kernels) terminated and the
+    worker replaced.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        on_log: LogCallback,
+        start_method: str = CREW_PROCESS_START_METHOD,
+        on_trace: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    ):
+        self.max_workers = max_workers
+        self.on_log = on_log
+        self.on_trace = on_trace
+        self._ctx = multiprocessing.get_context(start_method)
+        self._workers: Dict[int, _Worker] = {}
+        self._idle: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reaping: set = set()
+        # Wartende acquire-Aufrufe der Worker (blockieren bis zur Zulassung)
+        self._limiter_executor = ThreadPoolExecutor(max_workers=max(8, 4 * max_workers), thread_name_prefix="crew-rate-limit")
+        self._ready_pids: set = set()
+        self._all_ready = threading.Event()
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._idle = asyncio.Queue()
+        for _ in range(self.max_workers):
+            self._idle.put_nowait(self._spawn())
+        logger.info(f"{self.max_workers} Crew-Worker-Prozesse gestartet ({self._ctx.get_start_method()}).")
+
+    def wait_ready(self, timeout: Optional[float] = None) -> None:
+        """Blockiert, bis alle Worker ihre Imports abgeschlossen haben."""
+        if not self._all_ready.wait(timeout):
+            raise TimeoutError("Crew-Worker-Prozesse wurden nicht rechtzeitig bereit.")
+
+    def _spawn(self) -> _Worker:
+        jobs = self._ctx.Queue()
+        cancel = self._ctx.Event()
+        # Eine Pipe pro Worker: wird ein Worker beendet, kann er nur seine eigene Pipe beschädigen
+        reader_conn, writer_conn = self._ctx.Pipe(duplex=False)
+        limiter_conn, worker_limiter_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main, args=(jobs, writer_conn, cancel, worker_limiter_conn), name="crew-worker", daemon=True
+        )
+        process.start()
+        # Nur der Worker hält seine Enden – endet er, liefert recv() EOF und die Threads enden
+        writer_conn.close()
+        worker_limiter_conn.close()
+        worker = _Worker(process=process, jobs=jobs, cancel=cancel)
+        self._workers[process.pid] = worker
+        threading.Thread(target=self._read_events, args=(worker, reader_conn), name=f"crew-events-{process.pid}", daemon=True).start()
+        threading.Thread(
+            target=serve_remote_limiter, args=(limiter_conn, self._limiter_executor, cancel),
+            name=f"crew-rate-limit-{process.pid}", daemon=True,
+        ).start()
+        return worker
+
+    def _read_events(self, worker: _Worker, conn: Any) -> None:
+        try:
+            while True:
+                try:
+                    event = conn.recv()
+                except (EOFError, OSError):
+                    return
+                except Exception:
+                    # Abgeschnittene Nachricht eines beendeten Workers
+                    logger.warning(f"Unlesbares Event von Crew-Worker {worker.process.pid} verworfen.", exc_info=True)
+                    return
+                self._loop.call_soon_threadsafe(self._handle_event, worker, event)
+        finally:
+            conn.close()
+
+    def _handle_event(self, worker: _Worker, event) -> None:
+        kind, task_id, payload = event
+        if kind == "log":
+            self.on_log(task_id, payload)
+            return
+        if kind == "trace":
+            if self.on_trace is not None:
+                self.on_trace(payload)
+            return
+        if kind == "ready":
+            self._ready_pids.add(payload)
+            if len(self._ready_pids & self._workers.keys()) >= self.max_workers:
+                self._all_ready.set()
+            return
+        if worker.task_id != task_id or worker.result is None or worker.result.done():
+            return
+        if kind == "result":
+            worker.result.set_result(payload)
+        elif kind == "error":
+            message, remote_traceback = payload
+            worker.result.set_exception(CrewProcessError(message, remote_traceback))
+
+    async def run(self, task_id: str, inputs: Dict[str, Any], llm_cache: Optional[str] = None, log_verbosity: Optional[str] = None) -> Any:
+        worker = await self._idle.get()
+        if not worker.process.is_alive():
+            worker = self._replace(worker)
+        worker.task_id = task_id
+        worker.result = self._loop.create_future()
+        worker.cancel.clear()
+        worker.jobs.put((task_id, inputs, {"llm_cache": llm_cache, "log_verbosity": log_verbosity}))
+        try:
+            while True:
+                done, _ = await asyncio.wait({worker.result}, timeout=1.0)
+                if done:
+                    result = worker.result.result()
+                    break
+                if not worker.process.is_alive():
+                    raise CrewProcessError(f"Crew-Worker-Prozess {worker.process.pid} unerwartet beendet (Exit-Code {worker.process.exitcode}).")
+        except asyncio.CancelledError:
+            if not await self._cancel_cooperatively(worker):
+                worker = self._replace(worker)
+            raise
+        except BaseException:
+            # Absturz: Prozess beenden und durch einen frischen ersetzen
+            worker = self._replace(worker)
+            raise
+        finally:
+            worker.task_id = None
+            worker.result = None
+            self._idle.put_nowait(worker)
+        return result
+
+    async def _cancel_cooperatively(self, worker: _Worker) -> bool:
+        """Setzt das Abbruch-Event und wartet, ob der Worker den Task selbst beendet."""
+        worker.cancel.set()
+        try:
+            done, _ = await asyncio.wait({worker.result}, timeout=CREW_PROCESS_CANCEL_GRACE_S)
+        except asyncio.CancelledError:
+            return False  # Erneuter Abbruch während der Wartezeit: sofort eskalieren
+        if done:
+            worker.result.exception()  # TaskCancelled des Workers gilt als abgerufen
+        if done and worker.process.is_alive():
+            logger.info(f"Task {worker.task_id} in Crew-Worker {worker.process.pid} kooperativ abgebrochen.")
+            return True
+        return False
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        self._workers.pop(worker.process.pid, None)
+        _signal_group(worker.process, signal.SIGTERM)
+        # Warten auf das Prozessende nicht auf dem Event-Loop
+        reap = asyncio.ensure_future(asyncio.to_thread(_reap, worker.process))
+        self._reaping.add(reap)
+        reap.add_done_callback(self._reaping.discard)
+        return self._spawn()
+
+    async def shutdown(self) -> None:
+        workers = list(self._workers.values())
+        self._workers.clear()
+        for worker in workers:
+            worker.jobs.put(None)
+        await asyncio.gather(*(asyncio.to_thread(_reap, worker.process) for worker in workers), *self._reaping)
+        self._limiter_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _signal_group(process: multiprocessing.Process, signum: int) -> None:
+    """Schickt ``signum`` an die Prozessgruppe des Workers (Worker und seine Python-Kernels)."""
+    if process.pid is None:
+        return
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signum)
+            return
+        except ProcessLookupError:
+            pass  # setsid() im Worker noch nicht gelaufen oder Gruppe bereits leer
+        except PermissionError:
+            pass
+    if process.is_alive():
+        process.terminate()
+
+
+def _reap(process: multiprocessing.Process, timeout: float = 5) -> None:
+    process.join(timeout)
+    if process.is_alive():
+        _signal_group(process, signal.SIGTERM)
+        process.join(timeout)
+    if process.is_alive():
+        process.kill()
+        process.join()
+    if hasattr(signal, "SIGKILL"):
+        # Verbliebene Kernel-Prozesse der Gruppe
+        _signal_group(process, signal.SIGKILL)
@@ -0,0 +1,36 @@
+# coding_agent_backend/task_context.py
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# ID des Tasks, in dessen Kontext gerade Code läuft. CrewScheduler.run_blocking kopiert den
+# Kontext in den Worker-Thread, daher sehen auch LLM-Aufrufe und Tools von kickoff() die ID.
+current_task_id: contextvars.ContextVar[str] = contextvars.ContextVar("current_task_id", default="")
+# Datensatz des Tasks (CSV-Pfad), z.B. für das Vorladen als ``df`` im Python-Kernel
+current_dataset_path: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_dataset_path", default=None)
+# Wird gesetzt, wenn der Task abgebrochen wurde; Threads lassen sich nicht von außen beenden,
+# daher prüfen LLM-Aufrufe das Signal und brechen mit TaskCancelled ab (siehe CrewScheduler.run_blocking)
+current_cancel_event: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar("current_cancel_event", default=None)
+
+
+class TaskCancelled(Exception):
+    """Der Task wurde abgebrochen; ausgelöst am nächsten Prüfpunkt im Worker-Thread."""
+
+
+def raise_if_cancelled() -> None:
+    event = current_cancel_event.get()
+    if event is not None and event.is_set():
+        raise TaskCancelled(f"Task {current_task_id.get() or '?'} wurde abgebrochen.")
+
+
+@contextmanager
+def task_scope(task_id: str, dataset_path: Optional[str] = None) -> Iterator[None]:
+    """Rechnet alles, was im aktuellen Kontext läuft, dem Task ``task_id`` (mit ``dataset_path``) zu."""
+    id_token = current_task_id.set(task_id)
+    dataset_token = current_dataset_path.set(dataset_path or None)
+    try:
+        yield
+    finally:
+        current_dataset_path.reset(dataset_token)
+        current_task_id.reset(id_token)
@@ -9,6 +9,7 @@ class data_science_tasks():
             description=(
                 "Projektziel: {user_project_goal}. "
                 "Verwendeter Datensatz: {dataset_path}. "
+                "Profil des Datensatzes:\n{dataset_profile}\n"
                 "Ursprüngliche Benutzeranfrage: {user_raw_query}. "
                 "Erstelle einen Plan für den 'Data Insights Communicator' Agent, welcher dann ein Reporting in einer .ipynb Datei schreibt."
             ),
@@ -74,7 +75,8 @@ class data_science_tasks():
         return Task(
             description=(
                 "Erstelle einen umfassenden Bericht basierend auf der bereitgestellte CSV-Datei {dataset_path}. Fasse alle Schritte zusammen und leite "
-                "Handlungsempfehlungen ab. Benutze panads und seaborn, um die Daten schön darzustellen. Benutze dein Tool dafür."
+                "Handlungsempfehlungen ab. Benutze panads und seaborn, um die Daten schön darzustellen. Benutze dein Tool dafür.\n"
+                "Schema, Statistik und Beispielzeilen des Datensatzes liegen bereits vor – lies die Datei dafür nicht erneut ein:\n{dataset_profile}"
             ),
             expected_output="Fertig formatierter Abschlussbericht im Markdown-Format als ipynb Datei. Mit python (panads und seaborn). Der Code soll ausführar sein.",
             agent=agent,
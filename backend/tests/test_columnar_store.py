@@ -0,0 +1,55 @@
+# coding_agent_backend/tests/test_columnar_store.py
+"""The Arrow copy must give the same dtypes and values as pandas' read_csv."""
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from tools import columnar_store  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Typwechsel erst nach dem ersten Chunk
+    monkeypatch.setattr(columnar_store, "INGEST_CHUNK_ROWS", 100)
+
+
+def _write(path, lines):
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_dtypes_match_read_csv_when_types_change_after_the_first_chunk(tmp_path):
+    rows = ["id,count,code,when,flag"]
+    for row in range(250):
+        count = "" if row == 180 else str(row)  # Fehlender Wert erst im zweiten Chunk
+        code = "x7" if row == 220 else str(row % 10)  # Text erst im dritten Chunk
+        rows.append(f"{row},{count},{code},2024-01-{row % 28 + 1:02d},{'true' if row % 2 else 'false'}")
+    path = _write(tmp_path / "data.csv", rows)
+
+    assert columnar_store.ingest_csv(path) == columnar_store.columnar_path_for(path)
+    assert columnar_store.ingest_status(path) == "ready"
+
+    expected = pd.read_csv(path)
+    actual = columnar_store.read_columnar(path)
+    assert dict(actual.dtypes) == dict(expected.dtypes)
+    assert not pd.api.types.is_datetime64_any_dtype(actual["when"])  # Datum bleibt Text wie bei pandas
+    pd.testing.assert_frame_equal(actual, expected)
+    batches = list(columnar_store.iter_columnar_batches(path))
+    assert sum(len(batch) for batch in batches) == 250
+
+
+def test_failed_ingest_is_recorded(tmp_path):
+    path = _write(tmp_path / "broken.csv", ["a,b", "1,2", "3,4,5,6"])
+
+    assert columnar_store.ingest_csv(path) is None
+    assert columnar_store.ingest_status(path) == "failed"
+    assert "Error" in columnar_store.ingest_error(path)
+
+    # Auch nach einem Neustart (leerer In-Memory-Status) bleibt der Fehlschlag sichtbar
+    columnar_store._ingest_status.clear()
+    assert columnar_store.ingest_status(path) == "failed"
+    assert not os.path.exists(columnar_store.columnar_path_for(path))
@@ -0,0 +1,121 @@
+# coding_agent_backend/tests/test_concurrent_crews.py
+"""
+Runs several crews at the same time in one process (thread mode) with the
+scripted fake LLM from benchmarks/fake_llm.py and checks that the console
+output of every task ends up in its own log only.
+
+    cd backend && python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+import threading
+from collections import defaultdict
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-test")
+os.environ.setdefault("LLM_RPM", "0")
+os.environ.setdefault("LLM_MAX_IN_FLIGHT", "0")
+os.environ.setdefault("LLM_CACHE_MODE", "off")
+os.environ.setdefault("CREWAI_TRACING_ENABLED", "false")
+os.environ.setdefault("BACKEND_PREWARM", "false")
+os.environ["CREW_EXECUTION_BACKEND"] = "thread"
+
+CREW_COUNT = 4
+
+
+class RecordingManager:
+    """Stands in for main.ConnectionManager and keeps every event per task."""
+
+    def __init__(self):
+        self.events = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def publish(self, task_id, message):
+        with self._lock:
+            self.events[task_id].append(message)
+
+    async def send_log_to_task(self, task_id, message):
+        self.publish(task_id, message)
+
+    async def close_connections_for_task(self, task_id, reason_code=1000, reason_text=""):
+        pass
+
+
+@pytest.fixture(scope="module")
+def main_module():
+    import llm_config
+    from fake_llm import FakeLLM
+
+    # Vor dem Import von main ersetzen, damit die Crew-Vorlagen das Fake-LLM nutzen
+    llm_config.override_llms(
+        FakeLLM(model="fake/worker", latency_ms=20),
+        FakeLLM(model="fake/manager", latency_ms=20),
+    )
+    import main
+    from crew_builder import crew_factory
+
+    crew_factory._embedder = None  # offline: kein Embedding-Provider
+    return main
+
+
+def _write_dataset(directory, index):
+    path = os.path.join(str(directory), f"crew{index}_data.csv")
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("category,value\n")
+        handle.writelines(f"{'AB'[row % 2]},{index * 1000 + row}\n" for row in range(50))
+    return path
+
+
+def _inputs(dataset_path, index):
+    return {
+        "user_dataset_description": f"Datensatz {index}",
+        "user_project_goal": "Verteilung beschreiben",
+        "user_raw_query": "Beschreibe die Daten",
+        "dataset_description": f"Datensatz {index}",
+        "dataset_path": dataset_path,
+        "project_goal": "Verteilung beschreiben",
+        "dataset_profile": "Kein Profil.",
+    }
+
+
+def test_concurrent_crews_do_not_share_console_output(main_module, tmp_path, monkeypatch):
+    from log_protocol import CONSOLE, FINAL_RESULT
+
+    # pytest ersetzt sys.stdout je Test durch seine Capture – den Router wie im Server installieren
+    monkeypatch.setattr(sys, "stdout", main_module.stdout_router)
+
+    manager = RecordingManager()
+    datasets = [_write_dataset(tmp_path, index) for index in range(CREW_COUNT)]
+
+    async def run_all():
+        # Lifespan registriert die Crew-Laufzeit und startet die Python-Kernel wie im Server
+        async with main_module.lifespan(main_module.app):
+            await asyncio.gather(*(
+                main_module.run_crew_asynchronously(f"task-{index}", _inputs(path, index), "fake/worker", manager)
+                for index, path in enumerate(datasets)
+            ))
+
+    asyncio.run(run_all())
+
+    spans = {}
+    for index, path in enumerate(datasets):
+        events = manager.events[f"task-{index}"]
+        console = [event for event in events if event.type == CONSOLE]
+        assert any(event.type == FINAL_RESULT for event in events), f"task-{index} ohne Endergebnis"
+        assert console, f"task-{index} ohne Konsolenausgabe"
+        text = "\n".join(str(event.payload) for event in console)
+        assert os.path.basename(path) in text
+        for other_index, other in enumerate(datasets):
+            if other_index != index:
+                assert os.path.basename(other) not in text, f"Ausgabe von task-{other_index} in task-{index}"
+        spans[index] = (console[0].ts, console[-1].ts)
+
+    # Die Crews liefen tatsächlich gleichzeitig (sonst prüft der Test nichts)
+    first_end = min(end for _, end in spans.values())
+    assert sum(start < first_end for start, _ in spans.values()) > 1
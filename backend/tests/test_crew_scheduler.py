@@ -0,0 +1,99 @@
+# coding_agent_backend/tests/test_crew_scheduler.py
+"""Crew scheduler: priority/FIFO ordering, admission control and cancellation."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from crew_scheduler import CrewScheduler, QueueFullError, TaskState
+from task_context import raise_if_cancelled
+
+
+def _run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 30))
+
+
+def test_runs_higher_priority_first_and_fifo_within_a_priority():
+    async def scenario():
+        scheduler = CrewScheduler(max_workers=1, max_queue=10)
+        started, gate = [], asyncio.Event()
+
+        def job(name):
+            async def run():
+                started.append(name)
+                if name == "blocker":
+                    await gate.wait()
+            return run
+
+        scheduler.submit("blocker", job("blocker"))
+        await asyncio.sleep(0)  # Dispatcher nimmt den ersten Task
+        for name, priority in [("low-1", 0), ("high-1", 5), ("low-2", 0), ("high-2", 5)]:
+            scheduler.submit(name, job(name), priority=priority)
+        positions = {name: scheduler.get(name)["queue_position"] for name in ("high-1", "high-2", "low-1", "low-2")}
+        gate.set()
+        while len(started) < 5:
+            await asyncio.sleep(0.01)
+        await scheduler.shutdown()
+        return started, positions
+
+    started, positions = _run(scenario())
+    assert started == ["blocker", "high-1", "high-2", "low-1", "low-2"]
+    assert positions == {"high-1": 0, "high-2": 1, "low-1": 2, "low-2": 3}
+
+
+def test_rejects_when_full_and_cancelled_entries_free_their_place():
+    async def scenario():
+        scheduler = CrewScheduler(max_workers=1, max_queue=2)
+        gate = asyncio.Event()
+
+        async def wait():
+            await gate.wait()
+
+        scheduler.submit("running", wait)
+        await asyncio.sleep(0)
+        scheduler.submit("a", wait)
+        scheduler.submit("b", wait)
+        with pytest.raises(QueueFullError):
+            scheduler.submit("c", wait)
+        assert scheduler.cancel("a")
+        scheduler.submit("c", wait)
+        assert scheduler.get("a")["state"] == TaskState.CANCELLED.value
+        assert scheduler.get("c")["queue_position"] == 1
+        gate.set()
+        while scheduler.get("c")["state"] != TaskState.COMPLETED.value:
+            await asyncio.sleep(0.01)
+        await scheduler.shutdown()
+
+    _run(scenario())
+
+
+def test_cancelling_a_running_task_waits_for_its_thread():
+    async def scenario():
+        scheduler = CrewScheduler(max_workers=1, max_queue=2)
+        running, stopped = threading.Event(), threading.Event()
+
+        def work():
+            running.set()
+            try:
+                while True:
+                    raise_if_cancelled()
+                    time.sleep(0.01)
+            finally:
+                stopped.set()
+
+        async def job():
+            await scheduler.run_blocking(work)
+
+        scheduler.submit("task", job)
+        while not running.is_set():
+            await asyncio.sleep(0.01)
+        assert scheduler.cancel("task")
+        assert scheduler.get("task")["state"] == TaskState.CANCELLING.value
+        while scheduler.get("task")["state"] == TaskState.CANCELLING.value:
+            await asyncio.sleep(0.01)
+        state = scheduler.get("task")["state"]
+        await scheduler.shutdown()
+        return state, stopped.is_set()
+
+    assert _run(scenario()) == (TaskState.CANCELLED.value, True)
@@ -0,0 +1,75 @@
+# coding_agent_backend/tests/test_csv_search_engine.py
+"""Vectorized CSV search: same rows as a naive row-by-row scan, paged across blocks."""
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.csv_search_engine import NumericRange, search_dataframe
+
+
+@pytest.fixture(scope="module")
+def frame():
+    rng = np.random.default_rng(1)
+    rows = 1000
+    return pd.DataFrame({
+        "city": rng.choice(["Berlin", "Bern", "Bonn", None], rows),
+        "note": rng.choice(["Nan", "a.b", "A+B", "ok"], rows),
+        "price": np.where(rng.random(rows) < 0.1, np.nan, rng.integers(0, 100, rows)),
+        "amount": rng.choice(["12", "x", "40"], rows),
+    })
+
+
+def _naive(frame, matches, columns=None, ranges=()):
+    expected = []
+    for position, (_, row) in enumerate(frame.iterrows()):
+        in_range = all(
+            pd.notna(pd.to_numeric(row[r.column], errors="coerce"))
+            and (r.min is None or float(row[r.column]) >= r.min)
+            and (r.max is None or float(row[r.column]) <= r.max)
+            for r in ranges
+        )
+        text = any(pd.notna(row[c]) and matches(str(row[c]).lower()) for c in (columns or frame.columns))
+        if in_range and text:
+            expected.append(position)
+    return expected
+
+
+@pytest.mark.parametrize("query, mode, matches", [
+    ("BER", "literal", lambda value: "ber" in value),
+    ("a.b", "literal", lambda value: "a.b" in value),
+    ("nan", "literal", lambda value: "nan" in value),  # fehlende Werte passen nie, der Text "Nan" schon
+    (r"^b(er|on)n$", "regex", lambda value: re.search(r"^b(er|on)n$", value) is not None),
+])
+def test_matches_a_naive_scan(frame, query, mode, matches):
+    result = search_dataframe(frame, query, mode=mode, max_rows=len(frame), block_rows=64)
+    assert list(result.matches.index) == _naive(frame, matches)
+    assert not result.has_more
+
+
+def test_columns_and_numeric_ranges_combine(frame):
+    ranges = [NumericRange("price", min=10, max=50), NumericRange("amount", min=20)]
+    result = search_dataframe(frame, "bern", columns=["city"], numeric_ranges=ranges, max_rows=len(frame), block_rows=64)
+    assert list(result.matches.index) == _naive(frame, lambda value: "bern" in value, ["city"], ranges)
+
+
+def test_pages_are_contiguous_and_scan_stops_early(frame):
+    everything = list(search_dataframe(frame, "bonn", max_rows=len(frame)).matches.index)
+    pages, offset = [], 0
+    while True:
+        result = search_dataframe(frame, "bonn", offset=offset, max_rows=20, block_rows=50)
+        pages += list(result.matches.index)
+        if offset == 0:
+            assert result.scanned_rows < len(frame)
+        if not result.has_more:
+            break
+        offset += 20
+    assert pages == everything
+
+
+def test_rejects_unknown_columns_and_modes(frame):
+    with pytest.raises(KeyError):
+        search_dataframe(frame, "x", columns=["missing"])
+    with pytest.raises(ValueError):
+        search_dataframe(frame, "x", mode="fuzzy")
@@ -0,0 +1,67 @@
+# coding_agent_backend/tests/test_dataframe_cache.py
+"""Shared DataFrame cache: hits, invalidation on change, byte-bounded LRU eviction."""
+import os
+import threading
+
+import pandas as pd
+
+from tools.dataframe_cache import DataFrameCache
+
+
+def _write(path, rows):
+    pd.DataFrame({"a": range(rows), "b": [f"x{i}" for i in range(rows)]}).to_csv(path, index=False)
+    return str(path)
+
+
+def test_repeated_reads_are_served_from_the_cache(tmp_path):
+    cache = DataFrameCache()
+    path = _write(tmp_path / "data.csv", 10)
+    first = cache.read_csv(path)
+    assert cache.read_csv(path) is first
+    assert cache.read_csv(path, usecols=["a"]) is not first  # andere Optionen, eigener Eintrag
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_changed_file_replaces_the_stale_entry(tmp_path):
+    cache = DataFrameCache()
+    path = _write(tmp_path / "data.csv", 10)
+    assert len(cache.read_csv(path)) == 10
+    _write(path, 20)
+    os.utime(path, ns=(1, 1))  # andere mtime, auch bei grober Zeitauflösung
+    assert len(cache.read_csv(path)) == 20
+    assert cache.stats()["entries"] == 1
+
+
+def test_evicts_least_recently_used_entries_by_size(tmp_path):
+    paths = [_write(tmp_path / f"data{i}.csv", 1000) for i in range(3)]
+    size = int(pd.read_csv(paths[0]).memory_usage(deep=True).sum())
+    cache = DataFrameCache(max_bytes=2 * size + size // 2)
+    cache.read_csv(paths[0])
+    cache.read_csv(paths[1])
+    cache.read_csv(paths[0])  # data0 zuletzt benutzt
+    cache.read_csv(paths[2])
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 1 and stats["bytes"] <= cache.max_bytes
+    hits = stats["hits"]
+    cache.read_csv(paths[0])
+    assert cache.stats()["hits"] == hits + 1
+
+
+def test_concurrent_misses_parse_once_and_derived_artifacts_are_kept(tmp_path):
+    cache = DataFrameCache()
+    path = _write(tmp_path / "data.csv", 5000)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.read_csv(path))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats()["misses"] == 1 and all(df is results[0] for df in results)
+
+    builds = []
+    build = lambda df: builds.append(1) or df["a"].to_numpy() * 2
+    first = cache.get_derived(path, "double", build)
+    assert cache.get_derived(path, "double", build) is first and len(builds) == 1
+    cache.invalidate(path)
+    cache.get_derived(path, "double", build)
+    assert len(builds) == 2
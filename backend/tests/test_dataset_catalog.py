@@ -0,0 +1,53 @@
+# coding_agent_backend/tests/test_dataset_catalog.py
+"""Dataset catalog: paging, sorting and filtering behind /api/datasets."""
+import pytest
+
+from dataset_catalog import DatasetCatalog
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = DatasetCatalog(str(tmp_path / "datasets.sqlite3"))
+    # Gleiche Größen erzwingen den Gleichstand, der über den Namen aufgelöst wird
+    for index, name in enumerate(["b.csv", "a.csv", "d_1.csv", "c.csv", "d%1.csv"]):
+        catalog.upsert(name, f"/u/{name}", f"/u/.objects/{index}.csv", str(index), size=100 * (index // 2),
+                       uploaded_at=1000.0 + index, rows=index, ingest_status="ready" if index % 2 else "pending")
+    return catalog
+
+
+def _names(page):
+    return [row["name"] for row in page]
+
+
+def test_pages_cover_every_dataset_exactly_once(catalog):
+    seen = []
+    for offset in range(0, 5, 2):
+        page, total = catalog.query(limit=2, offset=offset, sort="name", descending=False)
+        assert total == 5 and len(page) <= 2
+        seen += _names(page)
+    assert seen == ["a.csv", "b.csv", "c.csv", "d%1.csv", "d_1.csv"]
+    assert catalog.query(limit=2, offset=10)[0] == []
+
+
+def test_sort_breaks_ties_by_name_in_the_same_direction(catalog):
+    ascending, _ = catalog.query(sort="size", descending=False)
+    assert [(row["size"], row["name"]) for row in ascending] == [
+        (0, "a.csv"), (0, "b.csv"), (100, "c.csv"), (100, "d_1.csv"), (200, "d%1.csv"),
+    ]
+    descending, _ = catalog.query(sort="size", descending=True)
+    assert _names(descending) == list(reversed(_names(ascending)))
+    newest, _ = catalog.query(limit=1)
+    assert _names(newest) == ["d%1.csv"]  # Standard: neueste zuerst
+
+
+def test_search_treats_like_wildcards_literally_and_combines_with_status(catalog):
+    assert _names(catalog.query(search="D_1", sort="name", descending=False)[0]) == ["d_1.csv"]
+    assert _names(catalog.query(search="%", sort="name", descending=False)[0]) == ["d%1.csv"]
+    page, total = catalog.query(ingest_status="ready", sort="name", descending=False)
+    assert total == 2 and _names(page) == ["a.csv", "c.csv"]
+
+
+def test_rejects_unknown_sort_field_and_clamps_page_size(catalog):
+    with pytest.raises(ValueError):
+        catalog.query(sort="name; DROP TABLE datasets")
+    assert len(catalog.query(limit=0)[0]) == 1
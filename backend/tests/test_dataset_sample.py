@@ -0,0 +1,85 @@
+# coding_agent_backend/tests/test_dataset_sample.py
+"""Stratified sampler: same rows as a direct bottom-k draw, honest intervals, fresh-only cache."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools import dataset_sample, streaming_stats
+from tools.dataset_sample import build_sample, ensure_sample, load_sample
+
+ROWS = 20_000
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    rng = np.random.default_rng(7)
+    group = rng.choice(["common", "medium", "rare"], ROWS, p=[0.9, 0.09, 0.01])
+    value = rng.normal(100, 15, ROWS) + np.where(group == "rare", 200, 0)
+    frame = pd.DataFrame({"group": group, "value": value.round(3), "flag": rng.random(ROWS) < 0.3})
+    path = tmp_path_factory.mktemp("sample") / "data.csv"
+    frame.to_csv(path, index=False)
+    return str(path), pd.read_csv(path)
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Mehrere Chunks, damit die Schwellen zwischen den Chunks greifen
+    monkeypatch.setattr(dataset_sample, "iter_chunks", lambda path: streaming_stats.iter_chunks(path, 1_500))
+    monkeypatch.setattr(dataset_sample, "SAMPLE_MIN_PER_STRATUM", 50)
+
+
+def _bottom_k(frame, size, seed, stratify_by=None, minimum=0):
+    keys = pd.Series(np.random.default_rng(seed).random(len(frame)), index=frame.index)
+    chosen = set(keys.nsmallest(size).index)
+    if stratify_by is not None:
+        for _, group_keys in keys.groupby(frame[stratify_by]):
+            chosen |= set(group_keys.nsmallest(minimum).index)
+    return sorted(chosen)
+
+
+@pytest.mark.parametrize("stratify_by", [None, "group"])
+def test_chunked_pass_picks_the_rows_of_a_direct_draw(dataset, small_chunks, stratify_by):
+    path, frame = dataset
+    sample = build_sample(path, stratify_by, size=500, seed=3)
+    assert list(sample.frame.index) == _bottom_k(frame, 500, 3, stratify_by, minimum=50)
+    pd.testing.assert_frame_equal(sample.frame, frame.loc[sample.frame.index], check_dtype=False)
+    assert sample.rows == ROWS
+    if stratify_by:
+        assert sample.population == {k: int(v) for k, v in frame["group"].value_counts().items()}
+        assert min(sample.sampled.values()) >= 50
+    else:
+        assert sample.population == {dataset_sample.ALL_ROWS: ROWS}
+
+
+def test_intervals_cover_the_true_values(dataset, small_chunks):
+    path, frame = dataset
+    true_mean, true_share = frame["value"].mean(), frame["flag"].mean()
+    covered_mean = covered_share = 0
+    seeds = range(40)
+    for seed in seeds:
+        sample = build_sample(path, "group", size=600, seed=seed)
+        mean, half = sample.estimate_mean("value")
+        covered_mean += abs(mean - true_mean) <= half
+        share, half = sample.estimate_proportion(sample.frame["flag"].astype(bool))
+        covered_share += abs(share - true_share) <= half
+    # 95 %-Intervalle: bei 40 Ziehungen höchstens wenige Ausreißer
+    assert covered_mean >= 34 and covered_share >= 34
+    # Gewichte rechnen die überrepräsentierte seltene Gruppe wieder auf ihren Anteil herunter
+    weights = sample.weights.groupby(sample.strata).first()
+    assert weights["rare"] < weights["common"]
+    assert sample.weights.sum() == pytest.approx(ROWS)
+
+
+def test_cached_sample_is_reused_until_the_file_changes(tmp_path, small_chunks):
+    path = tmp_path / "data.csv"
+    pd.DataFrame({"x": range(3000)}).to_csv(path, index=False)
+    first = ensure_sample(str(path))
+    assert os.path.exists(first.path)
+    assert ensure_sample(str(path)) is first and load_sample(str(path)) is first
+
+    pd.DataFrame({"x": range(4000)}).to_csv(path, index=False)
+    os.utime(path, ns=(1, 1))
+    assert load_sample(str(path)) is None
+    assert ensure_sample(str(path)).rows == 4000
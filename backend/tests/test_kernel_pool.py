@@ -0,0 +1,87 @@
+# coding_agent_backend/tests/test_kernel_pool.py
+"""Python kernel pool: one kernel per task, recycling and dataset binding."""
+import os
+import threading
+import time
+
+import pytest
+
+from kernel_pool import PythonKernelPool
+from task_context import TaskCancelled, current_cancel_event
+
+
+@pytest.fixture
+def pool():
+    pool = PythonKernelPool(size=1, max_kernels=2, timeout=10, memory_mb=0, preload=[])
+    yield pool
+    pool.shutdown()
+
+
+def test_tasks_get_kernels_of_their_own(pool):
+    pool.run_cell("task-a", "x = 1")
+    pool.run_cell("task-a:notebook:a.ipynb", "y = 2")
+    pool.run_cell("task-b", "x = 2")
+    kernels = {session: kernel for session, kernel in pool._assignments.items()}
+    assert kernels["task-a"] is kernels["task-a:notebook:a.ipynb"]
+    assert kernels["task-a"] is not kernels["task-b"]
+
+    # Ein Timeout in Task a kostet Task b nichts
+    aborted = pool.run_cell("task-a", "import time; time.sleep(30)", timeout=0.5)
+    assert aborted.error["ename"] == "ExecutionAborted"
+    kept = pool.run_cell("task-b", "x")
+    assert kept.ok and kept.output.strip() == "2" and not kept.namespace_reset
+    assert pool.run_cell("task-a:notebook:a.ipynb", "1").namespace_reset
+
+
+def test_released_kernel_is_reused_and_waiters_continue(pool):
+    pool.run_cell("task-a", "x = 1")
+    pool.run_cell("task-b", "x = 1")
+    assert pool.stats()["kernels"] == 2
+
+    done = threading.Event()
+    threading.Thread(target=lambda: (pool.run_cell("task-c", "x = 3"), done.set()), daemon=True).start()
+    assert not done.wait(1.5)  # Obergrenze erreicht: task-c wartet
+    pool.release("task-a")
+    assert done.wait(20)
+    result = pool.run_cell("task-c", "'x' in dir()")
+    assert result.output.strip() == "True"
+    assert pool.stats()["kernels"] == 2
+
+
+def test_waiting_for_a_kernel_can_be_cancelled(pool):
+    pool.run_cell("task-a", "x = 1")
+    pool.run_cell("task-b", "x = 1")
+    cancel = threading.Event()
+    errors = []
+
+    def wait():
+        current_cancel_event.set(cancel)
+        try:
+            pool.run_cell("task-c", "x = 3")
+        except TaskCancelled as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=wait, daemon=True)
+    thread.start()
+    time.sleep(0.5)
+    cancel.set()
+    thread.join(5)
+    assert errors and "task-c" not in pool._assignments
+
+
+def test_dataset_bind_timeout_runs_code_without_df_and_is_not_retried(tmp_path):
+    fifo = tmp_path / "blocked.csv"
+    os.mkfifo(fifo)  # read_csv blockiert, bis jemand schreibt
+    dataset = {"csv": str(fifo), "arrow": None, "sample": None}
+    pool = PythonKernelPool(size=1, max_kernels=1, timeout=10, bind_timeout=1, memory_mb=0, preload=[])
+    try:
+        first = pool.run_cell("task-a", "x = 1\n'df' in dir()", dataset=dataset)
+        assert first.ok and first.output.strip() == "False"
+        assert any("vorgeladen" in note for note in first.notes)
+        assert pool.recycled == 1
+
+        second = pool.run_cell("task-a", "x", dataset=dataset)
+        assert second.ok and second.output.strip() == "1" and not second.notes
+        assert pool.recycled == 1
+    finally:
+        pool.shutdown()
@@ -0,0 +1,67 @@
+# coding_agent_backend/tests/test_llm_cache.py
+"""LLM response cache: key stability, cache modes, TTL and size-bounded eviction."""
+import time
+
+import pytest
+
+from llm_cache import LLMCacheMiss, LLMResponseCache, cache_session, install_llm_cache, make_cache_key
+
+
+class _ScriptedLLM:
+    model = "test/model"
+    temperature = 0.0
+    stop = None
+
+    def __init__(self):
+        self.calls = 0
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        self.calls += 1
+        return f"Antwort {self.calls}"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(str(tmp_path / "llm_cache.sqlite3"), max_bytes=10_000, ttl_seconds=60)
+
+
+def test_key_ignores_formatting_but_not_content():
+    base = make_cache_key("m", [{"role": "user", "content": "Hallo"}], 0.0, ["a", "b"])
+    assert make_cache_key("m", "  Hallo\n", 0.0, ["b", "a"]) == base
+    assert make_cache_key("m", "Hallo!", 0.0, ["a", "b"]) != base
+    assert make_cache_key("m", "Hallo", 0.7, ["a", "b"]) != base
+    assert make_cache_key("m", "Hallo", 0.0, ["a", "b"], tools=[{"function": {"name": "search"}}]) != base
+
+
+def test_modes_control_reads_and_writes(cache):
+    llm = install_llm_cache(_ScriptedLLM(), cache)
+    assert llm.call("Frage") == "Antwort 1"  # ohne Session kein Cache
+    with cache_session("read_write") as session:
+        assert llm.call("Frage") == "Antwort 2"
+        assert llm.call("Frage") == "Antwort 2"
+        assert llm.call("Frage", available_functions={"f": print}) == "Antwort 3"  # nie gecacht
+    assert (session.hits, session.misses, session.stored) == (1, 1, 1)
+    with cache_session("record"):
+        assert llm.call("Frage") == "Antwort 4"
+    with cache_session("replay"):
+        assert llm.call("Frage") == "Antwort 4"
+        with pytest.raises(LLMCacheMiss):
+            llm.call("Unbekannt")
+    assert llm.calls == 4
+
+
+def test_expired_entries_are_only_served_in_replay(cache):
+    cache.put("k", "m", "alt")
+    cache._connection().execute("UPDATE responses SET created_at = ?", (time.time() - 120,))
+    assert cache.get("k", ignore_ttl=True) == "alt"
+    assert cache.get("k") is None
+    assert cache.get("k", ignore_ttl=True) is None  # beim Ablauf entfernt
+
+
+def test_evicts_least_recently_used_responses(cache):
+    for index in range(4):
+        cache.put(f"k{index}", "m", "x" * 3000)
+        cache.get("k0")  # k0 bleibt zuletzt benutzt
+    stats = cache.stats()
+    assert stats["bytes"] <= cache.max_bytes and stats["entries"] == 3
+    assert cache.get("k0") is not None and cache.get("k1") is None
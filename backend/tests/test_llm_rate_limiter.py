@@ -0,0 +1,187 @@
+# coding_agent_backend/tests/test_llm_rate_limiter.py
+"""LLM rate limiting: buckets, fair admission, 429 handling and one budget shared by all worker processes."""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import llm_rate_limiter
+from llm_rate_limiter import (
+    LLMRateLimiter, ModelLimiter, RateLimitExceeded, TokenBucket, install_rate_limiter, is_rate_limit_error,
+    serve_remote_limiter,
+)
+from task_context import TaskCancelled, task_scope
+
+MODEL = "test/model"
+
+
+@pytest.fixture
+def parent():
+    limiter = LLMRateLimiter()
+    limiter._models[MODEL] = ModelLimiter(MODEL, rpm=0, tpm=0, max_in_flight=1)
+    executor = ThreadPoolExecutor(max_workers=8)
+    yield limiter, executor
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _connect_worker(parent, cancel=None):
+    """Ein "Worker" (Client-Limiter) samt Server-Thread im Hauptprozess, verbunden über eine Pipe."""
+    limiter, executor = parent
+    server_end, worker_end = multiprocessing.Pipe()
+    threading.Thread(target=serve_remote_limiter, args=(server_end, executor, cancel, limiter), daemon=True).start()
+    worker = LLMRateLimiter()
+    worker.use_remote(worker_end)
+    return worker, worker_end
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Bedingung nicht erreicht"
+        time.sleep(0.01)
+
+
+def test_workers_share_the_main_process_budget(parent):
+    first, _ = _connect_worker(parent)
+    second, _ = _connect_worker(parent)
+    shared = parent[0].for_model(MODEL)
+
+    first.for_model(MODEL).acquire("task-a", 10)
+    assert shared.stats()["in_flight"] == 1
+
+    admitted = threading.Event()
+    def acquire_second():
+        second.for_model(MODEL).acquire("task-b", 10)
+        admitted.set()
+    threading.Thread(target=acquire_second, daemon=True).start()
+    _wait_until(lambda: shared.stats()["waiting"] == 1)
+    assert not admitted.is_set()  # max_in_flight=1 gilt über beide Worker
+
+    first.for_model(MODEL).release(10, 12)
+    assert admitted.wait(5)
+    assert shared.stats()["in_flight"] == 1
+
+
+def test_cancel_flag_ends_a_waiting_acquire(parent):
+    holder, _ = _connect_worker(parent)
+    cancel = multiprocessing.Event()
+    waiter, _ = _connect_worker(parent, cancel)
+    holder.for_model(MODEL).acquire("task-a", 10)
+
+    errors = []
+    def acquire():
+        try:
+            waiter.for_model(MODEL).acquire("task-b", 10)
+        except TaskCancelled as e:
+            errors.append(e)
+    thread = threading.Thread(target=acquire, daemon=True)
+    thread.start()
+    _wait_until(lambda: parent[0].for_model(MODEL).stats()["waiting"] == 1)
+    cancel.set()
+    thread.join(5)
+    assert len(errors) == 1
+    assert parent[0].for_model(MODEL).stats()["waiting"] == 0
+
+
+def _acquire_and_die(connection):
+    worker = LLMRateLimiter()
+    worker.use_remote(connection)
+    worker.for_model(MODEL).acquire("task-a", 10)
+    os._exit(1)  # Absturz ohne release
+
+
+def test_slots_of_a_vanished_worker_are_released(parent):
+    limiter, executor = parent
+    server_end, worker_end = multiprocessing.Pipe()
+    threading.Thread(target=serve_remote_limiter, args=(server_end, executor, None, limiter), daemon=True).start()
+    process = multiprocessing.get_context("spawn").Process(target=_acquire_and_die, args=(worker_end,))
+    process.start()
+    worker_end.close()
+    process.join(30)
+    assert process.exitcode == 1
+    _wait_until(lambda: limiter.for_model(MODEL).stats()["in_flight"] == 0)
+    # Der Slot steht dem nächsten Worker wieder zur Verfügung
+    other, _ = _connect_worker(parent)
+    other.for_model(MODEL).acquire("task-b", 10)
+
+
+def test_token_bucket_waits_for_the_missing_share():
+    bucket = TokenBucket(60)  # 1 pro Sekunde
+    now = bucket.updated
+    bucket.consume(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 0.5) == pytest.approx(0.5)
+    assert bucket.wait_time(500, now) == pytest.approx(60.0)  # größer als die Kapazität: auf vollen Bucket warten
+    assert TokenBucket(0).wait_time(10 ** 6, now) == 0.0
+
+
+def test_waiting_tasks_are_admitted_round_robin():
+    limiter = ModelLimiter(MODEL, rpm=0, tpm=0, max_in_flight=1)
+    limiter.acquire("holder", 1)
+    admitted = []
+
+    def acquire(task_key, name):
+        limiter.acquire(task_key, 1)
+        admitted.append(name)
+
+    for index, (task_key, name) in enumerate([("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1")], start=1):
+        threading.Thread(target=acquire, args=(task_key, name), daemon=True).start()
+        _wait_until(lambda: limiter.stats()["waiting"] == index)
+    for count in range(1, 5):
+        limiter.release(1, 1)
+        _wait_until(lambda: len(admitted) == count)
+    assert admitted == ["a1", "b1", "a2", "a3"]
+
+
+class _HTTPError(Exception):
+    def __init__(self, message, status_code=None, headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": headers or {}, "status_code": status_code})()
+
+
+def test_detects_only_real_rate_limit_errors():
+    assert is_rate_limit_error(_HTTPError("Too Many Requests", status_code=429))
+    assert is_rate_limit_error(RuntimeError("wrapped: HTTP status 429"))
+    assert not is_rate_limit_error(_HTTPError("429 rows processed", status_code=500))
+    assert not is_rate_limit_error(ValueError("Spalte 429 fehlt"))
+    try:
+        try:
+            raise _HTTPError("limit", status_code=429)
+        except _HTTPError as e:
+            raise RuntimeError("Aufruf fehlgeschlagen") from e
+    except RuntimeError as chained:
+        assert is_rate_limit_error(chained)
+
+
+def test_retries_rate_limits_with_retry_after_and_gives_up(monkeypatch):
+    monkeypatch.setattr(llm_rate_limiter, "LLM_MAX_RETRIES", 2)
+    limiter = LLMRateLimiter()
+    limiter._models[MODEL] = ModelLimiter(MODEL, rpm=0, tpm=0, max_in_flight=1)
+
+    class _LLM:
+        model = MODEL
+        max_tokens = 10
+
+        def __init__(self, failures):
+            self.failures = failures
+            self.calls = 0
+
+        def call(self, messages, *args, **kwargs):
+            self.calls += 1
+            if self.calls <= self.failures:
+                raise _HTTPError("slow down", status_code=429, headers={"retry-after": "0"})
+            return "ok"
+
+    with task_scope("task-a"):
+        flaky = install_rate_limiter(_LLM(failures=2), limiter)
+        assert flaky.call("Frage") == "ok" and flaky.calls == 3
+        broken = install_rate_limiter(_LLM(failures=10), limiter)
+        with pytest.raises(RateLimitExceeded):
+            broken.call("Frage")
+        assert broken.calls == 3
+    stats = limiter.for_model(MODEL).stats()
+    assert stats["in_flight"] == 0 and stats["throttled"] == 4
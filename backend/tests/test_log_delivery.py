@@ -0,0 +1,64 @@
+# coding_agent_backend/tests/test_log_delivery.py
+"""Per-task event log: sequencing, replay with ``since`` and the slow-consumer policy."""
+import asyncio
+import json
+
+from log_delivery import Subscriber, TaskEventLog
+from log_protocol import CONSOLE, JSON, SYSTEM, LogEvent, final_result_event
+
+
+def _log(count, max_events=100):
+    event_log = TaskEventLog(max_events=max_events)
+    for index in range(count):
+        event_log.append(LogEvent(CONSOLE, f"Zeile {index + 1}", text=f"Zeile {index + 1}"))
+    return event_log
+
+
+def test_since_returns_everything_after_the_given_sequence_number():
+    event_log = _log(10)
+    assert [event.seq for event in event_log.since(0)] == list(range(1, 11))
+    assert [event.seq for event in event_log.since(7)] == [8, 9, 10]
+    assert event_log.since(10) == [] and event_log.since(99) == []
+
+
+def test_replay_notes_events_that_are_no_longer_retained():
+    event_log = _log(10, max_events=4)
+    assert event_log.first_seq == 7
+    backlog = event_log.replay(2)
+    assert backlog[0].type == SYSTEM and "3-6" in backlog[0].payload
+    assert [event.seq for event in backlog[1:]] == [7, 8, 9, 10]
+    assert [event.seq for event in event_log.replay(6)] == [7, 8, 9, 10]  # lückenlos, kein Hinweis
+    assert _log(0).replay(0) == []
+
+
+class _SlowWebSocket:
+    def __init__(self):
+        self.frames = []
+        self.release = asyncio.Event()
+
+    async def send_text(self, frame):
+        await self.release.wait()
+        self.frames.append(frame)
+
+    async def send_bytes(self, frame):
+        await self.send_text(frame)
+
+
+def test_resumed_client_gets_the_backlog_in_order_and_keeps_protected_events():
+    async def run():
+        event_log = _log(50)
+        event_log.append(final_result_event({"status": "ok"}))
+        websocket = _SlowWebSocket()
+        subscriber = Subscriber(websocket, "task-1", flush_interval=0.001, buffer_bytes=200, fmt=JSON)
+        for event in event_log.replay(20):
+            subscriber.push(event)
+        websocket.release.set()
+        await subscriber.drain()
+        return [event for frame in websocket.frames for event in json.loads(frame)["events"]]
+
+    events = asyncio.run(run())
+    numbered = [event["seq"] for event in events if event["seq"]]
+    assert numbered == sorted(numbered) and numbered[0] > 20
+    assert events[-1]["type"] == "final_result" and events[-1]["seq"] == 51
+    # Zu langsamer Client: ältere Zeilen werden verworfen und als Hinweis gemeldet
+    assert any(event["type"] == SYSTEM and "ausgelassen" in event["payload"] for event in events)
@@ -0,0 +1,77 @@
+# coding_agent_backend/tests/test_log_protocol.py
+"""Wire formats of the log WebSocket: every frame decodes back to the events that went in."""
+import asyncio
+import json
+
+import msgpack
+import pytest
+
+from log_delivery import Subscriber
+from log_protocol import (
+    CHUNK, CONSOLE, JSON, LEGACY, MSGPACK, LogEvent, encode_batch, error_event, event_from_text,
+    final_result_event, split_event, system_event,
+)
+
+
+def _events():
+    return [
+        LogEvent(CONSOLE, "Zeile 1\nZeile 2", text="Zeile 1\nZeile 2", seq=1),
+        system_event("Task gestartet."),
+        error_event("Fehler:\nTraceback ..."),
+        final_result_event({"status": "ok", "rows": 3}),
+    ]
+
+
+def test_legacy_sends_one_frame_per_event_even_with_newlines():
+    events = _events()
+    frames = encode_batch(events, LEGACY)
+    assert frames == [event.text for event in events]
+    decoded = [event_from_text(frame) for frame in frames]
+    assert [event.type for event in decoded] == [event.type for event in events]
+    assert [event.payload for event in decoded] == [event.payload for event in events]
+
+
+@pytest.mark.parametrize("fmt, loads", [(JSON, json.loads), (MSGPACK, msgpack.unpackb)])
+def test_typed_formats_send_the_batch_as_one_envelope(fmt, loads):
+    events = _events()
+    frames = encode_batch(events, fmt)
+    assert len(frames) == 1
+    envelope = loads(frames[0])
+    assert envelope["v"] == 1
+    assert envelope["events"] == [json.loads(json.dumps(event.to_dict())) for event in events]
+
+
+def test_chunks_reassemble_to_the_original_payload():
+    payload = {"rows": ["x" * 50] * 40}
+    event = LogEvent(CONSOLE, payload, seq=7)
+    chunks = split_event(event, chunk_bytes=100)
+    assert len(chunks) > 1
+    assert all(chunk.type == CHUNK and chunk.seq == 7 for chunk in chunks)
+    envelope = json.loads(encode_batch(chunks, JSON)[0])
+    parts = sorted(envelope["events"], key=lambda e: e["payload"]["index"])
+    assert json.loads("".join(part["payload"]["data"] for part in parts)) == payload
+
+
+class _FakeWebSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def send_text(self, frame):
+        self.frames.append(frame)
+
+    async def send_bytes(self, frame):
+        self.frames.append(frame)
+
+
+def test_legacy_subscriber_keeps_one_message_per_frame():
+    async def run():
+        websocket = _FakeWebSocket()
+        subscriber = Subscriber(websocket, "task-1", flush_interval=0.01, fmt=LEGACY)
+        events = _events()
+        for event in events:
+            subscriber.push(event)
+        await subscriber.drain()
+        return websocket.frames, events
+
+    frames, events = asyncio.run(run())
+    assert frames == [event.text for event in events]
@@ -0,0 +1,71 @@
+# coding_agent_backend/tests/test_notebook_writer_tool.py
+"""Notebook writer: incremental execution from the cell cache, live state per kernel session."""
+import nbformat
+import pytest
+
+from kernel_pool import PythonKernelPool
+from task_context import task_scope
+from tools import Notebook_writer_tool
+from tools.Notebook_writer_tool import NotebookCellCache, NotebookWriterTool
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = PythonKernelPool(size=1, max_kernels=2, timeout=10, memory_mb=0, preload=[])
+    monkeypatch.setattr(Notebook_writer_tool, "python_kernel_pool", pool)
+    yield pool
+    pool.shutdown()
+
+
+def test_live_cells_are_dropped_when_the_task_is_released(pool, tmp_path):
+    tool = NotebookWriterTool()
+    tool._cell_cache = NotebookCellCache(str(tmp_path / "cells"))
+    for task_id in ("task-a", "task-b"):
+        with task_scope(task_id):
+            output = tool._run(f"x = {task_id!r}\n# %%\nprint(x)", str(tmp_path / f"{task_id}.ipynb"), execute=True)
+        assert "Fehler" not in output
+    assert sorted(session.split(":")[0] for session in tool._live) == ["task-a", "task-b"]
+
+    pool.release("task-a")
+    assert [session.split(":")[0] for session in tool._live] == ["task-b"]
+    pool.release("task-b")
+    assert tool._live == {}
+
+
+def test_release_listener_does_not_keep_the_tool_alive(pool):
+    tool = NotebookWriterTool()
+    del tool
+    pool.release("task-a")  # ein verwaister Listener wird übersprungen
+    assert all(ref() is None for ref in pool._release_listeners)
+
+
+def test_unchanged_cells_come_from_the_cache_and_the_live_namespace(pool, tmp_path):
+    tool = NotebookWriterTool()
+    tool._cell_cache = NotebookCellCache(str(tmp_path / "cells"))
+    filename = str(tmp_path / "analysis.ipynb")
+    cells = ["x = 2", "y = x * 10", "print(y)"]
+
+    def run(cells):
+        with task_scope("task-a"):
+            return tool._run("\n# %%\n".join(cells), filename, execute=True)
+
+    assert "3 ausgeführt, 0 aus dem Cache" in run(cells)
+    assert "0 ausgeführt, 3 aus dem Cache" in run(cells)
+    # Angehängte Zelle: die Vorgänger stecken schon im Live-Namespace, nur sie läuft
+    assert "1 ausgeführt, 3 aus dem Cache" in run(cells + ["print(y + 1)"])
+    # Geänderte Zelle: ihr alter Zustand steckt im Namespace, daher läuft alles neu
+    assert "4 ausgeführt, 0 aus dem Cache" in run(["x = 3"] + cells[1:] + ["print(y + 1)"])
+    outputs = [cell.outputs for cell in nbformat.read(filename, as_version=4).cells]
+    assert outputs[2][0]["text"] == "30\n" and outputs[3][0]["text"] == "31\n"
+
+
+def test_fixed_cell_runs_on_the_state_before_the_failure(pool, tmp_path):
+    tool = NotebookWriterTool()
+    tool._cell_cache = NotebookCellCache(str(tmp_path / "cells"))
+    filename = str(tmp_path / "broken.ipynb")
+    with task_scope("task-a"):
+        failed = tool._run("x = 1\n# %%\n1 / 0\n# %%\nprint(x)", filename, execute=True)
+        fixed = tool._run("x = 1\n# %%\nx += 1\n# %%\nprint(x)", filename, execute=True)
+    assert "Zelle 2 ist fehlgeschlagen" in failed and "ZeroDivisionError" in failed
+    assert "2 ausgeführt, 1 aus dem Cache" in fixed and "fehlerfrei" in fixed
+    assert nbformat.read(filename, as_version=4).cells[2].outputs[0]["text"] == "2\n"
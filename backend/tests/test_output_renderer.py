@@ -0,0 +1,45 @@
+# coding_agent_backend/tests/test_output_renderer.py
+"""Token-budgeted rendering: outputs stay within the budget and say what they left out."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.output_renderer import ROW_STRATEGIES, render_table, render_text
+
+
+@pytest.fixture(scope="module")
+def frame():
+    rng = np.random.default_rng(0)
+    rows = 2000
+    frame = pd.DataFrame({f"col_{i}": rng.normal(size=rows) for i in range(30)})
+    frame["text"] = ["lorem ipsum dolor sit amet\n" * 10] * rows
+    frame["cat"] = rng.choice(["alpha", "beta", "gamma"], rows)
+    return frame
+
+
+@pytest.mark.parametrize("budget", [300, 1000, 3000])
+@pytest.mark.parametrize("strategy", ROW_STRATEGIES)
+def test_table_with_summary_stays_within_budget(frame, budget, strategy):
+    output = render_table(
+        frame, budget, title="Tabelle", strategy=strategy, priority_columns=["text", "cat"],
+        summary_columns=["cat", "text"] + [f"col_{i}" for i in range(10)],
+    )
+    assert output.tokens <= budget
+    assert output.truncated and 0 < output.shown_rows < len(frame)
+    assert "Zeilen ausgelassen" in output.text and "Häufigste Werte" in output.text
+    # Priorisierte Spalten bleiben erhalten, Zeilenumbrüche in Zellen werden ersetzt
+    header = output.text.split("\n")[1]
+    assert header.split()[:2] == ["text", "cat"]
+
+
+def test_small_table_is_rendered_unchanged(frame):
+    output = render_table(frame[["col_0", "cat"]].head(5), 3000)
+    assert not output.truncated and output.shown_rows == 5
+    assert output.text == frame[["col_0", "cat"]].head(5).to_string(index=False)
+
+
+def test_text_keeps_head_and_tail_within_budget():
+    text = "\n".join(f"Zeile {i}: " + "wort " * 20 for i in range(5000))
+    output = render_text(text, 500)
+    assert output.tokens <= 500
+    assert output.text.startswith("Zeile 0:") and "Zeile 4999:" in output.text
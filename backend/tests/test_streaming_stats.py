@@ -0,0 +1,59 @@
+# coding_agent_backend/tests/test_streaming_stats.py
+"""One-pass streaming statistics compared with pandas' describe() on the whole file."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools import columnar_store
+from tools.streaming_stats import DatasetStats, compute_streaming_stats
+
+
+def _write_mixed(path):
+    # Spalte "code": 60000 × "1", dann Text – der Typ wechselt erst im zweiten Chunk
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        "code": ["1"] * 60000 + ["foo"] * 10,
+        "value": rng.normal(10, 2, 60010).round(4),
+        "group": rng.choice(["a", "b", "c"], 60010, p=[0.6, 0.3, 0.1]),
+    })
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def _assert_matches_pandas(stats, path):
+    expected = pd.read_csv(path).describe(include="all")
+    actual = stats.describe(include="all")
+    assert list(actual.columns) == list(expected.columns)
+    for column in ("code", "group"):
+        for row in ("count", "unique", "top", "freq"):
+            assert str(actual.at[row, column]) == str(expected.at[row, column]), (column, row)
+    for row in ("count", "mean", "std", "min", "max"):
+        assert actual.at[row, "value"] == pytest.approx(expected.at[row, "value"], rel=1e-9)
+    for row in ("25%", "50%", "75%"):
+        assert actual.at[row, "value"] == pytest.approx(expected.at[row, "value"], abs=0.1)
+
+
+def test_mixed_type_column_from_csv_chunks(tmp_path):
+    path = _write_mixed(tmp_path / "mixed.csv")
+    stats = compute_streaming_stats(path, chunk_rows=50000)
+    assert stats.columns_to_rescan() == []
+    _assert_matches_pandas(stats, path)
+
+
+def test_mixed_type_column_from_arrow_copy(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = _write_mixed(tmp_path / "mixed.csv")
+    assert columnar_store.ingest_csv(path) is not None
+    _assert_matches_pandas(compute_streaming_stats(path, chunk_rows=50000), path)
+
+
+def test_merged_partial_stats_flag_mixed_columns():
+    numbers, text = DatasetStats(), DatasetStats()
+    numbers.update(pd.DataFrame({"code": [1, 1, 2]}))
+    text.update(pd.DataFrame({"code": ["foo"]}))
+    numbers.merge(text)
+    assert numbers.columns_to_rescan() == ["code"]
+    numbers.rescan_categorical(iter([pd.DataFrame({"code": ["1", "1", "2", "foo"]})]))
+    top, freq = numbers.columns["code"].frequent.top()
+    assert (top, freq, numbers.columns["code"].distinct.estimate()) == ("1", 2, 3)
+    assert numbers.columns_to_rescan() == []
@@ -0,0 +1,77 @@
+# coding_agent_backend/tests/test_upload_store.py
+"""Multi-part assembly and deletion of shared objects in the upload store."""
+import asyncio
+import os
+
+import pytest
+
+from dataset_catalog import DatasetCatalog
+from upload_store import UploadError, UploadStore
+
+DATA = b"category,value\n" + b"".join(b"A,%d\n" % row for row in range(5000))
+
+
+async def _chunks(data):
+    yield data
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(str(tmp_path / "uploads"), catalog=DatasetCatalog(str(tmp_path / "catalog.sqlite3")))
+
+
+def _upload_parts(store, filename, data, part_size=4096):
+    async def run():
+        session = await asyncio.to_thread(store.create_session, filename, len(data), part_size)
+        for index in range(session["part_count"]):
+            await store.write_part(session["upload_id"], index, _chunks(data[index * part_size:(index + 1) * part_size]))
+        return session["upload_id"]
+    return asyncio.run(run())
+
+
+def test_concurrent_completes_publish_one_intact_object(store):
+    upload_id = _upload_parts(store, "data.csv", DATA)
+
+    async def complete_twice():
+        return await asyncio.gather(*(store.complete_session(upload_id) for _ in range(2)), return_exceptions=True)
+
+    results = asyncio.run(complete_twice())
+    stored = [result for result in results if not isinstance(result, Exception)]
+    errors = [result for result in results if isinstance(result, Exception)]
+    assert len(stored) == 1
+    assert len(errors) == 1 and isinstance(errors[0], UploadError) and errors[0].status_code == 409
+    with open(stored[0].file_path, "rb") as handle:
+        assert handle.read() == DATA
+    assert not [name for name in os.listdir(store.partial_dir) if name.endswith(".tmp")]
+
+
+def test_incomplete_session_is_rejected_and_can_be_completed_later(store):
+    upload_id = _upload_parts(store, "data.csv", DATA)
+    os.remove(store._part_path(upload_id, 1))
+    with pytest.raises(UploadError) as excinfo:
+        asyncio.run(store.complete_session(upload_id))
+    assert excinfo.value.status_code == 409
+    asyncio.run(store.write_part(upload_id, 1, _chunks(DATA[4096:8192])))
+    assert asyncio.run(store.complete_session(upload_id)).size == len(DATA)
+
+
+def test_shared_object_is_deleted_with_its_last_name(store):
+    first = asyncio.run(store.save_stream("a.csv", _chunks(DATA)))
+    second = asyncio.run(store.save_stream("b.csv", _chunks(DATA)))
+    assert second.deduplicated and second.object_path == first.object_path
+    assert store.catalog.references(first.object_path) == 2
+
+    object_path = store.remove_alias("a.csv")
+    assert store.catalog.get("a.csv") is None
+    assert store.remove_object(object_path) == []
+    assert os.path.exists(object_path)
+
+    store.remove_alias("b.csv")
+    assert store.remove_object(object_path) == [os.path.basename(object_path)]
+    assert not os.path.exists(object_path)
+
+
+def test_unknown_name_is_not_found(store):
+    with pytest.raises(UploadError) as excinfo:
+        store.remove_alias("missing.csv")
+    assert excinfo.value.status_code == 404
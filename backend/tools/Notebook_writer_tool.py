@@ -1,27 +1,225 @@
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
-from typing import Type
+from typing import Any, Dict, List, Optional, Tuple, Type
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
 import nbformat
-from nbformat.v4 import new_notebook, new_code_cell
+from nbformat.v4 import new_notebook, new_code_cell, new_output
+
+from kernel_pool import python_kernel_pool
+from task_context import current_task_id, current_dataset_path
+
+logger = logging.getLogger(__name__)
+
+NOTEBOOK_CELL_CACHE_DIR = os.getenv(
+    "NOTEBOOK_CELL_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "db", "notebook_cells")
+)
+NOTEBOOK_CELL_CACHE_MAX_ENTRIES = int(os.getenv("NOTEBOOK_CELL_CACHE_MAX_ENTRIES", "2000"))
+NOTEBOOK_CELL_TIMEOUT_SECONDS = float(os.getenv("NOTEBOOK_CELL_TIMEOUT_SECONDS", "120"))
+
+# Zellgrenzen im Percent-Format (wie in VS Code / Jupytext): eine Zeile "# %%"
+_CELL_MARKER = re.compile(r"^# ?%%.*$", re.MULTILINE)
+
+
+def split_cells(code: str) -> List[str]:
+    cells = [cell.strip("\n") for cell in _CELL_MARKER.split(code)]
+    return [cell for cell in cells if cell.strip()] or [code]
+
+
+def dataset_fingerprint(dataset_path: Optional[str]) -> str:
+    """Identität des Datensatzinhalts (Pfad, Größe, mtime) – ändert sich bei neuem Upload."""
+    if not dataset_path:
+        return ""
+    try:
+        stat = os.stat(dataset_path)
+    except OSError:
+        return dataset_path
+    return f"{os.path.realpath(dataset_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def cell_chain_hashes(cells: List[str], dataset_key: str) -> List[str]:
+    """Hash pro Zelle über ihren Quelltext, alle vorherigen Zellen und den Datensatz."""
+    hashes = []
+    previous = hashlib.sha256(dataset_key.encode("utf-8")).hexdigest()
+    for cell in cells:
+        previous = hashlib.sha256(f"{previous}\0{cell}".encode("utf-8")).hexdigest()
+        hashes.append(previous)
+    return hashes
+
+
+def _current_umask() -> int:
+    # os.umask lässt sich nur setzen und dabei lesen – einmal beim Import, nicht bei jedem Schreiben aus Worker-Threads
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# mkstemp legt mit 0600 an; das Notebook bekommt die Rechte, die open() vergeben hätte
+NOTEBOOK_FILE_MODE = 0o666 & ~_current_umask()
+
+
+def write_notebook_atomic(nb: Any, filename: str) -> None:
+    """Schreibt erst in eine temporäre Datei im Zielordner und ersetzt dann atomar."""
+    directory = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".notebook-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            nbformat.write(nb, f)
+        os.chmod(tmp_path, NOTEBOOK_FILE_MODE)
+        os.replace(tmp_path, filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class NotebookCellCache:
+    """Ausgaben erfolgreich ausgeführter Zellen, eine JSON-Datei pro Ketten-Hash."""
+
+    def __init__(self, directory: str = NOTEBOOK_CELL_CACHE_DIR, max_entries: int = NOTEBOOK_CELL_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._writes = 0
+
+    def _path(self, cell_hash: str) -> str:
+        return os.path.join(self.directory, f"{cell_hash}.json")
+
+    def get(self, cell_hash: str) -> Optional[str]:
+        try:
+            with open(self._path(cell_hash), encoding="utf-8") as f:
+                return json.load(f)["output"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, cell_hash: str, output: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"output": output}, f)
+        os.replace(tmp_path, self._path(cell_hash))
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._prune()
+
+    def _prune(self) -> None:
+        entries = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[: len(entries) - self.max_entries]:
+            os.remove(entry.path)
+
 
 class NotebookWriterInput(BaseModel):
-    code: str = Field(..., description="Python code to insert into the notebook")
+    code: str = Field(..., description="Python code to insert into the notebook. Separate cells with a line '# %%'.")
     filename: str = Field(..., description="Filename of the notebook to write (e.g. analysis.ipynb)")
+    execute: bool = Field(
+        False,
+        description="Run the notebook after writing and report errors per cell. Unchanged cells are served from a cache.",
+    )
 
 class NotebookWriterTool(BaseTool):
     name: str = "Write code to Jupyter Notebook"
-    description: str = "Speichert den gegebenen Python-Code in einer neuen Jupyter Notebook Datei (ohne Ausführung)."
+    description: str = (
+        "Speichert den gegebenen Python-Code in einer Jupyter Notebook Datei. Zellen werden mit einer Zeile '# %%' getrennt. "
+        "Mit execute=true wird das Notebook zusätzlich ausgeführt und geprüft: Fehler werden pro Zelle zurückgemeldet, "
+        "die Ausgaben landen im Notebook. Bei erneutem Aufruf laufen nur geänderte Zellen (und ihre Nachfolger) erneut. "
+        "Das Notebook muss seine Daten selbst laden (z.B. pd.read_csv mit dem Datensatz-Pfad)."
+    )
     args_schema: Type[BaseModel] = NotebookWriterInput
 
-    def _run(self, code: str, filename: str, **kwargs) -> str:
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._cell_cache = NotebookCellCache()
+        # Pro Kernel-Session: Ketten-Hashes und Ausgaben der Zellen, deren Zustand im Namespace steckt
+        self._live: Dict[str, List[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+        # Die Instanz wird von allen Crews geteilt: Einträge mit dem Namespace des Tasks verwerfen
+        python_kernel_pool.add_release_listener(self._forget_session)
+
+    def _forget_session(self, session_id: str) -> None:
+        with self._lock:
+            for session in [s for s in self._live if s == session_id or s.startswith(f"{session_id}:")]:
+                del self._live[session]
+
+    def _run(self, code: str, filename: str, execute: bool = False, **kwargs) -> str:
+        cells = split_cells(code)
         try:
-            nb = new_notebook(cells=[new_code_cell(code)])
-            with open(filename, "w", encoding="utf-8") as f:
-                nbformat.write(nb, f)
-            return f"Notebook erfolgreich gespeichert unter: {filename}"
+            if not execute:
+                write_notebook_atomic(new_notebook(cells=[new_code_cell(cell) for cell in cells]), filename)
+                return f"Notebook erfolgreich gespeichert unter: {filename}"
+            return self._write_and_execute(cells, filename)
         except Exception as e:
             return f"Fehler beim Schreiben der Notebook-Datei: {e}"
 
+    def _write_and_execute(self, cells: List[str], filename: str) -> str:
+        dataset_path = current_dataset_path.get()
+        hashes = cell_chain_hashes(cells, dataset_fingerprint(dataset_path))
+        # Unter-Session des Tasks: wird mit dem Namespace des Tasks freigegeben
+        session_id = f"{current_task_id.get() or 'default'}:notebook:{os.path.abspath(filename)}"
+
+        with self._lock:
+            live = list(self._live.get(session_id, []))
+        cached = [self._cell_cache.get(h) for h in hashes]
+        nb_cells = [new_code_cell(cell) for cell in cells]
+        results: List[Dict[str, Any]] = []
+
+        if all(output is not None for output in cached):
+            # Alle Zellen unverändert und bereits erfolgreich gelaufen: keine Ausführung nötig
+            results = [{"output": output, "error": None, "cached": True} for output in cached]
+        else:
+            prefix = 0
+            while prefix < min(len(live), len(hashes)) and live[prefix][0] == hashes[prefix]:
+                prefix += 1
+            if prefix < len(live):
+                # Eine frühere Zelle hat sich geändert: der Namespace-Zustand passt nicht mehr
+                python_kernel_pool.release(session_id)
+                live, prefix = [], 0
+            results = [{"output": output, "error": None, "cached": True} for _, output in live[:prefix]]
+            for index in range(prefix, len(cells)):
+                result = python_kernel_pool.run_cell(session_id, cells[index], timeout=NOTEBOOK_CELL_TIMEOUT_SECONDS)
+                if result.namespace_reset and index > 0 and result.ok:
+                    # Kernel wurde zwischendurch neu gestartet – Zustand der Vorgänger fehlt
+                    result.error = {"ename": "KernelRestarted", "evalue": " ".join(result.notes), "traceback": []}
+                results.append({"output": result.output, "error": result.error, "cached": False})
+                if not result.ok:
+                    live = [] if result.namespace_reset else live
+                    break
+                self._cell_cache.put(hashes[index], result.output)
+                live.append((hashes[index], result.output))
+            with self._lock:
+                self._live[session_id] = live
+
+        failed = None
+        for index, (nb_cell, result) in enumerate(zip(nb_cells, results), start=1):
+            nb_cell.execution_count = index
+            if result["output"]:
+                nb_cell.outputs.append(new_output("stream", name="stdout", text=result["output"]))
+            if result["error"] is not None:
+                error = result["error"]
+                nb_cell.outputs.append(new_output("error", ename=error["ename"], evalue=error["evalue"], traceback=error["traceback"]))
+                failed = (index, error)
+        write_notebook_atomic(new_notebook(cells=nb_cells), filename)
+
+        executed = sum(1 for r in results if not r["cached"])
+        reused = len(results) - executed
+        summary = f"Notebook gespeichert unter: {filename} ({len(cells)} Zellen, {executed} ausgeführt, {reused} aus dem Cache)."
+        if failed is None:
+            return f"{summary} Alle Zellen liefen fehlerfrei."
+        index, error = failed
+        traceback_tail = "\n".join(error["traceback"][-6:])
+        return (
+            f"{summary} Zelle {index} ist fehlgeschlagen, nachfolgende Zellen wurden nicht ausgeführt.\n"
+            f"{error['ename']}: {error['evalue']}\n{traceback_tail}\n"
+            "Bitte den Code korrigieren und das Notebook erneut mit execute=true schreiben."
+        )
+
     async def _arun(self, **kwargs):
         return self._run(**kwargs)
 
@@ -1,7 +1,24 @@
 # coding_agent_backend/tools/__init__.py
-from .python_repl_tool import python_repl
-from .load_dataset_tool import load_dataset
-from .csv_analysis_tool import analyze_csv
-from .summarize_csv_tool import summarize_csv_tool
-from .custom_csv_search_tool import custom_csv_search_tool
-from .Notebook_writer_tool import notebook_writer_tool
+import importlib
+from typing import Any
+
+# Die Tools (und damit crewai, pandas, nbformat) werden erst beim ersten Zugriff importiert,
+# z.B. durch ``from tools import python_repl`` in den Agents.
+_LAZY_ATTRS = {
+    "python_repl": ".python_repl_tool",
+    "load_dataset": ".load_dataset_tool",
+    "analyze_csv": ".csv_analysis_tool",
+    "summarize_csv_tool": ".summarize_csv_tool",
+    "custom_csv_search_tool": ".custom_csv_search_tool",
+    "notebook_writer_tool": ".Notebook_writer_tool",
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,183 @@
+# coding_agent_backend/tools/columnar_store.py
+import logging
+import os
+import threading
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as pa_feather
+except ImportError:  # pyarrow ist optional – ohne Arrow lesen die Tools weiter direkt die CSV
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_SUFFIX = ".arrow"
+# Neben der Spaltenkopie: Fehlermeldung eines gescheiterten Ingests (überlebt Neustarts)
+FAILED_SUFFIX = ".failed"
+# Zeilen pro Chunk beim Parsen; die Typen werden vorab über alle Chunks bestimmt
+INGEST_CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "200000"))
+
+_status_lock = threading.Lock()
+_ingest_status: Dict[str, str] = {}
+
+
+def columnar_path_for(csv_path: str) -> str:
+    """Location of the Arrow IPC copy for ``csv_path`` (next to the resolved CSV)."""
+    return os.path.splitext(os.path.realpath(csv_path))[0] + COLUMNAR_SUFFIX
+
+
+def ingest_status(csv_path: str) -> str:
+    """One of ``ready``, ``running``, ``failed``, ``unavailable`` or ``missing``."""
+    if pa is None:
+        return "unavailable"
+    real_path = os.path.realpath(csv_path)
+    with _status_lock:
+        status = _ingest_status.get(real_path)
+    if status in ("running", "failed"):
+        return status
+    if _is_fresh(real_path):
+        return "ready"
+    return "failed" if _is_fresh(real_path, FAILED_SUFFIX) else "missing"
+
+
+def ingest_error(csv_path: str) -> Optional[str]:
+    """Error message of the last failed ingest of ``csv_path``, if any."""
+    real_path = os.path.realpath(csv_path)
+    if not _is_fresh(real_path, FAILED_SUFFIX):
+        return None
+    try:
+        with open(columnar_path_for(real_path) + FAILED_SUFFIX, encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _is_fresh(real_csv_path: str, suffix: str = "") -> bool:
+    path = columnar_path_for(real_csv_path) + suffix
+    try:
+        return os.stat(path).st_mtime_ns >= os.stat(real_csv_path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def _merge_dtypes(dtypes: Iterable[np.dtype]) -> np.dtype:
+    """Typ einer Spalte über alle Chunks – wie pd.read_csv ihn beim Lesen der ganzen Datei wählt."""
+    dtypes = set(dtypes)
+    if len(dtypes) == 1:
+        return dtypes.pop()
+    # int in einem Chunk, float (wegen fehlender Werte) in einem anderen
+    if all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) for dtype in dtypes):
+        return np.dtype("float64")
+    # Sonst wird die Spalte als Text gelesen – mit dem String-dtype dieser pandas-Version, falls es einen gibt
+    strings = [dtype for dtype in dtypes if pd.api.types.is_string_dtype(dtype) and dtype != np.dtype(object)]
+    return strings[0] if strings else np.dtype(object)
+
+
+def infer_pandas_dtypes(csv_path: str, chunk_rows: int = INGEST_CHUNK_ROWS) -> Dict[str, np.dtype]:
+    """
+    Column dtypes as ``pd.read_csv`` infers them for the whole file, determined
+    in one bounded-memory pass. Strings (including dates) stay ``object``.
+    """
+    seen: Dict[str, set] = {}
+    with pd.read_csv(csv_path, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            for column, dtype in chunk.dtypes.items():
+                seen.setdefault(column, set()).add(dtype)
+    return {column: _merge_dtypes(dtypes) for column, dtypes in seen.items()}
+
+
+def _arrow_schema(dtypes: Dict[str, np.dtype]) -> "pa.Schema":
+    """Arrow-Schema samt pandas-Metadaten, damit ``to_pandas()`` genau diese dtypes liefert."""
+    empty = pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in dtypes.items()})
+    schema = pa.Schema.from_pandas(empty, preserve_index=False)
+    for index, field in enumerate(schema):
+        if pa.types.is_null(field.type):  # object-Spalten (Text in pandas ohne String-dtype)
+            schema = schema.set(index, field.with_type(pa.string()))
+    return schema
+
+
+def ingest_csv(csv_path: str) -> Optional[str]:
+    """
+    Convert a CSV into an uncompressed Arrow IPC (Feather v2) file next to it.
+
+    The column types are those pandas' ``read_csv`` infers for the whole file
+    (see ``infer_pandas_dtypes``), so tools get the same dtypes with and without
+    the copy, and a type change deep in the file cannot break the conversion.
+    Both passes read in chunks, so memory stays bounded. The file is written
+    under a temporary name and renamed at the end, so readers never see a
+    partial copy. Returns the columnar path or None; a failure is logged and
+    kept as ``failed`` in ``ingest_status`` (with the message in ``ingest_error``).
+    """
+    if pa is None:
+        logger.info("pyarrow nicht installiert – Ingest in Spaltenformat übersprungen.")
+        return None
+    real_path = os.path.realpath(csv_path)
+    columnar_path = columnar_path_for(real_path)
+    with _status_lock:
+        if _ingest_status.get(real_path) == "running":
+            return None
+        _ingest_status[real_path] = "running"
+    tmp_path = f"{columnar_path}.{uuid.uuid4().hex}.tmp"
+    failed_path = columnar_path + FAILED_SUFFIX
+    status = "failed"
+    try:
+        dtypes = infer_pandas_dtypes(real_path, INGEST_CHUNK_ROWS)
+        schema = _arrow_schema(dtypes)
+        # Unkomprimiert schreiben, damit das Lesen per Memory-Mapping ohne Kopie auskommt
+        with pa.ipc.new_file(tmp_path, schema) as writer, pd.read_csv(real_path, chunksize=INGEST_CHUNK_ROWS, dtype=dtypes) as reader:
+            for chunk in reader:
+                writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+        os.replace(tmp_path, columnar_path)
+        if os.path.exists(failed_path):
+            os.remove(failed_path)
+        logger.info(f"Spaltenkopie für {real_path} geschrieben: {columnar_path}")
+        status = "ready"
+        return columnar_path
+    except Exception as e:
+        # Die Tools lesen dann weiter die CSV; der Fehler bleibt im Status sichtbar und wird nicht bei jedem Upload wiederholt
+        logger.warning(f"Ingest von {real_path} in Spaltenformat fehlgeschlagen: {e}", exc_info=True)
+        try:
+            with open(failed_path, "w", encoding="utf-8") as f:
+                f.write(f"{type(e).__name__}: {e}")
+        except OSError:
+            logger.warning(f"Ingest-Fehler für {real_path} nicht speicherbar.", exc_info=True)
+        return None
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        with _status_lock:
+            _ingest_status[real_path] = status
+
+
+def iter_columnar_batches(csv_path: str) -> Optional[Iterator[pd.DataFrame]]:
+    """Record batches of the Arrow copy as DataFrames, or None if there is no fresh copy."""
+    if pa is None:
+        return None
+    real_path = os.path.realpath(csv_path)
+    if not _is_fresh(real_path):
+        return None
+    reader = pa.ipc.open_file(pa.memory_map(columnar_path_for(real_path)))
+    return (reader.get_batch(i).to_pandas() for i in range(reader.num_record_batches))
+
+
+def read_columnar(csv_path: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+    """
+    Read the Arrow copy of ``csv_path`` via memory mapping, optionally projecting
+    ``columns``. Returns None if pyarrow is missing or the copy is absent or stale.
+    """
+    if pa is None:
+        return None
+    real_path = os.path.realpath(csv_path)
+    if not _is_fresh(real_path):
+        return None
+    try:
+        table = pa_feather.read_table(columnar_path_for(real_path), columns=columns, memory_map=True)
+    except Exception as e:
+        logger.warning(f"Spaltenkopie für {real_path} nicht lesbar, nutze CSV: {e}")
+        return None
+    return table.to_pandas(split_blocks=True)
@@ -1,32 +1,95 @@
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
-from typing import Type, Any
+from typing import Type, Any, Optional
 import pandas as pd
+from .dataframe_cache import dataframe_cache
+from .dataset_sample import SAMPLE_CONFIDENCE, ensure_sample, sample_status, should_sample
+from .output_renderer import record, render_table
+from .streaming_stats import compute_streaming_stats, should_stream
 
 class CSVAnalysisToolInput(BaseModel):
     """Input schema for CSVAnalysisTool"""
     file_path: str = Field(..., description="Path to the CSV file")
+    streaming: Optional[bool] = Field(
+        None, description="Compute the statistics chunk by chunk instead of loading the file (default: automatic for large files)"
+    )
+    sample: Optional[bool] = Field(
+        None,
+        description=(
+            "Estimate the statistics from a cached random sample, with confidence intervals (fast; "
+            "true draws the sample first if it does not exist yet). false forces an exact recomputation "
+            "over all rows (default: sample for very large files whose sample is already prepared)"
+        ),
+    )
+    stratify_by: Optional[str] = Field(
+        None, description="Column to stratify the sample by, so that rare groups are represented (only with sampling)"
+    )
 
 class CSVAnalysisTool(BaseTool):
     name: str = "CSV Analysis Tool"
     description: str = (
         "Loads a CSV file from a given path and returns a brief summary "
-        "including shape and basic statistics."
+        "including shape and basic statistics. Very large files are analysed on a cached sample "
+        "(estimates with confidence intervals); pass sample=false for exact values."
     )
     args_schema: Type[BaseModel] = CSVAnalysisToolInput
 
-    def _run(self, file_path: str, **kwargs: Any) -> str:
+    def _run(
+        self,
+        file_path: str,
+        streaming: Optional[bool] = None,
+        sample: Optional[bool] = None,
+        stratify_by: Optional[str] = None,
+        **kwargs: Any,
+    ) -> str:
         try:
-            df = pd.read_csv(file_path)
-            summary = df.describe(include='all').to_string()
-            shape = df.shape
-            return (
-                f"Dataset loaded from {file_path}. Shape: {shape[0]} rows, {shape[1]} columns.\n"
-                f"Summary statistics:\n{summary}"
+            if sample is None:
+                # An explicit streaming choice asks for exact statistics; by default only a sample
+                # drawn after the upload is used, it is never drawn inside this call
+                sample = stratify_by is not None or (
+                    streaming is None and should_sample(file_path) and sample_status(file_path) == "ready"
+                )
+            if sample:
+                return self._run_on_sample(file_path, stratify_by)
+            if should_stream(file_path, streaming):
+                # One bounded-memory pass; quantiles and unique counts are approximations
+                stats = compute_streaming_stats(file_path)
+                summary = stats.describe(include='all')
+                shape = stats.shape
+            else:
+                df = dataframe_cache.read_csv(file_path)
+                summary = df.describe(include='all')
+                shape = df.shape
+            # One line per dataset column, so wide datasets are cut by columns (head and tail) to fit the token budget
+            rendered = render_table(
+                summary.T,
+                index=True,
+                strategy="head_tail",
+                title=(
+                    f"Dataset loaded from {file_path}. Shape: {shape[0]} rows, {shape[1]} columns.\n"
+                    "Summary statistics (one row per column):"
+                ),
             )
+            return record(self.name, rendered)
         except Exception as e:
             return f"ERROR loading dataset {file_path}: {e}"
 
+    def _run_on_sample(self, file_path: str, stratify_by: Optional[str]) -> str:
+        sample = ensure_sample(file_path, stratify_by)
+        strata = f", stratified by '{stratify_by}' ({len(sample.population)} strata)" if stratify_by else ""
+        rendered = render_table(
+            sample.describe(),
+            index=True,
+            strategy="head_tail",
+            title=(
+                f"Dataset loaded from {file_path}. Shape: {sample.rows} rows, {sample.frame.shape[1]} columns.\n"
+                f"Estimated statistics from a random sample of {len(sample.frame)} rows{strata}; "
+                f"'±' is the half-width of the {SAMPLE_CONFIDENCE:.0%} confidence interval, "
+                "min/max are those of the sample. Call again with sample=false for exact values."
+            ),
+        )
+        return record(self.name, rendered)
+
     async def _arun(self, file_path: str, **kwargs: Any) -> str:
         return self._run(file_path, **kwargs)
 
@@ -0,0 +1,128 @@
+# coding_agent_backend/tools/csv_search_engine.py
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+SEARCH_MODES = ("literal", "regex")
+DEFAULT_BLOCK_ROWS = 100_000
+
+
+@dataclass
+class NumericRange:
+    column: str
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+
+@dataclass
+class SearchResult:
+    matches: pd.DataFrame
+    offset: int
+    scanned_rows: int
+    has_more: bool
+
+
+def lowercase_view(series: pd.Series) -> pd.Series:
+    """String view of a column for case-insensitive matching. Missing values never match."""
+    return series.astype(str).str.lower().where(series.notna(), "")
+
+
+def numeric_view(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series
+    return pd.to_numeric(series, errors="coerce")
+
+
+def memoized(build: Callable[[str], pd.Series]) -> Callable[[str], pd.Series]:
+    """Baut jede Spalten-Sicht höchstens einmal pro Suche (``search_dataframe`` fragt sie je Block ab)."""
+    views = {}
+
+    def view(col: str) -> pd.Series:
+        if col not in views:
+            views[col] = build(col)
+        return views[col]
+
+    return view
+
+
+def search_dataframe(
+    df: pd.DataFrame,
+    query: str,
+    *,
+    mode: str = "literal",
+    columns: Optional[Sequence[str]] = None,
+    numeric_ranges: Optional[Sequence[NumericRange]] = None,
+    offset: int = 0,
+    max_rows: int = 50,
+    string_view: Optional[Callable[[str], pd.Series]] = None,
+    number_view: Optional[Callable[[str], pd.Series]] = None,
+    block_rows: int = DEFAULT_BLOCK_ROWS,
+) -> SearchResult:
+    """
+    Column-wise vectorized search over ``df``.
+
+    A row matches if ``query`` occurs in any of the selected columns (case-insensitive)
+    and every numeric range predicate holds. Rows are scanned in blocks, so the scan
+    stops as soon as ``offset + max_rows`` matches are found. ``string_view`` and
+    ``number_view`` return the prepared per-column views and allow callers to cache them.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unbekannter Suchmodus '{mode}'. Erlaubt: {', '.join(SEARCH_MODES)}")
+    offset = max(offset, 0)
+    max_rows = max(max_rows, 0)
+    numeric_ranges = list(numeric_ranges or [])
+    search_columns = list(columns) if columns else list(df.columns)
+
+    referenced = search_columns + [r.column for r in numeric_ranges]
+    unknown = [c for c in referenced if c not in df.columns]
+    if unknown:
+        raise KeyError(f"Unbekannte Spalten: {unknown}. Verfügbare Spalten: {list(df.columns)}")
+
+    string_view = string_view or memoized(lambda col: lowercase_view(df[col]))
+    number_view = number_view or memoized(lambda col: numeric_view(df[col]))
+
+    if query and mode == "regex":
+        pattern = re.compile(query, re.IGNORECASE)
+        contains = lambda values: values.str.contains(pattern, regex=True)
+    elif query:
+        needle = query.lower()
+        contains = lambda values: values.str.contains(needle, regex=False)
+    else:
+        contains = None
+
+    needed = offset + max_rows + 1  # ein Treffer mehr, um "weitere vorhanden" zu erkennen
+    found: List[np.ndarray] = []
+    found_count = 0
+    scanned = 0
+    for start in range(0, len(df), block_rows):
+        stop = min(start + block_rows, len(df))
+        mask = np.ones(stop - start, dtype=bool)
+        for rng in numeric_ranges:
+            values = number_view(rng.column).iloc[start:stop].to_numpy(dtype=float, na_value=np.nan)
+            if rng.min is not None:
+                mask &= values >= rng.min
+            if rng.max is not None:
+                mask &= values <= rng.max
+        if contains is not None and mask.any():
+            text_mask = np.zeros(stop - start, dtype=bool)
+            for col in search_columns:
+                text_mask |= contains(string_view(col).iloc[start:stop]).to_numpy(dtype=bool)
+            mask &= text_mask
+        scanned = stop
+        hits = np.flatnonzero(mask) + start
+        found.append(hits)
+        found_count += len(hits)
+        if found_count >= needed:
+            break
+
+    positions = np.concatenate(found) if found else np.array([], dtype=int)
+    page = positions[offset:offset + max_rows]
+    return SearchResult(
+        matches=df.iloc[page],
+        offset=offset,
+        scanned_rows=scanned,
+        has_more=len(positions) > offset + max_rows,
+    )
@@ -1,24 +1,76 @@
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
-from typing import Type
+from typing import List, Optional, Type
 import pandas as pd
+from .dataframe_cache import dataframe_cache
+from .csv_search_engine import NumericRange, lowercase_view, memoized, numeric_view, search_dataframe
+from .output_renderer import record, render_table
+
+class NumericRangeInput(BaseModel):
+    column: str = Field(..., description="Numerische Spalte, auf die der Bereich angewendet wird")
+    min: Optional[float] = Field(None, description="Untere Grenze (inklusive)")
+    max: Optional[float] = Field(None, description="Obere Grenze (inklusive)")
 
 class CSVSearchToolInput(BaseModel):
-    search_query: str = Field(..., description="Suchbegriff oder Ausdruck, der in der CSV gesucht werden soll")
+    search_query: str = Field(..., description="Suchbegriff oder Ausdruck, der in der CSV gesucht werden soll (leer lassen, um nur nach Bereichen zu filtern)")
     csv: str = Field(..., description="Pfad zur CSV-Datei, in der gesucht werden soll")
+    mode: str = Field("literal", description="'literal' für einfache Textsuche, 'regex' für reguläre Ausdrücke")
+    columns: Optional[List[str]] = Field(None, description="Nur in diesen Spalten suchen (Standard: alle Spalten)")
+    numeric_ranges: Optional[List[NumericRangeInput]] = Field(None, description="Zusätzliche Bereichsfilter für numerische Spalten")
+    max_rows: int = Field(50, description="Maximale Anzahl zurückgegebener Zeilen")
+    offset: int = Field(0, description="Anzahl der Treffer, die übersprungen werden (für die nächste Seite)")
 
 class CustomCSVSearchTool(BaseTool):
     name: str = "Search a CSV's content"
-    description: str = "Durchsucht eine CSV-Datei nach einem bestimmten Suchbegriff in allen Spalten."
+    description: str = (
+        "Durchsucht eine CSV-Datei nach einem Suchbegriff (Text oder Regex) in allen oder ausgewählten Spalten, "
+        "optional mit numerischen Bereichsfiltern. Liefert die ersten `max_rows` Treffer ab `offset` "
+        "(gekürzt, falls sie nicht ins Token-Budget passen; der nächste `offset` steht in der Antwort)."
+    )
     args_schema: Type[BaseModel] = CSVSearchToolInput
 
-    def _run(self, search_query: str, csv: str, **kwargs) -> str:
+    def _run(
+        self,
+        search_query: str,
+        csv: str,
+        mode: str = "literal",
+        columns: Optional[List[str]] = None,
+        numeric_ranges: Optional[List[NumericRangeInput]] = None,
+        max_rows: int = 50,
+        offset: int = 0,
+        **kwargs,
+    ) -> str:
         try:
-            df = pd.read_csv(csv)
-            matches = df[df.apply(lambda row: row.astype(str).str.contains(search_query, case=False, na=False).any(), axis=1)]
-            if matches.empty:
+            df = dataframe_cache.read_csv(csv)
+            ranges = [
+                NumericRange(**(r.model_dump() if isinstance(r, BaseModel) else r))
+                for r in (numeric_ranges or [])
+            ]
+            # Kleingeschriebene String-Sichten werden einmal pro Spalte berechnet und im Cache gehalten;
+            # der bereits geladene DataFrame wird mitgegeben, damit große (nicht gecachte) Dateien nicht erneut geparst werden
+            result = search_dataframe(
+                df,
+                search_query,
+                mode=mode,
+                columns=columns,
+                numeric_ranges=ranges,
+                offset=offset,
+                max_rows=max_rows,
+                string_view=memoized(lambda col: dataframe_cache.get_derived(csv, ("lower", col), lambda d: lowercase_view(d[col]), df=df)),
+                number_view=memoized(lambda col: dataframe_cache.get_derived(csv, ("numeric", col), lambda d: numeric_view(d[col]), df=df)),
+            )
+            if result.matches.empty:
                 return f"Keine Übereinstimmungen für '{search_query}' in Datei {csv} gefunden."
-            return f"Gefundene Zeilen:{matches.to_string(index=False)}"
+            # Durchsuchte Spalten zuerst, damit sie beim Weglassen von Spalten erhalten bleiben
+            searched = list(columns or []) + [r.column for r in ranges]
+            rendered = render_table(result.matches, strategy="head", priority_columns=searched, summary_columns=columns or [])
+            # Passen nicht alle Treffer ins Budget, beginnt die nächste Seite nach der letzten gezeigten Zeile
+            first = result.offset + 1
+            last = result.offset + rendered.shown_rows
+            header = f"Gefundene Zeilen ({first}-{last}"
+            if result.has_more or rendered.shown_rows < len(result.matches):
+                header += f", weitere Treffer vorhanden – nächste Seite mit offset={last}"
+            return record(self.name, rendered.prepend(f"{header}):"))
         except Exception as e:
             raise Exception(f"Fehler beim Verarbeiten der CSV-Datei '{csv}': {str(e)}")
 
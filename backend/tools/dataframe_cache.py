@@ -0,0 +1,193 @@
+# coding_agent_backend/tools/dataframe_cache.py
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+from tracing import CSV, span
+from .columnar_store import read_columnar
+
+logger = logging.getLogger(__name__)
+
+# Obergrenze für den Speicher aller gecachten DataFrames (Standard: 1 GiB)
+DEFAULT_MAX_BYTES = int(os.getenv("DATAFRAME_CACHE_MAX_BYTES", str(1024 ** 3)))
+
+CacheKey = Tuple[str, int, int, Tuple[Tuple[str, Hashable], ...]]
+
+
+@dataclass
+class _CacheEntry:
+    df: pd.DataFrame
+    nbytes: int
+    # Aus dem DataFrame abgeleitete Artefakte (z.B. Suchindizes), leben so lange wie der Eintrag
+    derived: Dict[Hashable, Any] = field(default_factory=dict)
+
+
+def _freeze(value: Any) -> Hashable:
+    """Turn read_csv keyword values (lists, dicts) into something hashable."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _estimate_nbytes(value: Any) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    return int(getattr(value, "nbytes", 0))
+
+
+class DataFrameCache:
+    """
+    Process-wide LRU cache for parsed CSV files.
+
+    Entries are keyed by the resolved path, the file's mtime and size and the
+    read options, so a changed file is never served from a stale entry.
+    Misses are served from the memory-mapped Arrow copy written at ingest
+    time when one exists, otherwise the CSV is parsed.
+    Eviction is by the in-memory size of the DataFrames. Returned DataFrames
+    are shared between callers and must not be modified in place.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, _CacheEntry]" = OrderedDict()
+        self._loading: Dict[CacheKey, threading.Lock] = {}
+        self._lock = threading.RLock()
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _make_key(self, path: str, read_kwargs: Dict[str, Any]) -> CacheKey:
+        real_path = os.path.realpath(path)
+        stat = os.stat(real_path)
+        return (real_path, stat.st_mtime_ns, stat.st_size, _freeze(read_kwargs))
+
+    def read_csv(self, path: str, **read_kwargs: Any) -> pd.DataFrame:
+        """Return the parsed DataFrame for ``path``, parsing it only on a cache miss."""
+        key = self._make_key(path, read_kwargs)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.df
+            # Pro Schlüssel nur ein Parse, auch wenn mehrere Agenten gleichzeitig anfragen
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.df
+                self.misses += 1
+            try:
+                df = self._load(key[0], read_kwargs)
+                self._store(key, df)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        return df
+
+    def _load(self, real_path: str, read_kwargs: Dict[str, Any]) -> pd.DataFrame:
+        # Spaltenkopie aus dem Ingest bevorzugen, solange nur eine Spaltenprojektion gewünscht ist
+        if set(read_kwargs) <= {"usecols"}:
+            with span(os.path.basename(real_path), CSV, source="arrow") as attrs:
+                df = read_columnar(real_path, columns=read_kwargs.get("usecols"))
+                attrs["hit"] = df is not None
+            if df is not None:
+                return df
+        with span(os.path.basename(real_path), CSV, source="csv") as attrs:
+            df = pd.read_csv(real_path, **read_kwargs)
+            attrs["rows"] = len(df)
+        return df
+
+    def get_derived(self, path: str, name: Hashable, builder: Callable[[pd.DataFrame], Any], df: Optional[pd.DataFrame] = None) -> Any:
+        """
+        Return an artifact computed from the cached DataFrame of ``path``.
+
+        ``builder`` runs at most once per cache entry; its result is kept with
+        the entry, counted towards the byte budget and dropped together with it.
+        Callers that already hold the DataFrame pass it as ``df``, so the file is
+        never parsed again for a frame that is too large for (or was evicted
+        from) the cache – the artifact is then built but not kept.
+        """
+        if df is None:
+            df = self.read_csv(path)
+        key = self._make_key(path, {})
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.df is df and name in entry.derived:
+                return entry.derived[name]
+        value = builder(df)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.df is df and name not in entry.derived:
+                nbytes = _estimate_nbytes(value)
+                entry.derived[name] = value
+                entry.nbytes += nbytes
+                self._current_bytes += nbytes
+                self._evict()
+        return value
+
+    def _store(self, key: CacheKey, df: pd.DataFrame) -> None:
+        nbytes = int(df.memory_usage(deep=True).sum())
+        if nbytes > self.max_bytes:
+            logger.info(f"DataFrame für {key[0]} ({nbytes} Bytes) ist größer als das Cache-Limit und wird nicht gecacht.")
+            return
+        with self._lock:
+            # Veraltete Einträge derselben Datei (andere mtime/Größe) verwerfen
+            self._drop(lambda k: k[0] == key[0] and k[1:3] != key[1:3])
+            self._entries[key] = _CacheEntry(df=df, nbytes=nbytes)
+            self._current_bytes += nbytes
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._current_bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._current_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def _drop(self, predicate) -> int:
+        stale_keys = [k for k in self._entries if predicate(k)]
+        for k in stale_keys:
+            self._current_bytes -= self._entries.pop(k).nbytes
+        return len(stale_keys)
+
+    def invalidate(self, path: str) -> int:
+        """Drop every cached entry for ``path``. Returns the number of removed entries."""
+        real_path = os.path.realpath(path)
+        with self._lock:
+            removed = self._drop(lambda k: k[0] == real_path)
+        if removed:
+            logger.info(f"{removed} Cache-Einträge für {real_path} invalidiert.")
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+dataframe_cache = DataFrameCache()
@@ -0,0 +1,202 @@
+# coding_agent_backend/tools/dataset_profile.py
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from .dataframe_cache import dataframe_cache
+from .streaming_stats import compute_streaming_stats, should_stream
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SUFFIX = ".profile.json"
+PROFILE_VERSION = 1
+PROFILE_TOP_K = int(os.getenv("DATASET_PROFILE_TOP_K", "5"))
+PROFILE_SAMPLE_ROWS = int(os.getenv("DATASET_PROFILE_SAMPLE_ROWS", "5"))
+
+_status_lock = threading.Lock()
+_profile_status: Dict[str, str] = {}
+
+
+def profile_path_for(csv_path: str) -> str:
+    """Location of the stored profile for ``csv_path`` (next to the resolved CSV)."""
+    return os.path.splitext(os.path.realpath(csv_path))[0] + PROFILE_SUFFIX
+
+
+def _plain(value: Any) -> Any:
+    """numpy-/pandas-Skalare in JSON-Werte umwandeln (NaN wird zu None)."""
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def _source_signature(real_path: str) -> Dict[str, int]:
+    stat = os.stat(real_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def build_profile(csv_path: str, streaming: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Profile of a CSV: shape, dtypes, null counts, numeric statistics, the most
+    frequent values of non-numeric columns and a few sample rows.
+
+    Small files are profiled exactly from the DataFrame cache; large files (see
+    ``should_stream``) in one bounded-memory pass, where quantiles, distinct
+    counts and top values are sketch estimates.
+    """
+    real_path = os.path.realpath(csv_path)
+    source = _source_signature(real_path)
+    approximate = should_stream(real_path, streaming)
+    if approximate:
+        stats = compute_streaming_stats(real_path)
+        rows = stats.rows
+        dtypes, nulls = stats.dtypes(), stats.null_counts()
+        numeric = [name for name, column in stats.columns.items() if column.is_numeric]
+        numeric_stats = stats.describe(include="number") if numeric else pd.DataFrame()
+        top_values = {
+            name: column.frequent.counters.nlargest(PROFILE_TOP_K)
+            for name, column in stats.columns.items() if not column.is_numeric
+        }
+        distinct = {name: column.distinct.estimate() for name, column in stats.columns.items() if not column.is_numeric}
+    else:
+        df = dataframe_cache.read_csv(real_path)
+        rows = len(df)
+        dtypes, nulls = df.dtypes, df.isnull().sum()
+        numeric_stats = df.describe(include="number") if not df.select_dtypes("number").empty else pd.DataFrame()
+        other = df.select_dtypes(exclude="number")
+        top_values = {name: other[name].value_counts().head(PROFILE_TOP_K) for name in other.columns}
+        distinct = {name: int(other[name].nunique()) for name in other.columns}
+
+    sample = pd.read_csv(real_path, nrows=PROFILE_SAMPLE_ROWS) if PROFILE_SAMPLE_ROWS > 0 else pd.DataFrame()
+    columns: List[Dict[str, Any]] = []
+    for name in dtypes.index:
+        column: Dict[str, Any] = {"name": str(name), "dtype": str(dtypes[name]), "nulls": int(nulls.get(name, 0))}
+        if name in numeric_stats.columns:
+            column["stats"] = {str(stat): _plain(value) for stat, value in numeric_stats[name].items()}
+        if name in top_values:
+            column["distinct"] = int(distinct[name])
+            column["top_values"] = [[_plain(value), int(count)] for value, count in top_values[name].items()]
+        columns.append(column)
+    return {
+        "version": PROFILE_VERSION,
+        "path": csv_path,
+        "source": source,
+        "created": time.time(),
+        "approximate": approximate,
+        "rows": int(rows),
+        "columns": columns,
+        "sample": json.loads(sample.to_json(orient="records", date_format="iso")),
+    }
+
+
+def _is_fresh(profile: Dict[str, Any], real_csv_path: str) -> bool:
+    try:
+        return profile.get("version") == PROFILE_VERSION and profile.get("source") == _source_signature(real_csv_path)
+    except FileNotFoundError:
+        return False
+
+
+def load_profile(csv_path: str) -> Optional[Dict[str, Any]]:
+    """Stored profile of ``csv_path``, or None if it is missing or older than the file."""
+    real_path = os.path.realpath(csv_path)
+    try:
+        with open(profile_path_for(real_path), encoding="utf-8") as handle:
+            profile = json.load(handle)
+    except (FileNotFoundError, ValueError):
+        return None
+    return profile if _is_fresh(profile, real_path) else None
+
+
+def profile_status(csv_path: str) -> str:
+    """One of ``ready``, ``running``, ``failed`` or ``missing``."""
+    real_path = os.path.realpath(csv_path)
+    with _status_lock:
+        status = _profile_status.get(real_path)
+    if status in ("running", "failed"):
+        return status
+    return "ready" if load_profile(real_path) is not None else "missing"
+
+
+def compute_profile(csv_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Build the profile of ``csv_path`` and store it as JSON next to the file
+    (written under a temporary name and renamed). Returns the profile, or None
+    if it is already being computed or profiling failed.
+    """
+    real_path = os.path.realpath(csv_path)
+    with _status_lock:
+        if _profile_status.get(real_path) == "running":
+            return None
+        _profile_status[real_path] = "running"
+    path = profile_path_for(real_path)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    status = "failed"
+    try:
+        profile = build_profile(csv_path)
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(profile, handle, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        logger.info(f"Datensatz-Profil für {real_path} geschrieben: {path}")
+        status = "ready"
+        return profile
+    except Exception as e:
+        logger.warning(f"Profil für {real_path} konnte nicht erstellt werden: {e}")
+        return None
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        with _status_lock:
+            _profile_status[real_path] = status
+
+
+def ensure_profile(csv_path: str) -> Dict[str, Any]:
+    """Gespeichertes Profil oder – falls es fehlt – neu berechnetes (und gespeichertes)."""
+    profile = load_profile(csv_path) or compute_profile(csv_path)
+    # None: ein anderer Thread berechnet gerade oder das Speichern schlug fehl
+    return profile if profile is not None else build_profile(csv_path)
+
+
+def format_profile(profile: Dict[str, Any], csv_path: Optional[str] = None) -> str:
+    """Textfassung des Profils für Agenten (Layout der bisherigen CSV-Zusammenfassung)."""
+    columns = profile["columns"]
+    info = f"📊 CSV-Zusammenfassung für Datei: {csv_path or profile['path']}\n"
+    info += f"• Form: {profile['rows']} Zeilen, {len(columns)} Spalten\n"
+    info += "\n• Spaltenübersicht:\n"
+    info += "\n".join([f"  - {column['name']} ({column['dtype']})" for column in columns])
+
+    null_summary = "\n".join([f"  - {column['name']}: {column['nulls']} fehlende Werte" for column in columns if column["nulls"] > 0])
+    if null_summary:
+        info += "\n\n• Fehlende Werte:\n" + null_summary
+    else:
+        info += "\n\n• Keine fehlenden Werte gefunden."
+
+    numeric_stats = {column["name"]: column["stats"] for column in columns if "stats" in column}
+    if numeric_stats:
+        info += f"\n\n• Statistische Übersicht (nur numerische Spalten):\n{pd.DataFrame(numeric_stats).to_string()}"
+    else:
+        info += "\n\n• Keine numerischen Spalten."
+
+    approx = "≈" if profile.get("approximate") else ""
+    top_summary = "\n".join([
+        f"  - {column['name']} ({approx}{column['distinct']} verschiedene): "
+        + ", ".join(f"{value} ({approx}{count})" for value, count in column["top_values"])
+        for column in columns if column.get("top_values")
+    ])
+    if top_summary:
+        info += "\n\n• Häufigste Werte (nicht-numerische Spalten):\n" + top_summary
+
+    if profile.get("sample"):
+        info += f"\n\n• Beispielzeilen:\n{pd.DataFrame(profile['sample']).to_string(index=False)}"
+    if profile.get("approximate"):
+        info += "\n\n(Streaming-Auswertung: Quantile, Anzahl verschiedener Werte und Häufigkeiten sind Näherungen.)"
+    return info
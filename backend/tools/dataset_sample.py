@@ -0,0 +1,337 @@
+# coding_agent_backend/tools/dataset_sample.py
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .streaming_stats import iter_chunks
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_SUFFIX = ".sample.pkl"
+SAMPLE_VERSION = 1
+# Dateien ab dieser Größe werden von den Tools und im Python-Kernel standardmäßig auf der Stichprobe ausgewertet
+SAMPLE_THRESHOLD_BYTES = int(os.getenv("DATASET_SAMPLE_THRESHOLD_BYTES", str(256 * 1024 ** 2)))
+SAMPLE_ROWS = int(os.getenv("DATASET_SAMPLE_ROWS", "100000"))
+# Mindestgröße je Schicht, damit auch seltene Gruppen belastbare Schätzungen bekommen
+SAMPLE_MIN_PER_STRATUM = int(os.getenv("DATASET_SAMPLE_MIN_PER_STRATUM", "200"))
+SAMPLE_MAX_STRATA = int(os.getenv("DATASET_SAMPLE_MAX_STRATA", "100"))
+SAMPLE_CONFIDENCE = float(os.getenv("DATASET_SAMPLE_CONFIDENCE", "0.95"))
+SAMPLE_SEED = int(os.getenv("DATASET_SAMPLE_SEED", "0"))
+# So viele Stichproben bleiben im Speicher der Tools (LRU)
+SAMPLE_CACHE_ENTRIES = int(os.getenv("DATASET_SAMPLE_CACHE_ENTRIES", "8"))
+
+# Hilfsspalten während des Ziehens
+_KEY, _ROW, _STRATUM = "__sample_key", "__sample_row", "__sample_stratum"
+# Schicht aller Zeilen bei einer einfachen (nicht geschichteten) Stichprobe
+ALL_ROWS = "(alle)"
+
+_build_locks: Dict[str, threading.Lock] = {}
+_locks_lock = threading.Lock()
+_loaded: "OrderedDict[str, DatasetSample]" = OrderedDict()
+
+
+def should_sample(path: str, sample: Optional[bool] = None) -> bool:
+    """Explicit choice wins; otherwise sample files above ``SAMPLE_THRESHOLD_BYTES``."""
+    if sample is not None:
+        return sample
+    return os.path.getsize(path) > SAMPLE_THRESHOLD_BYTES
+
+
+def sample_path_for(csv_path: str, stratify_by: Optional[str] = None) -> str:
+    """Location of the cached sample for ``csv_path`` (next to the resolved CSV, one file per strata column)."""
+    stem = os.path.splitext(os.path.realpath(csv_path))[0]
+    if stratify_by is None:
+        return stem + SAMPLE_SUFFIX
+    # Spaltennamen können beliebige Zeichen enthalten
+    return f"{stem}.{hashlib.sha1(stratify_by.encode('utf-8')).hexdigest()[:12]}{SAMPLE_SUFFIX}"
+
+
+def sample_status(csv_path: str, stratify_by: Optional[str] = None) -> str:
+    """``ready`` if a sample file at least as new as the CSV exists, else ``missing`` (without loading it)."""
+    real_path = os.path.realpath(csv_path)
+    try:
+        fresh = os.stat(sample_path_for(real_path, stratify_by)).st_mtime_ns >= os.stat(real_path).st_mtime_ns
+    except OSError:
+        return "missing"
+    return "ready" if fresh else "missing"
+
+
+def _source_signature(real_path: str) -> Dict[str, int]:
+    stat = os.stat(real_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _z_value(confidence: float) -> float:
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def _weighted_quantiles(values: np.ndarray, weights: np.ndarray, quantiles: Tuple[float, ...]) -> list:
+    order = np.argsort(values, kind="stable")
+    cumulative = np.cumsum(weights[order])
+    positions = np.searchsorted(cumulative, np.asarray(quantiles) * cumulative[-1])
+    return [float(values[order][min(p, len(values) - 1)]) for p in positions]
+
+
+@dataclass
+class DatasetSample:
+    """
+    Stratified random sample of a dataset with the population size of every
+    stratum, so that means and proportions can be estimated with confidence
+    intervals. Without a strata column there is a single stratum ``ALL_ROWS``
+    and the sample is a plain uniform sample. ``frame`` keeps the original row
+    numbers as index.
+    """
+
+    frame: pd.DataFrame
+    strata: pd.Series
+    population: Dict[str, int]
+    rows: int
+    stratify_by: Optional[str]
+    source: Dict[str, int]
+    created: float
+    path: str
+
+    @property
+    def sampled(self) -> Dict[str, int]:
+        return {label: int(count) for label, count in self.strata.value_counts().items()}
+
+    @property
+    def weights(self) -> pd.Series:
+        """Number of population rows each sampled row stands for (N_h / n_h of its stratum)."""
+        factors = {label: self.population[label] / count for label, count in self.sampled.items()}
+        return self.strata.map(factors).astype(float)
+
+    def _stratum_table(self) -> pd.DataFrame:
+        table = pd.DataFrame({"N": pd.Series(self.population, dtype=float), "n": pd.Series(self.sampled, dtype=float)})
+        # Anteil der gezogenen Zeilen je Schicht (Endlichkeitskorrektur)
+        table["f"] = table["n"] / table["N"]
+        return table
+
+    def estimate_mean(self, column: str, confidence: float = SAMPLE_CONFIDENCE) -> Tuple[float, float]:
+        """
+        Stratified estimate of the mean of the non-null values of ``column`` and
+        the half-width of its confidence interval (normal approximation with
+        finite population correction).
+        """
+        values = pd.to_numeric(self.frame[column], errors="coerce")
+        groups = values.groupby(self.strata)
+        table = self._stratum_table().join(pd.DataFrame({"m": groups.count(), "mean": groups.mean(), "var": groups.var(ddof=1)}))
+        table = table[table["m"] > 0]
+        if table.empty:
+            return float("nan"), float("nan")
+        # Geschätzte Zahl nicht-leerer Werte je Schicht
+        present = table["N"] * table["m"] / table["n"]
+        share = present / present.sum()
+        mean = float((share * table["mean"]).sum())
+        variance = float((share ** 2 * (1 - table["f"]) * table["var"].fillna(0) / table["m"]).sum())
+        return mean, _z_value(confidence) * variance ** 0.5
+
+    def estimate_proportion(self, mask: pd.Series, confidence: float = SAMPLE_CONFIDENCE) -> Tuple[float, float]:
+        """Stratified estimate of the share of all rows for which ``mask`` is true, with the half-width of its interval."""
+        groups = mask.astype(float).groupby(self.strata)
+        table = self._stratum_table().join(pd.DataFrame({"p": groups.mean()}))
+        share = table["N"] / table["N"].sum()
+        p = float((share * table["p"]).sum())
+        variance = float((share ** 2 * (1 - table["f"]) * table["p"] * (1 - table["p"]) / (table["n"] - 1).clip(lower=1)).sum())
+        return p, _z_value(confidence) * variance ** 0.5
+
+    def describe(self, confidence: float = SAMPLE_CONFIDENCE) -> pd.DataFrame:
+        """
+        Estimated statistics per column (one row per dataset column): mean with
+        interval for numeric columns, the most frequent value with its share and
+        interval for the others. Counts and quantiles are weighted estimates,
+        min and max are those of the sample.
+        """
+        weights = self.weights
+        rows = {}
+        for name in self.frame.columns:
+            column = self.frame[name]
+            present = column.notna()
+            entry: Dict[str, Any] = {"count": round(float(weights[present].sum()))}
+            numeric = pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column)
+            if numeric and present.any():
+                values, w = column[present].to_numpy(dtype=float), weights[present].to_numpy()
+                mean, half = self.estimate_mean(name, confidence)
+                std = float(np.sqrt(np.average((values - mean) ** 2, weights=w)))
+                q25, q50, q75 = _weighted_quantiles(values, w, (0.25, 0.5, 0.75))
+                entry.update({"mean": mean, "mean ±": half, "std": std, "min": values.min(),
+                              "25%": q25, "50%": q50, "75%": q75, "max": values.max()})
+            elif present.any():
+                counts = weights[present].groupby(column[present].astype(str)).sum()
+                top = counts.idxmax()
+                share, half = self.estimate_proportion(column.astype(str).eq(top) & present, confidence)
+                entry.update({"unique (sample)": int(column.nunique()), "top": top, "top share": share, "top share ±": half})
+            rows[name] = entry
+        order = ["count", "mean", "mean ±", "std", "min", "25%", "50%", "75%", "max", "unique (sample)", "top", "top share", "top share ±"]
+        table = pd.DataFrame.from_dict(rows, orient="index")
+        return table[[field for field in order if field in table.columns]]
+
+    def info(self) -> Dict[str, Any]:
+        """Beschreibung der Stichprobe (ohne Daten) für Tool-Ausgaben und den Python-Kernel."""
+        return {
+            "path": self.path,
+            "rows": self.rows,
+            "sampled_rows": len(self.frame),
+            "stratify_by": self.stratify_by,
+            "population": dict(self.population),
+            "sampled": self.sampled,
+            "confidence": SAMPLE_CONFIDENCE,
+        }
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {
+            "version": SAMPLE_VERSION, "path": self.path, "source": self.source, "created": self.created,
+            "rows": self.rows, "stratify_by": self.stratify_by, "population": self.population,
+            "frame": self.frame, "strata": self.strata,
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "DatasetSample":
+        return cls(**{key: value for key, value in payload.items() if key != "version"})
+
+
+def _stratum_labels(series: pd.Series) -> pd.Series:
+    return series.astype(str).where(series.notna(), "NaN")
+
+
+def build_sample(csv_path: str, stratify_by: Optional[str] = None, size: int = SAMPLE_ROWS, seed: int = SAMPLE_SEED) -> DatasetSample:
+    """
+    Draw a sample of about ``size`` rows in one streaming pass over the dataset
+    (the Arrow copy if present, otherwise the CSV in chunks).
+
+    Every row gets a uniform random key; the rows with the ``size`` smallest
+    keys form a uniform sample (bottom-k reservoir). With ``stratify_by``, the
+    ``SAMPLE_MIN_PER_STRATUM`` smallest keys of every stratum are kept as well,
+    so rare groups are represented; estimates weight each stratum by its
+    population count, which the same pass collects.
+    """
+    real_path = os.path.realpath(csv_path)
+    source = _source_signature(real_path)
+    rng = np.random.default_rng(seed)
+    minimum = SAMPLE_MIN_PER_STRATUM if stratify_by is not None else 0
+    kept: Optional[pd.DataFrame] = None
+    population = pd.Series(dtype="int64")
+    rows = 0
+    for chunk in iter_chunks(real_path):
+        if stratify_by is not None and stratify_by not in chunk.columns:
+            raise ValueError(f"Spalte '{stratify_by}' nicht im Datensatz. Verfügbar: {', '.join(map(str, chunk.columns))}")
+        labels = _stratum_labels(chunk[stratify_by]) if stratify_by is not None else pd.Series(ALL_ROWS, index=chunk.index)
+        population = population.add(labels.value_counts(), fill_value=0).astype("int64")
+        if len(population) > SAMPLE_MAX_STRATA:
+            raise ValueError(f"Spalte '{stratify_by}' hat mehr als {SAMPLE_MAX_STRATA} verschiedene Werte – zum Schichten ungeeignet.")
+        keys = rng.random(len(chunk))
+
+        # Nur Zeilen übernehmen, deren Schlüssel noch unter einer der aktuellen Schwellen liegt
+        threshold = 1.0
+        if kept is not None and len(kept) >= size:
+            threshold = kept[_KEY].nsmallest(size).iloc[-1]
+        if minimum and kept is not None:
+            by_stratum = kept.groupby(_STRATUM)[_KEY]
+            full = by_stratum.count() >= minimum
+            stratum_threshold = by_stratum.apply(lambda k: k.nsmallest(minimum).iloc[-1])[full]
+            limit = np.maximum(labels.map(stratum_threshold).fillna(1.0).to_numpy(), threshold)
+        else:
+            limit = threshold
+        candidates = keys < limit
+        if candidates.any():
+            new = chunk[candidates].assign(**{_KEY: keys[candidates], _ROW: np.flatnonzero(candidates) + rows, _STRATUM: labels[candidates].to_numpy()})
+            combined = new if kept is None else pd.concat([kept, new], ignore_index=True)
+            combined = combined.sort_values(_KEY, kind="stable", ignore_index=True)
+            keep = np.arange(len(combined)) < size
+            if minimum:
+                keep |= combined.groupby(_STRATUM).cumcount().to_numpy() < minimum
+            kept = combined[keep]
+        rows += len(chunk)
+
+    if kept is None:
+        raise ValueError(f"Datensatz {csv_path} enthält keine Zeilen.")
+    kept = kept.sort_values(_ROW).set_index(_ROW)
+    kept.index.name = None
+    strata = kept.pop(_STRATUM)
+    kept = kept.drop(columns=_KEY)
+    return DatasetSample(
+        frame=kept, strata=strata, population={str(k): int(v) for k, v in population.items()}, rows=rows,
+        stratify_by=stratify_by, source=source, created=time.time(), path=sample_path_for(real_path, stratify_by),
+    )
+
+
+def _is_fresh(sample: DatasetSample, real_csv_path: str) -> bool:
+    try:
+        return sample.source == _source_signature(real_csv_path)
+    except FileNotFoundError:
+        return False
+
+
+def load_sample(csv_path: str, stratify_by: Optional[str] = None) -> Optional[DatasetSample]:
+    """Cached sample of ``csv_path`` (in memory or from disk), or None if it is missing or older than the file."""
+    real_path = os.path.realpath(csv_path)
+    path = sample_path_for(real_path, stratify_by)
+    with _locks_lock:
+        sample = _loaded.get(path)
+        if sample is not None:
+            _loaded.move_to_end(path)
+    if sample is not None and _is_fresh(sample, real_path):
+        return sample
+    try:
+        with open(path, "rb") as handle:
+            payload = pickle.load(handle)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+    if payload.get("version") != SAMPLE_VERSION:
+        return None
+    sample = DatasetSample.from_payload(payload)
+    if not _is_fresh(sample, real_path):
+        return None
+    _remember(path, sample)
+    return sample
+
+
+def _remember(path: str, sample: DatasetSample) -> None:
+    with _locks_lock:
+        _loaded[path] = sample
+        _loaded.move_to_end(path)
+        while len(_loaded) > SAMPLE_CACHE_ENTRIES:
+            _loaded.popitem(last=False)
+
+
+def ensure_sample(csv_path: str, stratify_by: Optional[str] = None) -> DatasetSample:
+    """
+    Cached sample of ``csv_path``, drawn and stored next to the file on first
+    use (written under a temporary name and renamed). Concurrent callers for
+    the same file wait for a single pass.
+    """
+    real_path = os.path.realpath(csv_path)
+    path = sample_path_for(real_path, stratify_by)
+    with _locks_lock:
+        lock = _build_locks.setdefault(path, threading.Lock())
+    with lock:
+        sample = load_sample(real_path, stratify_by)
+        if sample is not None:
+            return sample
+        started = time.perf_counter()
+        sample = build_sample(real_path, stratify_by)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as handle:
+                pickle.dump(sample.to_payload(), handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        _remember(path, sample)
+        logger.info(
+            f"Stichprobe für {real_path} gezogen: {len(sample.frame)} von {sample.rows} Zeilen"
+            f"{f', geschichtet nach {stratify_by}' if stratify_by else ''} in {time.perf_counter() - started:.1f}s."
+        )
+        return sample
@@ -0,0 +1,265 @@
+# coding_agent_backend/tools/output_renderer.py
+import functools
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Sequence
+
+import pandas as pd
+
+import metrics
+from llm_rate_limiter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Obergrenze für eine Tool-Ausgabe, die im nächsten Prompt landet
+TOOL_OUTPUT_TOKEN_BUDGET = int(os.getenv("TOOL_OUTPUT_TOKEN_BUDGET", "3000"))
+# Längere Zellwerte (z.B. Freitext) werden auf diese Länge gekürzt
+TOOL_OUTPUT_CELL_CHARS = int(os.getenv("TOOL_OUTPUT_CELL_CHARS", "80"))
+# So viele Zeilen sollen mindestens passen, bevor Spalten weggelassen werden
+TOOL_OUTPUT_MIN_ROWS = int(os.getenv("TOOL_OUTPUT_MIN_ROWS", "5"))
+TOOL_OUTPUT_TOP_K = int(os.getenv("TOOL_OUTPUT_TOP_K", "5"))
+
+# "head": erste Zeilen, "head_tail": Anfang und Ende, "sample": gleichmäßige Stichprobe (in Originalreihenfolge)
+ROW_STRATEGIES = ("head", "head_tail", "sample")
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding() -> Any:
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:  # tiktoken ist optional (und braucht beim ersten Laden ggf. Netz)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens nach cl100k_base, falls tiktoken installiert ist, sonst die Schätzung des Rate-Limiters."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+@dataclass
+class RenderedOutput:
+    text: str
+    chars: int
+    tokens: int
+    shown_rows: int = 0
+    omitted: List[str] = field(default_factory=list)
+
+    @property
+    def truncated(self) -> bool:
+        return bool(self.omitted)
+
+    def prepend(self, header: str) -> "RenderedOutput":
+        """Stellt eine erst nach dem Rendern bekannte Kopfzeile voran (Zähler werden aktualisiert)."""
+        self.text = f"{header}\n{self.text}"
+        self.chars, self.tokens = len(self.text), count_tokens(self.text)
+        return self
+
+
+def _name_list(names: Sequence[Any], limit: int = 10) -> str:
+    shown = ", ".join(str(name) for name in names[:limit])
+    return shown + (f", … (+{len(names) - limit})" if len(names) > limit else "")
+
+
+def _clip_cells(frame: pd.DataFrame, max_chars: int) -> "tuple[pd.DataFrame, int]":
+    """Kürzt lange Texte und ersetzt Zeilenumbrüche, damit jede Zeile der Tabelle eine Textzeile bleibt."""
+    clipped = 0
+    frame = frame.copy(deep=False)
+    for name in frame.columns:
+        column = frame[name]
+        if not (pd.api.types.is_object_dtype(column) or pd.api.types.is_string_dtype(column)):
+            continue
+        text = column.astype(str).str.replace(r"[\r\n\t]+", " ", regex=True)
+        too_long = text.str.len() > max_chars
+        clipped += int(too_long.sum())
+        frame[name] = text.where(~too_long, text.str.slice(0, max_chars - 1) + "…").where(column.notna(), column)
+    return frame, clipped
+
+
+def _select_rows(frame: pd.DataFrame, count: int, strategy: str, seed: int) -> "tuple[pd.DataFrame, int]":
+    """``count`` Zeilen nach ``strategy``; zusätzlich die Position der Lücke bei head_tail (sonst -1)."""
+    if count >= len(frame):
+        return frame, -1
+    if strategy == "head":
+        return frame.iloc[:count], -1
+    if strategy == "sample":
+        return frame.sample(n=count, random_state=seed).sort_index(kind="stable"), -1
+    head = (count + 1) // 2
+    return pd.concat([frame.iloc[:head], frame.iloc[len(frame) - (count - head):]]), head
+
+
+def _table_text(frame: pd.DataFrame, index: bool, gap_after: int = -1, gap_rows: int = 0) -> str:
+    text = frame.to_string(index=index)
+    if gap_after < 0:
+        return text
+    lines = text.split("\n")
+    header = len(lines) - len(frame)
+    lines.insert(header + gap_after, f"… {gap_rows} Zeilen ausgelassen …")
+    return "\n".join(lines)
+
+
+def _top_values(frame: pd.DataFrame, columns: Sequence[Any], k: int, max_tokens: int) -> "tuple[str, int]":
+    """Top-k-Werte je Spalte, solange sie in ``max_tokens`` passen; dazu die Zahl der weggelassenen Spalten."""
+    columns = [name for name in columns if name in frame.columns]
+    lines: List[str] = []
+    used = 0
+    for name in columns:
+        counts = frame[name].astype(str).where(frame[name].notna(), "NaN").value_counts().head(k)
+        line = f"  - {name}: " + ", ".join(f"{value} ({count})" for value, count in counts.items())
+        used += count_tokens(line) + 1
+        if used > max_tokens:
+            break
+        lines.append(line)
+    return "\n".join(lines), len(columns) - len(lines)
+
+
+def _fit_table(
+    frame: pd.DataFrame,
+    table_budget: int,
+    summary_budget: int,
+    index: bool,
+    strategy: str,
+    priority_columns: Sequence[Any],
+    summary_columns: Sequence[Any],
+    seed: int,
+) -> "tuple[str, List[str], int]":
+    """Tabellentext für ``table_budget`` Tokens samt Liste der Auslassungen und Zahl der gezeigten Zeilen."""
+    omitted: List[str] = []
+    ordered = [c for c in priority_columns if c in frame.columns] + [c for c in frame.columns if c not in priority_columns]
+    probe = frame.head(TOOL_OUTPUT_MIN_ROWS)
+    keep = len(ordered)
+    if keep > 1 and count_tokens(_table_text(probe[ordered], index)) > table_budget:
+        low, high = 1, keep - 1
+        while low < high:  # größte Spaltenzahl, die passt
+            mid = (low + high + 1) // 2
+            if count_tokens(_table_text(probe[ordered[:mid]], index)) <= table_budget:
+                low = mid
+            else:
+                high = mid - 1
+        keep = low
+        dropped = ordered[keep:]
+        omitted.append(f"{len(dropped)} von {len(ordered)} Spalten ausgelassen: {_name_list(dropped)}")
+    frame = frame[ordered[:keep]]
+
+    rows = len(frame)
+    shown = rows
+    # Jede Zeile kostet mindestens ein Token – größere Tabellen gar nicht erst vollständig rendern
+    text = _table_text(frame, index) if rows <= table_budget else ""
+    if rows and (not text or count_tokens(text) > table_budget):
+        low, high = 0, min(rows - 1, table_budget)
+        while low < high:  # größte Zeilenzahl, die passt
+            mid = (low + high + 1) // 2
+            selected, gap = _select_rows(frame, mid, strategy, seed)
+            if count_tokens(_table_text(selected, index, gap, rows - mid)) <= table_budget:
+                low = mid
+            else:
+                high = mid - 1
+        shown = low
+        selected, gap = _select_rows(frame, shown, strategy, seed)
+        text = _table_text(selected, index, gap, rows - shown) if shown else ""
+        how = {"head": "nur die ersten", "head_tail": "Anfang und Ende,", "sample": "Stichprobe von"}[strategy]
+        omitted.append(f"{rows - shown} von {rows} Zeilen ausgelassen ({how} {shown} Zeilen gezeigt)")
+        if summary_columns:
+            summary, skipped = _top_values(frame, summary_columns, TOOL_OUTPUT_TOP_K, summary_budget)
+            if summary:
+                text += f"\n\nHäufigste Werte über alle {rows} Zeilen:\n{summary}"
+            if skipped:
+                omitted.append(f"Häufigste Werte für {skipped} Spalte(n) weggelassen")
+    return text, omitted, shown
+
+
+def render_table(
+    frame: pd.DataFrame,
+    budget: Optional[int] = None,
+    *,
+    title: str = "",
+    index: bool = False,
+    strategy: str = "head_tail",
+    priority_columns: Sequence[Any] = (),
+    summary_columns: Sequence[Any] = (),
+    seed: int = 0,
+) -> RenderedOutput:
+    """
+    Render ``frame`` as a text table that fits into ``budget`` tokens.
+
+    In this order: long cell values are clipped, columns are dropped from the
+    right (``priority_columns`` first, so they are kept) until at least
+    ``TOOL_OUTPUT_MIN_ROWS`` rows fit, and rows are reduced to the largest count
+    that fits, chosen by ``strategy``. When rows are left out, the top-k values
+    of ``summary_columns`` over all rows are appended (at most a quarter of the
+    budget). Every omission is listed in a final note, so the reader knows the
+    output is partial. Title, summary and note count against the budget too;
+    only a budget too small for title and note alone is exceeded.
+    """
+    budget = budget or TOOL_OUTPUT_TOKEN_BUDGET
+    if strategy not in ROW_STRATEGIES:
+        raise ValueError(f"Unbekannte Strategie '{strategy}'. Erlaubt: {', '.join(ROW_STRATEGIES)}")
+    clipped_note: List[str] = []
+    frame, clipped = _clip_cells(frame, TOOL_OUTPUT_CELL_CHARS)
+    if clipped:
+        clipped_note.append(f"{clipped} Zellwerte auf {TOOL_OUTPUT_CELL_CHARS} Zeichen gekürzt")
+
+    # Platz für Titel, Zusammenfassung und Hinweis freihalten
+    table_budget = max(1, int(budget * 0.85) - count_tokens(title))
+    while True:
+        text, omitted, shown = _fit_table(
+            frame, table_budget, budget // 4, index, strategy, priority_columns, summary_columns, seed
+        )
+        parts = [part for part in (title, text) if part]
+        output = finish("\n".join(parts), clipped_note + omitted, budget, shown_rows=shown)
+        if output.tokens <= budget or table_budget <= 1:
+            return output
+        # Zusammenfassung und Hinweis brauchen mehr als reserviert: Tabelle um den Überhang verkleinern
+        table_budget = max(1, table_budget - (output.tokens - budget))
+
+
+def render_text(text: str, budget: Optional[int] = None, *, title: str = "") -> RenderedOutput:
+    """Kürzt freien Text (z.B. Programmausgaben) zeilenweise auf Anfang und Ende, bis er ins Budget passt."""
+    budget = budget or TOOL_OUTPUT_TOKEN_BUDGET
+    body_budget = max(1, int(budget * 0.9) - count_tokens(title))
+    omitted: List[str] = []
+    if count_tokens(text) > body_budget:
+        lines = text.split("\n")
+        if len(lines) == 1:
+            # Eine einzige lange Zeile: nach Zeichen kürzen
+            keep = max(1, body_budget * len(text) // max(1, count_tokens(text)))
+            head = keep // 2
+            text = f"{text[:head]} … {text[len(text) - (keep - head):]}"
+            omitted.append(f"{len(lines[0]) - keep} Zeichen in der Mitte ausgelassen")
+        else:
+            low, high = 0, len(lines) - 1
+            while low < high:
+                mid = (low + high + 1) // 2
+                head = (mid + 1) // 2
+                candidate = lines[:head] + ["…"] + lines[len(lines) - (mid - head):]
+                if count_tokens("\n".join(candidate)) <= body_budget:
+                    low = mid
+                else:
+                    high = mid - 1
+            head = (low + 1) // 2
+            gap = len(lines) - low
+            text = "\n".join(lines[:head] + [f"… {gap} Zeilen ausgelassen …"] + lines[len(lines) - (low - head):])
+            omitted.append(f"{gap} von {len(lines)} Zeilen ausgelassen (Anfang und Ende gezeigt)")
+    parts = [part for part in (title, text) if part]
+    return finish("\n".join(parts), omitted, budget)
+
+
+def finish(text: str, omitted: List[str], budget: int, shown_rows: int = 0) -> RenderedOutput:
+    """Hängt den Hinweis auf ausgelassene Teile an und zählt Zeichen und Tokens der fertigen Ausgabe."""
+    if omitted:
+        body_tokens = count_tokens(text)
+        text += f"\n\n[Ausgabe gekürzt auf ~{body_tokens} Tokens (Budget {budget}): " + "; ".join(omitted) + "]"
+    return RenderedOutput(text, len(text), count_tokens(text), shown_rows, omitted)
+
+
+def record(tool: str, output: RenderedOutput) -> str:
+    """Erfasst Größe und Kürzung der Ausgabe von ``tool`` in den Metriken und gibt den Text zurück."""
+    metrics.TOOL_OUTPUT_TOKENS.observe(output.tokens, tool=tool)
+    if output.truncated:
+        metrics.TOOL_OUTPUT_TRUNCATED.inc(tool=tool)
+    logger.debug(f"Ausgabe von '{tool}': {output.chars} Zeichen, {output.tokens} Tokens, gekürzt: {output.truncated}")
+    return output.text
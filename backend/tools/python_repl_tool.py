@@ -1,8 +1,17 @@
 # coding_agent_backend/tools/python_repl_tool.py
+import logging
+import os
 from crewai.tools import BaseTool # Wichtig: Import von crewai.tools
-from langchain_experimental.tools import PythonREPLTool as LangchainPythonREPLTool # Umbenannt für Klarheit
 from pydantic import BaseModel, Field
-from typing import Type, Any
+from typing import Type, Any, Dict, Optional
+
+from kernel_pool import python_kernel_pool, sanitize_input, PYTHON_EXEC_TIMEOUT_SECONDS
+from task_context import current_task_id, current_dataset_path
+from .columnar_store import columnar_path_for, ingest_status
+from .dataset_sample import sample_path_for, sample_status, should_sample
+from .output_renderer import record, render_text
+
+logger = logging.getLogger(__name__)
 
 # Definiere das Schema für die Eingabeargumente
 class PythonREPLToolInput(BaseModel):
@@ -15,24 +24,46 @@ class CustomPythonREPLTool(BaseTool):
         "Ein Python REPL (Read-Eval-Print Loop). Führt Python-Code aus und gibt das Ergebnis (stdout, stderr oder Rückgabewert) zurück. "
         "Sehr nützlich für Datenmanipulation mit Pandas, mathematische Berechnungen mit NumPy, "
         "oder jede andere Aufgabe, die durch Ausführen von Python-Code gelöst werden kann. "
+        "Der Datensatz des Tasks ist bereits als pandas DataFrame `df` geladen (Pfad in `dataset_path`) – "
+        "nicht erneut mit pd.read_csv einlesen. "
+        "`df` enthält immer alle Zeilen. Bei sehr großen Dateien gibt es zusätzlich `df_sample`, eine vorab gezogene "
+        "Zufallsstichprobe für schnelle Schätzungen (Größen und Gewichte in `sample_info`). "
+        "Variablen bleiben zwischen Aufrufen innerhalb desselben Tasks erhalten; pandas, numpy und seaborn sind vorgeladen "
+        f"(import ist sofort). Jede Ausführung wird nach {PYTHON_EXEC_TIMEOUT_SECONDS:.0f} Sekunden abgebrochen. "
         "Achtung: Code wird direkt ausgeführt!"
     )
     args_schema: Type[BaseModel] = PythonREPLToolInput
-    _langchain_repl: LangchainPythonREPLTool # Interne Instanz des originalen Tools
-
-    def __init__(self, **kwargs: Any):
-        super().__init__(**kwargs)
-        self._langchain_repl = LangchainPythonREPLTool() # Initialisiere das Original-Tool hier
 
     def _run(self, command: str, **kwargs: Any) -> str:
-        """Führt den Python-Befehl aus."""
+        """Führt den Python-Befehl im Kernel-Namespace des aktuellen Tasks aus."""
         # WICHTIG: Sicherheitshinweis bleibt bestehen!
         # Die Ausführung von beliebigem Code ist ein erhebliches Sicherheitsrisiko.
-        # In einer Produktivumgebung sind strikte Sandbox-Mechanismen unerlässlich.
+        # Die Kernel-Prozesse begrenzen Laufzeit und Speicher, sind aber keine Sandbox.
         try:
-            return self._langchain_repl.run(command)
+            output = python_kernel_pool.execute(
+                current_task_id.get() or "default",
+                sanitize_input(command),
+                dataset=self._dataset_source(current_dataset_path.get()),
+            )
+            # Lange Ausgaben (z.B. print(df)) auf Anfang und Ende kürzen, damit sie ins Token-Budget passen
+            return record(self.name, render_text(output))
         except Exception as e:
             return f"Fehler bei der Ausführung des Python-Codes: {str(e)}"
 
+    @staticmethod
+    def _dataset_source(dataset_path: Optional[str]) -> Optional[Dict[str, Optional[str]]]:
+        """
+        CSV-Pfad plus Arrow-Kopie (falls aktuell), die der Kernel per Memory-Mapping einbindet,
+        und bei sehr großen Dateien die nach dem Upload gezogene Stichprobe (zusätzlich als ``df_sample``).
+        Die Stichprobe wird hier nie gezogen – ist sie noch nicht fertig, gibt es nur ``df``.
+        """
+        if not dataset_path or not os.path.isfile(dataset_path):
+            return None
+        arrow_path = columnar_path_for(dataset_path) if ingest_status(dataset_path) == "ready" else None
+        sample_path = None
+        if should_sample(dataset_path) and sample_status(dataset_path) == "ready":
+            sample_path = sample_path_for(dataset_path)
+        return {"csv": dataset_path, "arrow": arrow_path, "sample": sample_path}
+
 # Instanziiere dein benutzerdefiniertes Tool
-python_repl = CustomPythonREPLTool()
\ No newline at end of file
+python_repl = CustomPythonREPLTool()
@@ -0,0 +1,358 @@
+# coding_agent_backend/tools/streaming_stats.py
+import math
+import os
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .columnar_store import iter_columnar_batches
+
+# Dateien ab dieser Größe werden von den Tools automatisch im Streaming-Modus ausgewertet
+STREAMING_THRESHOLD_BYTES = int(os.getenv("STREAMING_STATS_THRESHOLD_BYTES", str(1024 ** 3)))
+STREAMING_CHUNK_ROWS = int(os.getenv("STREAMING_STATS_CHUNK_ROWS", "200000"))
+
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+def should_stream(path: str, streaming: Optional[bool] = None) -> bool:
+    """Explicit choice wins; otherwise stream files above ``STREAMING_THRESHOLD_BYTES``."""
+    if streaming is not None:
+        return streaming
+    return os.path.getsize(path) > STREAMING_THRESHOLD_BYTES
+
+
+class RunningMoments:
+    """Count, mean and M2 (Welford), merged per chunk with Chan's parallel formula."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values: np.ndarray) -> None:
+        if len(values) == 0:
+            return
+        other = RunningMoments()
+        other.count = len(values)
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        self.merge(other)
+
+    def merge(self, other: "RunningMoments") -> None:
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else float("nan")
+
+
+class HyperLogLog:
+    """
+    Distinct-count sketch over 64-bit value hashes. Counts exactly while fewer than
+    ``exact_limit`` distinct hashes were seen and switches to the registers after that.
+    """
+
+    def __init__(self, precision: int = 14, exact_limit: int = 4096):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+        self.exact_limit = exact_limit
+        self._exact: Optional[set] = set()
+
+    def update(self, hashes: np.ndarray) -> None:
+        if len(hashes) == 0:
+            return
+        hashes = hashes.astype(np.uint64, copy=False)
+        if self._exact is not None:
+            self._exact.update(np.unique(hashes).tolist())
+            if len(self._exact) > self.exact_limit:
+                self._exact = None
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        rest = hashes << p
+        # Position des ersten gesetzten Bits; frexp liefert die Bitlänge ohne Python-Schleife
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = np.where(rest == 0, 64 - self.precision + 1, 64 - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+        if self._exact is not None and other._exact is not None:
+            self._exact |= other._exact
+            if len(self._exact) > self.exact_limit:
+                self._exact = None
+        else:
+            self._exact = None
+
+    def estimate(self) -> int:
+        if self._exact is not None:
+            return len(self._exact)
+        m = float(len(self.registers))
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class KLLSketch:
+    """Mergeable quantile sketch (KLL): compactors of capacity ~k, items at level h weigh 2**h."""
+
+    def __init__(self, k: int = 256, seed: int = 0):
+        self.k = k
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values: np.ndarray) -> None:
+        if len(values) == 0:
+            return
+        self.levels[0] = np.concatenate([self.levels[0], values.astype(np.float64, copy=False)])
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                # Bei ungerader Anzahl bleibt ein Element auf der Stufe
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[: len(items) - len(keep)]
+                promoted = pairs[int(self._rng.integers(2))::2]
+                self.levels[level] = keep
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def quantile(self, q: float) -> float:
+        items = np.concatenate(self.levels)
+        if len(items) == 0:
+            return float("nan")
+        weights = np.concatenate([np.full(len(lvl), 2.0 ** h) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, weights = items[order], weights[order]
+        cumulative = np.cumsum(weights)
+        target = q * cumulative[-1]
+        return float(items[min(np.searchsorted(cumulative, target, side="left"), len(items) - 1)])
+
+
+class HeavyHitters:
+    """Misra-Gries summary for the most frequent value (describe's ``top``/``freq``)."""
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.counters = pd.Series(dtype="int64")
+
+    def update(self, counts: pd.Series) -> None:
+        combined = self.counters.add(counts, fill_value=0) if len(self.counters) else counts
+        if len(combined) > self.capacity:
+            threshold = combined.nlargest(self.capacity + 1).iloc[-1]
+            combined = combined[combined > threshold] - threshold
+        self.counters = combined.astype("int64")
+
+    def merge(self, other: "HeavyHitters") -> None:
+        self.update(other.counters)
+
+    def top(self):
+        if self.counters.empty:
+            return np.nan, np.nan
+        return self.counters.idxmax(), int(self.counters.max())
+
+
+class ColumnStats:
+    def __init__(self):
+        self.dtype: Optional[np.dtype] = None
+        self.non_null = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.moments = RunningMoments()
+        self.quantiles = KLLSketch()
+        self.distinct = HyperLogLog()
+        self.frequent = HeavyHitters()
+        # Chunks mit Zahlen und mit Text in derselben Spalte: unique/top/freq erst nach erneutem Lesen als Text korrekt
+        self.saw_numeric = False
+        self.saw_text = False
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.dtype is not None and pd.api.types.is_numeric_dtype(self.dtype) and not pd.api.types.is_bool_dtype(self.dtype)
+
+    def _merge_dtype(self, dtype) -> None:
+        if self.dtype is None:
+            self.dtype = dtype
+        elif self.dtype != dtype:
+            numeric = [pd.api.types.is_numeric_dtype(d) and not pd.api.types.is_bool_dtype(d) for d in (self.dtype, dtype)]
+            self.dtype = np.result_type(self.dtype, dtype) if all(numeric) else np.dtype(object)
+
+    def update(self, series: pd.Series) -> None:
+        # Reine NaN-Chunks (float64) sollen den Typ einer sonst ganzzahligen Spalte nicht ändern
+        values = series.dropna()
+        self.nulls += len(series) - len(values)
+        self.non_null += len(values)
+        if len(values) or self.dtype is None:
+            self._merge_dtype(series.dtype)
+        if len(values) == 0:
+            return
+        chunk_is_numeric = pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype)
+        self.saw_numeric |= chunk_is_numeric
+        self.saw_text |= not chunk_is_numeric
+        if not self.is_numeric:
+            # unique/top/freq erscheinen nur für nicht-numerische Spalten im describe()
+            self.update_categorical(values)
+        else:
+            array = values.to_numpy(dtype=np.float64)
+            self.moments.update(array)
+            self.quantiles.update(array)
+            low, high = float(array.min()), float(array.max())
+            self.min = low if self.min is None else min(self.min, low)
+            self.max = high if self.max is None else max(self.max, high)
+
+    def update_categorical(self, values: pd.Series) -> None:
+        if not (pd.api.types.is_string_dtype(values.dtype) or values.dtype == object):
+            values = values.astype(str)
+        self.distinct.update(pd.util.hash_pandas_object(values, index=False).to_numpy())
+        self.frequent.update(values.value_counts(sort=False))
+
+    @property
+    def needs_rescan(self) -> bool:
+        return self.saw_numeric and self.saw_text
+
+    def reset_categorical(self) -> None:
+        self.distinct = HyperLogLog()
+        self.frequent = HeavyHitters()
+        self.saw_numeric = False
+
+    def merge(self, other: "ColumnStats") -> None:
+        self.saw_numeric |= other.saw_numeric
+        self.saw_text |= other.saw_text
+        if other.dtype is not None:
+            self._merge_dtype(other.dtype)
+        self.non_null += other.non_null
+        self.nulls += other.nulls
+        self.moments.merge(other.moments)
+        self.quantiles.merge(other.quantiles)
+        self.distinct.merge(other.distinct)
+        self.frequent.merge(other.frequent)
+        for attr, pick in (("min", min), ("max", max)):
+            mine, theirs = getattr(self, attr), getattr(other, attr)
+            if theirs is not None:
+                setattr(self, attr, theirs if mine is None else pick(mine, theirs))
+
+
+class DatasetStats:
+    """
+    Mergeable one-pass statistics for a whole dataset with memory bounded by the
+    sketch sizes, independent of the number of rows.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns: Dict[str, ColumnStats] = {}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self.rows += len(chunk)
+        for name in chunk.columns:
+            self.columns.setdefault(name, ColumnStats()).update(chunk[name])
+
+    def columns_to_rescan(self) -> List[str]:
+        """Columns that turned into text after numeric chunks; see ``rescan_categorical``."""
+        return [name for name, s in self.columns.items() if s.needs_rescan]
+
+    def rescan_categorical(self, chunks: Iterator[pd.DataFrame]) -> None:
+        """Rebuild unique/top/freq of the given chunks' columns from their text values (second pass)."""
+        rescanned = set()
+        for chunk in chunks:
+            for name in chunk.columns:
+                if name not in rescanned:
+                    self.columns[name].reset_categorical()
+                    rescanned.add(name)
+                self.columns[name].update_categorical(chunk[name].dropna())
+
+    def merge(self, other: "DatasetStats") -> None:
+        self.rows += other.rows
+        for name, stats in other.columns.items():
+            self.columns.setdefault(name, ColumnStats()).merge(stats)
+
+    @property
+    def shape(self):
+        return self.rows, len(self.columns)
+
+    def dtypes(self) -> pd.Series:
+        return pd.Series({name: s.dtype for name, s in self.columns.items()}, dtype=object)
+
+    def null_counts(self) -> pd.Series:
+        return pd.Series({name: s.nulls for name, s in self.columns.items()}, dtype="int64")
+
+    def describe(self, include: str = "all") -> pd.DataFrame:
+        """Same layout as ``DataFrame.describe(include=...)`` for ``'all'`` and ``'number'``."""
+        numeric = [n for n, s in self.columns.items() if s.is_numeric]
+        other = [n for n, s in self.columns.items() if not s.is_numeric]
+        selected = numeric if include == "number" else list(self.columns)
+        if not selected:
+            raise ValueError("No objects to concatenate")
+        rows = ["count"]
+        if include != "number" and other:
+            rows += ["unique", "top", "freq"]
+        if numeric:
+            rows += ["mean", "std", "min", "25%", "50%", "75%", "max"]
+
+        table = {}
+        for name in selected:
+            s = self.columns[name]
+            column = dict.fromkeys(rows, np.nan)
+            if s.is_numeric:
+                column["count"] = float(s.non_null)
+                column.update(mean=s.moments.mean if s.moments.count else np.nan, std=s.moments.std)
+                column["min"] = s.min if s.min is not None else np.nan
+                column["max"] = s.max if s.max is not None else np.nan
+                for q in QUANTILES:
+                    column[f"{int(q * 100)}%"] = s.quantiles.quantile(q)
+            else:
+                top, freq = s.frequent.top()
+                column.update(count=s.non_null, unique=s.distinct.estimate(), top=top, freq=freq)
+            table[name] = pd.Series(column, dtype=float if s.is_numeric else object)
+        frame = pd.DataFrame(table, index=rows)
+        return frame.astype(float) if include == "number" or not other else frame
+
+
+def iter_chunks(path: str, chunk_rows: int = STREAMING_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Chunks from the memory-mapped Arrow copy if present, otherwise from the CSV."""
+    batches = iter_columnar_batches(path)
+    if batches is not None:
+        yield from batches
+        return
+    with pd.read_csv(path, chunksize=chunk_rows) as reader:
+        yield from reader
+
+
+def compute_streaming_stats(path: str, chunk_rows: int = STREAMING_CHUNK_ROWS) -> DatasetStats:
+    stats = DatasetStats()
+    for chunk in iter_chunks(path, chunk_rows):
+        stats.update(chunk)
+    mixed = stats.columns_to_rescan()
+    if mixed:
+        # Nur Spalten mit Zahlen und Text (CSV-Chunks mit wechselndem Typ) ein zweites Mal, als Text gelesen –
+        # wie pandas sie beim Lesen der ganzen Datei behandelt
+        with pd.read_csv(path, chunksize=chunk_rows, usecols=mixed, dtype={name: str for name in mixed}) as reader:
+            stats.rescan_categorical(reader)
+    return stats
@@ -1,36 +1,27 @@
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
-from typing import Type
-import pandas as pd
+from typing import Optional, Type
+from .dataset_profile import build_profile, ensure_profile, format_profile
+from .output_renderer import record, render_text
 
 class SummarizeCSVToolInput(BaseModel):
     csv: str = Field(..., description="Pfad zur CSV-Datei, die zusammengefasst werden soll")
+    streaming: Optional[bool] = Field(None, description="Datei in Chunks auswerten statt komplett zu laden (Standard: automatisch für große Dateien)")
 
 class SummarizeCSVTool(BaseTool):
     name: str = "Summarize a CSV"
-    description: str = "Lädt eine CSV-Datei und gibt eine strukturierte Zusammenfassung (Spalten, Datentypen, Nullwerte, Statistik) zurück."
+    description: str = "Gibt eine strukturierte Zusammenfassung einer CSV-Datei zurück (Spalten, Datentypen, Nullwerte, Statistik, häufigste Werte, Beispielzeilen)."
     args_schema: Type[BaseModel] = SummarizeCSVToolInput
 
-    def _run(self, csv: str, **kwargs) -> str:
+    def _run(self, csv: str, streaming: Optional[bool] = None, **kwargs) -> str:
         try:
-            df = pd.read_csv(csv)
-
-            info = f"📊 CSV-Zusammenfassung für Datei: {csv}\n"
-            info += f"• Form: {df.shape[0]} Zeilen, {df.shape[1]} Spalten\n"
-            info += "\n• Spaltenübersicht:\n"
-            info += "\n".join([f"  - {col} ({dtype})" for col, dtype in df.dtypes.items()])
-
-            nulls = df.isnull().sum()
-            null_summary = "\n".join([f"  - {col}: {count} fehlende Werte" for col, count in nulls.items() if count > 0])
-            if null_summary:
-                info += "\n\n• Fehlende Werte:\n" + null_summary
+            if streaming is None:
+                # Beim Upload berechnetes Profil; fehlt es, wird es jetzt erstellt und gespeichert
+                profile = ensure_profile(csv)
             else:
-                info += "\n\n• Keine fehlenden Werte gefunden."
-
-            numeric_summary = df.describe(include='number').to_string()
-            info += f"\n\n• Statistische Übersicht (nur numerische Spalten):\n{numeric_summary}"
-
-            return info
+                profile = build_profile(csv, streaming)
+            # Sehr breite Datensätze: Spaltenliste und Statistik werden auf Anfang und Ende gekürzt
+            return record(self.name, render_text(format_profile(profile, csv)))
         except Exception as e:
             raise Exception(f"Fehler beim Verarbeiten der CSV-Datei '{csv}': {str(e)}")
 
@@ -0,0 +1,212 @@
+# coding_agent_backend/tracing.py
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import metrics
+from task_context import current_task_id
+
+logger = logging.getLogger(__name__)
+
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "20000"))  # pro Task; danach wird nur noch gezählt
+TRACE_MAX_TASKS = int(os.getenv("TRACE_MAX_TASKS", "200"))
+
+# Span-Kategorien
+LLM = "llm"
+TOOL = "tool"
+CHAIN = "chain"
+CSV = "csv"
+QUEUE = "queue"
+TASK = "task"
+
+
+@dataclass
+class Span:
+    name: str
+    category: str
+    start: float  # time.time()
+    end: Optional[float] = None
+    run_id: Optional[str] = None
+    parent_run_id: Optional[str] = None
+    thread: int = 0
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return max(0.0, (self.end if self.end is not None else time.time()) - self.start)
+
+
+def observe_span(span: Span) -> None:
+    """Überträgt einen abgeschlossenen Span in die Prometheus-Histogramme (siehe metrics)."""
+    if span.category == LLM:
+        model = str(span.attrs.get("model") or "unknown")
+        metrics.LLM_LATENCY.observe(span.duration, model=model)
+        for kind in ("prompt", "completion"):
+            tokens = span.attrs.get(f"{kind}_tokens")
+            if tokens:
+                metrics.LLM_TOKENS.inc(tokens, model=model, kind=kind)
+    elif span.category == TOOL:
+        metrics.TOOL_LATENCY.observe(span.duration, tool=span.name, status=str(span.attrs.get("status", "ok")))
+    elif span.category == CSV:
+        metrics.CSV_PARSE.observe(span.duration, source=str(span.attrs.get("source", "csv")))
+
+
+class TaskTrace:
+    """
+    Timed spans of one crew task.
+
+    Spans are opened and closed by ``run_id`` (as passed to the LangChain-style
+    callbacks) and keep their ``parent_run_id``, so the nesting LLM call → chain →
+    tool is preserved. Callers without a run_id close the most recent open span
+    of the same category. Closed spans are handed to ``observer`` (the metrics).
+    """
+
+    def __init__(self, task_id: str, observer: Optional[Callable[[Span], None]] = observe_span, max_spans: int = TRACE_MAX_SPANS):
+        self.task_id = task_id
+        self.observer = observer
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self._open: "OrderedDict[str, Span]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, name: str, category: str, run_id: Any = None, parent_run_id: Any = None, **attrs: Any) -> str:
+        key = str(run_id) if run_id is not None else f"{category}:{uuid.uuid4().hex}"
+        span = Span(
+            name, category, time.time(),
+            run_id=key,
+            parent_run_id=str(parent_run_id) if parent_run_id is not None else None,
+            thread=threading.get_ident(),
+            attrs=attrs,
+        )
+        with self._lock:
+            self._open[key] = span
+        return key
+
+    def end(self, run_id: Any = None, category: Optional[str] = None, **attrs: Any) -> Optional[Span]:
+        with self._lock:
+            span = self._open.pop(str(run_id), None) if run_id is not None else None
+            if span is None and category is not None:
+                key = next((k for k in reversed(self._open) if self._open[k].category == category), None)
+                span = self._open.pop(key) if key is not None else None
+        if span is None:
+            return None
+        span.end = time.time()
+        span.attrs.update(attrs)
+        self.add(span)
+        return span
+
+    def record(self, name: str, category: str, start: float, end: float, **attrs: Any) -> Span:
+        """Fügt einen bereits abgeschlossenen Span hinzu (z.B. die Wartezeit in der Queue)."""
+        span = Span(name, category, start, end, run_id=f"{category}:{uuid.uuid4().hex}", thread=threading.get_ident(), attrs=attrs)
+        self.add(span)
+        return span
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+        if self.observer is not None:
+            self.observer(span)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Trace im Chrome-Trace-Event-Format (chrome://tracing, Perfetto, speedscope)."""
+        with self._lock:
+            spans = list(self.spans) + list(self._open.values())
+            open_ids = set(self._open)
+        threads = {}
+        events: List[Dict[str, Any]] = []
+        for span in sorted(spans, key=lambda s: s.start):
+            tid = threads.setdefault(span.thread, len(threads) + 1)
+            args = {"run_id": span.run_id, "parent_run_id": span.parent_run_id, **span.attrs}
+            if span.run_id in open_ids:
+                args["incomplete"] = True
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round(span.start * 1e6),
+                "dur": round(span.duration * 1e6),
+                "pid": 1,
+                "tid": tid,
+                "args": args,
+            })
+        metadata = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": f"Task {self.task_id}"}}]
+        metadata += [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": f"Thread {tid}"}} for tid in threads.values()]
+        return {
+            "traceEvents": metadata + events,
+            "displayTimeUnit": "ms",
+            "otherData": {"task_id": self.task_id, "dropped_spans": self.dropped},
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Abgeschlossene Spans als einfache Daten, z.B. für die Übergabe aus einem Worker-Prozess."""
+        with self._lock:
+            return {"task_id": self.task_id, "dropped": self.dropped, "spans": [asdict(span) for span in self.spans]}
+
+
+class TraceStore:
+    """Traces of the most recent ``max_tasks`` tasks."""
+
+    def __init__(self, max_tasks: int = TRACE_MAX_TASKS):
+        self.max_tasks = max_tasks
+        self._traces: "OrderedDict[str, TaskTrace]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, task_id: str) -> TaskTrace:
+        """Trace des Tasks (wird bei Bedarf angelegt)."""
+        with self._lock:
+            trace = self._traces.get(task_id)
+            if trace is None:
+                trace = self._traces[task_id] = TaskTrace(task_id)
+                while len(self._traces) > self.max_tasks:
+                    self._traces.popitem(last=False)
+            return trace
+
+    def get(self, task_id: str) -> Optional[TaskTrace]:
+        with self._lock:
+            return self._traces.get(task_id)
+
+    def pop(self, task_id: str) -> Optional[TaskTrace]:
+        with self._lock:
+            return self._traces.pop(task_id, None)
+
+    def ingest(self, data: Dict[str, Any]) -> TaskTrace:
+        """Übernimmt die Spans eines Worker-Prozesses in den Trace des Tasks (inklusive Metriken)."""
+        trace = self.start(data["task_id"])
+        trace.dropped += data.get("dropped", 0)
+        for span in data.get("spans", []):
+            trace.add(Span(**span))
+        return trace
+
+
+trace_store = TraceStore()
+
+
+@contextmanager
+def span(name: str, category: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Misst den Block als Span im Trace des aktuellen Tasks (siehe task_context).
+    Ohne Task werden nur die Metriken aktualisiert. Der Block kann ``attrs`` ergänzen.
+    """
+    started = time.time()
+    try:
+        yield attrs
+    except BaseException:
+        attrs["status"] = "error"
+        raise
+    finally:
+        finished = Span(name, category, started, time.time(), thread=threading.get_ident(), attrs=attrs)
+        trace = trace_store.get(current_task_id.get())
+        if trace is not None:
+            trace.add(finished)
+        else:
+            observe_span(finished)
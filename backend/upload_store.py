@@ -0,0 +1,309 @@
+# coding_agent_backend/upload_store.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from dataclasses import dataclass, asdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(5 * 1024 ** 3)))
+DEFAULT_PART_SIZE = int(os.getenv("UPLOAD_PART_SIZE", str(16 * 1024 * 1024)))
+
+
+class UploadError(Exception):
+    """Upload rejected by the store. ``status_code`` is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class StoredUpload:
+    file_path: str  # Alias unter dem Originalnamen, den Tools und Agenten sehen
+    object_path: str  # Inhaltsadressierte Datei unter .objects/
+    content_hash: str
+    size: int
+    deduplicated: bool
+    previous_object_path: Optional[str] = None  # Vorheriges Ziel des Alias, falls überschrieben
+
+    def to_response(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("object_path")
+        data.pop("previous_object_path")
+        return data
+
+
+class UploadStore:
+    """
+    Content-addressed storage for uploaded datasets.
+
+    Files are streamed to disk in chunks while being hashed (SHA-256) and stored
+    once under ``.objects/<hash><ext>``. The user-facing name in the upload
+    directory is a symlink to that object, so re-uploading identical content is
+    a no-op and re-using a name never overwrites data another alias points to.
+    Large files can be uploaded as independent parts (``.partial/<upload_id>/``)
+    that are assembled on ``complete_session``; the session manifest on disk
+    makes interrupted uploads resumable.
+
+    With a ``catalog`` (``dataset_catalog.DatasetCatalog``) every name is
+    registered and removed together with its symlink under the store's lock, so
+    the catalog's reference count decides whether an object may be deleted.
+    """
+
+    def __init__(self, root: str, max_bytes: int = MAX_UPLOAD_BYTES, catalog: Optional[Any] = None):
+        # Aufgelöst, damit Objektpfade im Katalog denen von os.path.realpath(alias) entsprechen
+        self.root = os.path.realpath(root)
+        self.max_bytes = max_bytes
+        self.catalog = catalog
+        self.objects_dir = os.path.join(root, ".objects")
+        self.partial_dir = os.path.join(root, ".partial")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.partial_dir, exist_ok=True)
+        # Serialisiert Namen anlegen/entfernen und Objekte löschen (Upload und Löschen aus Worker-Threads)
+        self._lock = threading.Lock()
+        self._completing: Set[str] = set()
+
+    # --- Einfacher Upload (ein Request) ---
+
+    async def save_stream(self, filename: str, chunks: AsyncIterator[bytes]) -> StoredUpload:
+        name = self._safe_name(filename)
+        tmp_path = os.path.join(self.partial_dir, f"{uuid.uuid4().hex}.tmp")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadError(f"Datei überschreitet das Upload-Limit von {self.max_bytes} Bytes.", 413)
+                    digest.update(chunk)
+                    await asyncio.to_thread(f.write, chunk)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        return await asyncio.to_thread(self._finalize, tmp_path, name, digest.hexdigest(), size)
+
+    # --- Mehrteiliger, fortsetzbarer Upload ---
+
+    def create_session(self, filename: str, total_size: int, part_size: int = DEFAULT_PART_SIZE) -> Dict[str, Any]:
+        name = self._safe_name(filename)
+        if total_size <= 0:
+            raise UploadError("total_size muss größer als 0 sein.")
+        if total_size > self.max_bytes:
+            raise UploadError(f"Datei überschreitet das Upload-Limit von {self.max_bytes} Bytes.", 413)
+        if part_size <= 0:
+            raise UploadError("part_size muss größer als 0 sein.")
+        upload_id = uuid.uuid4().hex
+        manifest = {
+            "upload_id": upload_id,
+            "filename": name,
+            "total_size": total_size,
+            "part_size": part_size,
+            "part_count": -(-total_size // part_size),
+        }
+        os.makedirs(self._session_dir(upload_id))
+        with open(self._manifest_path(upload_id), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        return self.session_status(upload_id)
+
+    def session_status(self, upload_id: str) -> Dict[str, Any]:
+        manifest = self._load_manifest(upload_id)
+        manifest["received_parts"] = self._received_parts(upload_id, manifest)
+        return manifest
+
+    async def write_part(self, upload_id: str, index: int, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        manifest = self._load_manifest(upload_id)
+        if not 0 <= index < manifest["part_count"]:
+            raise UploadError(f"Ungültiger Part-Index {index}.")
+        expected = self._expected_part_size(manifest, index)
+        part_path = self._part_path(upload_id, index)
+        tmp_path = f"{part_path}.{uuid.uuid4().hex}.tmp"
+        size = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > expected:
+                        raise UploadError(f"Part {index} ist größer als erwartet ({expected} Bytes).", 413)
+                    await asyncio.to_thread(f.write, chunk)
+            if size != expected:
+                raise UploadError(f"Part {index} unvollständig: {size} von {expected} Bytes empfangen.")
+            # Atomar umbenennen, damit halb geschriebene Parts nie als empfangen gelten
+            os.replace(tmp_path, part_path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        return {"upload_id": upload_id, "index": index, "size": size}
+
+    async def complete_session(self, upload_id: str) -> StoredUpload:
+        manifest = await asyncio.to_thread(self._load_manifest, upload_id)
+        # Ein wiederholtes complete (Retry, Doppelklick) darf nicht parallel zusammensetzen
+        with self._lock:
+            if upload_id in self._completing:
+                raise UploadError(f"Upload-Session '{upload_id}' wird bereits abgeschlossen.", 409)
+            self._completing.add(upload_id)
+        try:
+            missing = sorted(set(range(manifest["part_count"])) - set(await asyncio.to_thread(self._received_parts, upload_id, manifest)))
+            if missing:
+                raise UploadError(f"Es fehlen noch Parts: {missing[:20]}", 409)
+            tmp_path, digest = await asyncio.to_thread(self._assemble_parts, upload_id, manifest)
+            stored = await asyncio.to_thread(self._finalize, tmp_path, manifest["filename"], digest, manifest["total_size"])
+            await asyncio.to_thread(self.abort_session, upload_id)
+        finally:
+            with self._lock:
+                self._completing.discard(upload_id)
+        return stored
+
+    def abort_session(self, upload_id: str) -> None:
+        shutil.rmtree(self._session_dir(upload_id), ignore_errors=True)
+
+    # --- Löschen ---
+
+    def remove_alias(self, filename: str) -> str:
+        """Entfernt den Namen aus dem Upload-Verzeichnis und gibt das Objekt zurück, auf das er zeigte."""
+        name = self._safe_name(filename)
+        alias_path = os.path.join(self.root, name)
+        with self._lock:
+            if not os.path.lexists(alias_path):
+                raise UploadError(f"Datensatz '{filename}' nicht gefunden.", 404)
+            object_path = os.path.realpath(alias_path)
+            self._remove(alias_path)
+            if self.catalog is not None:
+                self.catalog.delete(name)
+        return object_path
+
+    def remove_object(self, object_path: str) -> List[str]:
+        """
+        Löscht ein Objekt samt abgeleiteter Dateien (Spaltenkopie, Profil) mit demselben Hash-Präfix –
+        aber nur, wenn unter dem Lock kein Name mehr darauf zeigt (z.B. ein gleichzeitiger Upload desselben Inhalts).
+        """
+        if os.path.dirname(os.path.realpath(object_path)) != os.path.realpath(self.objects_dir):
+            return []  # Kopie statt Symlink (siehe _link_alias) – nichts Gemeinsames zu löschen
+        stem = os.path.splitext(os.path.basename(object_path))[0]
+        removed = []
+        with self._lock:
+            if self._is_referenced(object_path):
+                logger.info(f"Objekt {stem[:12]} wird wieder verwendet – nicht gelöscht.")
+                return []
+            for name in os.listdir(self.objects_dir):
+                if name.split(".", 1)[0] == stem:
+                    self._remove(os.path.join(self.objects_dir, name))
+                    removed.append(name)
+        return removed
+
+    # --- Interna ---
+
+    def _assemble_parts(self, upload_id: str, manifest: Dict[str, Any]) -> tuple:
+        fd, tmp_path = tempfile.mkstemp(prefix=f"{upload_id}.", suffix=".assembled.tmp", dir=self.partial_dir)
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for index in range(manifest["part_count"]):
+                    with open(self._part_path(upload_id, index), "rb") as part:
+                        while chunk := part.read(UPLOAD_CHUNK_SIZE):
+                            digest.update(chunk)
+                            out.write(chunk)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        return tmp_path, digest.hexdigest()
+
+    def _finalize(self, tmp_path: str, name: str, content_hash: str, size: int) -> StoredUpload:
+        with self._lock:
+            return self._finalize_locked(tmp_path, name, content_hash, size)
+
+    def _finalize_locked(self, tmp_path: str, name: str, content_hash: str, size: int) -> StoredUpload:
+        extension = os.path.splitext(name)[1].lower() or ".csv"
+        object_path = os.path.join(self.objects_dir, f"{content_hash}{extension}")
+        deduplicated = os.path.exists(object_path)
+        if deduplicated:
+            self._remove(tmp_path)
+            logger.info(f"Upload '{name}' ist identisch mit vorhandenem Objekt {content_hash[:12]} – Speichern übersprungen.")
+        else:
+            os.replace(tmp_path, object_path)
+
+        alias_path = os.path.join(self.root, name)
+        previous_object_path = None
+        if os.path.lexists(alias_path):
+            current = os.path.realpath(alias_path)
+            if current == os.path.realpath(object_path):
+                self._register(name, alias_path, object_path, content_hash, size)
+                return StoredUpload(alias_path, object_path, content_hash, size, deduplicated)
+            previous_object_path = current
+        self._link_alias(object_path, alias_path)
+        self._register(name, alias_path, object_path, content_hash, size)
+        return StoredUpload(alias_path, object_path, content_hash, size, deduplicated, previous_object_path)
+
+    def _link_alias(self, object_path: str, alias_path: str) -> None:
+        tmp_alias = f"{alias_path}.{uuid.uuid4().hex}.link"
+        try:
+            os.symlink(os.path.relpath(object_path, self.root), tmp_alias)
+        except (OSError, NotImplementedError):
+            # Ohne Symlink-Unterstützung (z.B. Windows ohne Rechte) auf eine Kopie ausweichen
+            shutil.copyfile(object_path, tmp_alias)
+        os.replace(tmp_alias, alias_path)
+
+    def _register(self, name: str, alias_path: str, object_path: str, content_hash: str, size: int) -> None:
+        # Unter dem Lock, zusammen mit dem Symlink – ein gleichzeitiges Löschen sieht den neuen Namen
+        if self.catalog is not None:
+            self.catalog.upsert(name, alias_path, object_path, content_hash, size)
+
+    def _is_referenced(self, object_path: str) -> bool:
+        if self.catalog is not None:
+            return self.catalog.references(object_path) > 0  # Index auf object_path
+        # Ohne Katalog: Symlinks im Upload-Verzeichnis prüfen
+        target = os.path.realpath(object_path)
+        with os.scandir(self.root) as entries:
+            return any(entry.is_symlink() and os.path.realpath(entry.path) == target for entry in entries)
+
+    def _safe_name(self, filename: Optional[str]) -> str:
+        name = os.path.basename((filename or "").replace("\\", "/")).strip()
+        if not name or name.startswith("."):
+            raise UploadError(f"Ungültiger Dateiname: '{filename}'.")
+        return name
+
+    def _session_dir(self, upload_id: str) -> str:
+        if not upload_id.isalnum():
+            raise UploadError(f"Ungültige Upload-ID: '{upload_id}'.")
+        return os.path.join(self.partial_dir, upload_id)
+
+    def _manifest_path(self, upload_id: str) -> str:
+        return os.path.join(self._session_dir(upload_id), "manifest.json")
+
+    def _part_path(self, upload_id: str, index: int) -> str:
+        return os.path.join(self._session_dir(upload_id), f"{index:06d}.part")
+
+    def _load_manifest(self, upload_id: str) -> Dict[str, Any]:
+        try:
+            with open(self._manifest_path(upload_id), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UploadError(f"Upload-Session '{upload_id}' nicht gefunden.", 404)
+
+    def _expected_part_size(self, manifest: Dict[str, Any], index: int) -> int:
+        start = index * manifest["part_size"]
+        return min(manifest["part_size"], manifest["total_size"] - start)
+
+    def _received_parts(self, upload_id: str, manifest: Dict[str, Any]) -> List[int]:
+        received = []
+        for index in range(manifest["part_count"]):
+            part_path = self._part_path(upload_id, index)
+            if os.path.exists(part_path) and os.path.getsize(part_path) == self._expected_part_size(manifest, index):
+                received.append(index)
+        return received
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,93 @@
+# coding_agent_backend/warmup.py
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Schwere Komponenten (crewai, Tools, LLM-Clients, Kernel) nach dem Start im Hintergrund laden
+BACKEND_PREWARM = os.getenv("BACKEND_PREWARM", "true").lower() in ("1", "true", "yes")
+
+
+@dataclass
+class _Component:
+    loader: Callable[[], Any]
+    state: str = "pending"  # pending, loading, ready, failed
+    value: Any = None
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+class WarmupRegistry:
+    """
+    Heavy components that are loaded on first use instead of at import time.
+
+    ``ensure(name)`` runs the component's loader exactly once (concurrent callers
+    wait for the same load) and returns its result; a failed load is retried by
+    the next caller. ``prewarm`` loads components in a background thread so the
+    server answers requests while crewai and friends are still importing, and
+    ``status`` feeds the readiness endpoint.
+    """
+
+    def __init__(self) -> None:
+        self._components: Dict[str, _Component] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        with self._lock:
+            self._components[name] = _Component(loader)
+            self._locks[name] = threading.Lock()
+
+    def ensure(self, name: str) -> Any:
+        component = self._components[name]
+        if component.state == "ready":
+            return component.value
+        with self._locks[name]:
+            if component.state == "ready":
+                return component.value
+            component.state = "loading"
+            started = time.perf_counter()
+            try:
+                component.value = component.loader()
+            except Exception as e:
+                component.state, component.error = "failed", str(e)
+                logger.error(f"Komponente '{name}' konnte nicht geladen werden: {e}")
+                raise
+            finally:
+                component.seconds = round(time.perf_counter() - started, 3)
+            component.state, component.error = "ready", None
+            logger.info(f"Komponente '{name}' bereit nach {component.seconds:.2f}s.")
+            return component.value
+
+    def prewarm(self, names: Optional[Iterable[str]] = None) -> threading.Thread:
+        """Lädt ``names`` (Standard: alle registrierten Komponenten) nacheinander in einem Hintergrund-Thread."""
+        names = list(names if names is not None else self._components)
+
+        def run() -> None:
+            for name in names:
+                try:
+                    self.ensure(name)
+                except Exception:
+                    pass  # bereits geloggt; der nächste Aufruf von ensure versucht es erneut
+
+        thread = threading.Thread(target=run, name="backend-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            components = dict(self._components)
+        return {
+            "ready": all(c.state == "ready" for c in components.values()),
+            "components": {
+                name: {"state": c.state, "seconds": c.seconds, "error": c.error}
+                for name, c in components.items()
+            },
+        }
+
+
+warmup = WarmupRegistry()
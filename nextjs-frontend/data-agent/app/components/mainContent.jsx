@@ -12,6 +12,109 @@ import { useTheme } from '@mui/material/styles';
 import { useDataset } from '../context/DatasetContext';
 import AnsiToHtml from 'ansi-to-html';
 
+const API_BASE = 'http://localhost:8000';
+// Dateien ab dieser Größe werden in parallelen, fortsetzbaren Parts hochgeladen
+const MULTIPART_THRESHOLD = 32 * 1024 * 1024;
+const PART_SIZE = 16 * 1024 * 1024;
+const PARALLEL_PARTS = 4;
+const PART_RETRIES = 3;
+const WS_MAX_RECONNECTS = 5;
+const WS_RECONNECT_DELAY_MS = 1000;
+
+const EVENT_LABELS = {
+  llm_start: 'LLM Start',
+  llm_end: 'LLM Ende',
+  chain_start: 'Kette Start',
+  chain_end: 'Kette Ende',
+  tool_start: 'Tool Start',
+  tool_end: 'Output',
+  tool_error: 'Tool Fehler',
+  agent_thought: 'Thought',
+  agent_action: 'Action',
+  agent_finish: 'Abschluss',
+  text: 'Info',
+};
+
+// Darstellung eines Log-Events als Zeile (entspricht dem bisherigen Textformat)
+const eventToLine = (ev) => {
+  switch (ev.type) {
+    case 'console': return ev.payload;
+    case 'system': return `[SYSTEM] ${ev.payload}`;
+    case 'error': return `[SYSTEM-ERROR] ${ev.payload}`;
+    case 'final_result': return `[FINAL_RESULT]${JSON.stringify(ev.payload)}`;
+    default: {
+      const source = [ev.agent, ev.tool].filter(Boolean).join(' - ');
+      const label = EVENT_LABELS[ev.type] || ev.type;
+      return `[${source ? `${source} ` : ''}${label}] ${ev.payload}`;
+    }
+  }
+};
+
+// Große Payloads kommen in Chunks mit gleicher seq; liefert das Event, sobald alle Teile da sind
+const assembleChunk = (chunks, ev) => {
+  const { of, index, count, encoding, data } = ev.payload;
+  const parts = chunks.get(ev.seq) || new Array(count);
+  parts[index] = data;
+  chunks.set(ev.seq, parts);
+  if (parts.filter(part => part !== undefined).length < count) return null;
+  chunks.delete(ev.seq);
+  const joined = parts.join('');
+  return { ...ev, type: of, payload: encoding === 'json' ? JSON.parse(joined) : joined };
+};
+
+const uploadSessionKey = (file) => `upload:${file.name}:${file.size}:${file.lastModified}`;
+
+const uploadInParts = async (file) => {
+  const key = uploadSessionKey(file);
+  let session = null;
+
+  // Vorhandene Session fortsetzen, falls ein früherer Upload abgebrochen wurde
+  const storedId = window.localStorage.getItem(key);
+  if (storedId) {
+    const resp = await fetch(`${API_BASE}/api/uploads/${storedId}`);
+    if (resp.ok) session = await resp.json();
+  }
+  if (!session) {
+    const resp = await fetch(`${API_BASE}/api/uploads`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ filename: file.name, total_size: file.size, part_size: PART_SIZE }),
+    });
+    if (!resp.ok) throw new Error("Upload-Session konnte nicht gestartet werden.");
+    session = await resp.json();
+    window.localStorage.setItem(key, session.upload_id);
+  }
+
+  const received = new Set(session.received_parts);
+  const pending = [];
+  for (let index = 0; index < session.part_count; index++) {
+    if (!received.has(index)) pending.push(index);
+  }
+
+  const sendPart = async (index) => {
+    const start = index * session.part_size;
+    const blob = file.slice(start, Math.min(start + session.part_size, file.size));
+    for (let attempt = 1; attempt <= PART_RETRIES; attempt++) {
+      const resp = await fetch(`${API_BASE}/api/uploads/${session.upload_id}/parts/${index}`, {
+        method: 'PUT',
+        body: blob,
+      }).catch(() => null);
+      if (resp && resp.ok) return;
+    }
+    throw new Error(`Part ${index} konnte nicht hochgeladen werden.`);
+  };
+
+  const worker = async () => {
+    while (pending.length > 0) await sendPart(pending.shift());
+  };
+  await Promise.all(Array.from({ length: PARALLEL_PARTS }, worker));
+
+  const resp = await fetch(`${API_BASE}/api/uploads/${session.upload_id}/complete`, { method: 'POST' });
+  if (!resp.ok) throw new Error("Upload konnte nicht abgeschlossen werden.");
+  window.localStorage.removeItem(key);
+  return resp.json();
+};
+
 const MainContent = () => {
   const theme = useTheme();
   const { datasetPath, setDatasetPath } = useDataset();
@@ -69,7 +172,11 @@ const MainContent = () => {
   }, [crewLogs]);
 
   useEffect(() => () => {
-    if (ws.current && ws.current.readyState === WebSocket.OPEN) ws.current.close();
+    if (ws.current) {
+      const socket = ws.current;
+      ws.current = null;  // verhindert automatisches Wiederverbinden
+      if (socket.readyState === WebSocket.OPEN) socket.close();
+    }
   }, []);
 
   const handleAskAgent = async () => {
@@ -82,7 +189,11 @@ const MainContent = () => {
     setError(null);
     setCrewLogs([]);
 
-    if (ws.current && ws.current.readyState === WebSocket.OPEN) ws.current.close();
+    if (ws.current) {
+      const socket = ws.current;
+      ws.current = null;  // verhindert automatisches Wiederverbinden
+      if (socket.readyState === WebSocket.OPEN) socket.close();
+    }
 
     try {
       const response = await fetch('http://localhost:8000/api/start_crew_task', {
@@ -94,12 +205,39 @@ const MainContent = () => {
       if (!response.ok) throw new Error("Task konnte nicht gestartet werden.");
 
       const data = await response.json();
-      const socketUrl = `ws://localhost:8000/ws/logs/${data.task_id}`;
-      ws.current = new WebSocket(socketUrl);
+      let reconnects = 0;
+      let lastSeq = 0;
 
-      ws.current.onmessage = (event) => setCrewLogs(prev => [...prev, event.data]);
-      ws.current.onerror = () => { setError("WebSocket Fehler"); setIsLoading(false); };
-      ws.current.onclose = () => setIsLoading(false);
+      const connect = () => {
+        // Typisiertes JSON-Protokoll; der Server spielt alle Events nach lastSeq erneut ab
+        const socket = new WebSocket(`ws://localhost:8000/ws/logs/${data.task_id}?since=${lastSeq}&protocol=json`);
+        ws.current = socket;
+        const chunks = new Map();
+
+        socket.onmessage = (message) => {
+          const lines = [];
+          for (const ev of JSON.parse(message.data).events) {
+            const complete = ev.type === 'chunk' ? assembleChunk(chunks, ev) : ev;
+            if (!complete) continue;
+            if (complete.seq > 0) lastSeq = complete.seq;  // seq 0: Hinweise nur für diese Verbindung
+            lines.push(eventToLine(complete));
+          }
+          reconnects = 0;
+          if (lines.length > 0) setCrewLogs(prev => [...prev, ...lines]);
+        };
+        socket.onclose = (event) => {
+          if (ws.current !== socket) return;
+          // Unerwarteter Abbruch: ab der letzten empfangenen Sequenznummer neu verbinden
+          if (event.code !== 1000 && event.code !== 4404 && reconnects < WS_MAX_RECONNECTS) {
+            reconnects += 1;
+            setTimeout(() => { if (ws.current === socket) connect(); }, WS_RECONNECT_DELAY_MS * reconnects);
+            return;
+          }
+          if (event.code !== 1000) setError("WebSocket Verbindung verloren");
+          setIsLoading(false);
+        };
+      };
+      connect();
 
     } catch (err) {
       setError(err.message);
@@ -110,22 +248,22 @@ const MainContent = () => {
   const handleFileChange = async (event) => {
     const file = event.target.files[0];
     if (file) {
-      const formData = new FormData();
-      formData.append('file', file);
-
       try {
-        const response = await fetch('http://localhost:8000/api/upload_csv', {
-          method: 'POST',
-          body: formData,
-        });
-
-        if (response.ok) {
-          const data = await response.json();
-          setDatasetPath(data.file_path);
-          setShowSnackbar(true);
+        let data;
+        if (file.size >= MULTIPART_THRESHOLD) {
+          data = await uploadInParts(file);
         } else {
-          throw new Error("Fehler beim Hochladen der Datei");
+          const formData = new FormData();
+          formData.append('file', file);
+          const response = await fetch(`${API_BASE}/api/upload_csv`, {
+            method: 'POST',
+            body: formData,
+          });
+          if (!response.ok) throw new Error("Fehler beim Hochladen der Datei");
+          data = await response.json();
         }
+        setDatasetPath(data.file_path);
+        setShowSnackbar(true);
       } catch (err) {
         setError(err.message);
       }